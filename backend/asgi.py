@@ -1,9 +1,9 @@
 import os
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
-from channels.auth import AuthMiddlewareStack
 from chat.routing import websocket_urlpatterns
 from chat.ws_jwt import JWTAuthMiddleware
+from backend.perf import PerfWebsocketMiddleware
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
@@ -11,9 +11,9 @@ django_asgi_app = get_asgi_application()
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
-    # JWT ws auth + URLRouter
-    "websocket": JWTAuthMiddleware(
-        AuthMiddlewareStack(
+    # Métricas (PERF_ENABLED) + JWT ws auth + URLRouter (sin sesiones/cookies: el WS solo usa el token)
+    "websocket": PerfWebsocketMiddleware(
+        JWTAuthMiddleware(
             URLRouter(websocket_urlpatterns)
         )
     ),
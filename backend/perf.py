@@ -0,0 +1,323 @@
+# backend-tkd-main/backend/perf.py
+"""
+Instrumentación de rendimiento (se activa con ``PERF_ENABLED``).
+
+Por petición HTTP (``PerfMiddleware``) y por frame WebSocket
+(``PerfWebsocketMiddleware``) se mide: tiempo total, nº y tiempo de consultas
+SQL, tiempo de renderizado de la respuesta DRF (``render``: ``Response.render``,
+medido desde ``process_template_response``; la serialización a ``.data`` ocurre
+dentro de la vista y cuenta en ``app``) y bytes de respuesta.
+
+- Cabecera ``Server-Timing`` (app, db, render) en cada respuesta HTTP.
+- ``/metrics/``: agregados por vista/acción en formato texto de Prometheus.
+- ``/metrics/slow/``: últimas peticiones lentas (> ``PERF_SLOW_REQUEST_MS``)
+  con su SQL.
+Ambos endpoints exigen ``DEBUG``, un usuario staff o la cabecera
+``X-Metrics-Token`` igual a ``PERF_METRICS_TOKEN``.
+
+Las consultas se atribuyen mediante un contextvar, así que también cuentan
+las que se hacen en hilos vía ``sync_to_async``/``database_sync_to_async``
+(por eso ``Stats`` acumula con un lock: varios hilos pueden compartirlo).
+"""
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+
+DEFAULT_SLOW_REQUEST_MS = 500.0
+DEFAULT_SLOW_SAMPLES = 50
+MAX_SQL_PER_SAMPLE = 100
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_current = ContextVar("perf_stats", default=None)
+
+
+def enabled():
+    return getattr(settings, "PERF_ENABLED", False)
+
+
+class Stats:
+    """Acumulador de una petición (o de un frame WS)."""
+    __slots__ = ("started", "db_count", "db_time", "render_time", "sql", "_lock")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.perf_counter()
+            self.db_count = 0
+            self.db_time = 0.0
+            self.render_time = 0.0
+            self.sql = []
+
+    def add_query(self, sql, took):
+        with self._lock:
+            self.db_count += 1
+            self.db_time += took
+            if len(self.sql) < MAX_SQL_PER_SAMPLE:
+                self.sql.append((sql, round(took * 1000, 3)))
+
+    def add_render(self, took):
+        with self._lock:
+            self.render_time += took
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+# ----------------------
+# Gancho SQL
+# ----------------------
+def _sql_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, time.perf_counter() - started)
+
+
+def _install_sql_wrapper(sender, connection, **kwargs):
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+_install_lock = threading.Lock()
+_installed = False
+
+
+def install():
+    """Engancha el SQL de todas las conexiones. Idempotente."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from django.db import connections
+        connection_created.connect(_install_sql_wrapper)
+        for conn in connections.all(initialized_only=True):
+            _install_sql_wrapper(None, conn)
+        _installed = True
+
+
+# ----------------------
+# Registro de métricas
+# ----------------------
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}  # (kind, label, method) -> dict
+        self.slow = deque(maxlen=getattr(settings, "PERF_SLOW_SAMPLES", DEFAULT_SLOW_SAMPLES))
+
+    def observe(self, kind, label, method, stats, wall, size=0):
+        key = (kind, label, method)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = {"count": 0, "wall": 0.0, "db_count": 0, "db_time": 0.0,
+                                         "render_time": 0.0, "bytes": 0, "buckets": [0] * len(BUCKETS)}
+            s["count"] += 1
+            s["wall"] += wall
+            s["db_count"] += stats.db_count
+            s["db_time"] += stats.db_time
+            s["render_time"] += stats.render_time
+            s["bytes"] += size
+            for i, le in enumerate(BUCKETS):
+                if wall <= le:
+                    s["buckets"][i] += 1
+
+            slow_ms = getattr(settings, "PERF_SLOW_REQUEST_MS", DEFAULT_SLOW_REQUEST_MS)
+            if wall * 1000 >= slow_ms:
+                self.slow.append({
+                    "kind": kind, "label": label, "method": method,
+                    "at": time.time(), "wall_ms": round(wall * 1000, 3),
+                    "db_count": stats.db_count, "db_ms": round(stats.db_time * 1000, 3),
+                    "render_ms": round(stats.render_time * 1000, 3), "bytes": size,
+                    "sql": [{"sql": sql, "ms": ms} for sql, ms in stats.sql],
+                })
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self.slow.clear()
+
+    def slow_samples(self):
+        with self._lock:
+            return list(self.slow)
+
+    def prometheus(self):
+        with self._lock:
+            series = {k: dict(v, buckets=list(v["buckets"])) for k, v in self._series.items()}
+
+        def labels(kind, label, method, **extra):
+            pairs = {"kind": kind, "view": label, "method": method, **extra}
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs.items()) + "}"
+
+        lines = [
+            "# HELP tkd_request_duration_seconds Tiempo total por petición HTTP / frame WS.",
+            "# TYPE tkd_request_duration_seconds histogram",
+        ]
+        for (kind, label, method), s in sorted(series.items()):
+            for le, n in zip(BUCKETS, s["buckets"]):
+                lines.append(f"tkd_request_duration_seconds_bucket{labels(kind, label, method, le=le)} {n}")
+            lines.append(f"tkd_request_duration_seconds_bucket{labels(kind, label, method, le='+Inf')} {s['count']}")
+            lines.append(f"tkd_request_duration_seconds_sum{labels(kind, label, method)} {s['wall']:.6f}")
+            lines.append(f"tkd_request_duration_seconds_count{labels(kind, label, method)} {s['count']}")
+
+        for metric, field, help_text in (
+            ("tkd_db_queries_total", "db_count", "Consultas SQL."),
+            ("tkd_db_seconds_total", "db_time", "Tiempo en consultas SQL."),
+            ("tkd_render_seconds_total", "render_time", "Tiempo renderizando respuestas DRF (Response.render)."),
+            ("tkd_response_bytes_total", "bytes", "Bytes de respuesta."),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for (kind, label, method), s in sorted(series.items()):
+                value = s[field]
+                value = f"{value:.6f}" if isinstance(value, float) else value
+                lines.append(f"{metric}{labels(kind, label, method)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+
+# ----------------------
+# HTTP
+# ----------------------
+def _view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    label = match.view_name or match._func_path
+    # ViewSets de DRF: añadir la acción (list, retrieve, create…)
+    actions = getattr(match.func, "actions", None)
+    action = actions.get(request.method.lower()) if actions else None
+    return f"{label}:{action}" if action and not label.endswith(action) else label
+
+
+class PerfMiddleware:
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = Stats()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        wall = stats.elapsed
+        size = 0 if response.streaming else len(response.content)
+        app_time = max(wall - stats.db_time - stats.render_time, 0)
+        response["Server-Timing"] = ", ".join([
+            f"app;dur={app_time * 1000:.2f}",
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.db_count} queries"',
+            f"render;dur={stats.render_time * 1000:.2f}",
+            f"total;dur={wall * 1000:.2f}",
+        ])
+        registry.observe("http", _view_label(request), request.method, stats, wall, size)
+        return response
+
+    def process_template_response(self, request, response):
+        # Las respuestas DRF se renderizan justo después de este gancho
+        stats = _current.get()
+        if stats is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(lambda r: stats.add_render(time.perf_counter() - started))
+        return response
+
+
+def _authorized(request):
+    if settings.DEBUG or getattr(request.user, "is_staff", False):
+        return True
+    token = getattr(settings, "PERF_METRICS_TOKEN", "")
+    return bool(token) and constant_time_compare(request.headers.get("X-Metrics-Token", ""), token)
+
+
+def metrics_view(request):
+    if not enabled() or not _authorized(request):
+        raise Http404
+    return HttpResponse(registry.prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def slow_requests_view(request):
+    if not enabled() or not _authorized(request):
+        raise Http404
+    return JsonResponse({"threshold_ms": getattr(settings, "PERF_SLOW_REQUEST_MS", DEFAULT_SLOW_REQUEST_MS),
+                         "samples": registry.slow_samples()})
+
+
+# ----------------------
+# WebSocket (ASGI)
+# ----------------------
+_ID_RE = re.compile(r"/\d+(?=/|$)")
+
+
+class PerfWebsocketMiddleware:
+    """
+    Envuelve la app websocket: mide el handshake (hasta accept/close) y cada
+    frame recibido (desde que llega hasta que el consumer vuelve a pedir otro;
+    los consumers de Channels procesan los mensajes de uno en uno).
+    """
+    def __init__(self, inner):
+        self.inner = inner
+
+    async def __call__(self, scope, receive, send):
+        if not enabled():
+            return await self.inner(scope, receive, send)
+        install()
+
+        label = _ID_RE.sub("/<id>", scope.get("path", ""))
+        stats = Stats()
+        state = {"phase": "connect", "out": 0}
+        token = _current.set(stats)
+
+        def finish():
+            if state["phase"] is not None:
+                registry.observe("ws", label, state["phase"], stats, stats.elapsed, state["out"])
+                state["phase"] = None
+
+        async def perf_receive():
+            # El consumer pide otro mensaje: el frame anterior ya está procesado
+            if state["phase"] == "receive":
+                finish()
+            message = await receive()
+            if message["type"] in ("websocket.connect", "websocket.receive"):
+                stats.reset()
+                state.update(phase=message["type"].split(".")[1], out=0)
+            return message
+
+        async def perf_send(message):
+            if message["type"] in ("websocket.accept", "websocket.close") and state["phase"] == "connect":
+                await send(message)
+                finish()
+                return
+            if message["type"] == "websocket.send":
+                state["out"] += len(message.get("text") or message.get("bytes") or b"")
+            await send(message)
+
+        try:
+            return await self.inner(scope, perf_receive, perf_send)
+        finally:
+            finish()
+            _current.reset(token)
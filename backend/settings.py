@@ -1,6 +1,8 @@
 from pathlib import Path
 from datetime import timedelta
+import hashlib
 import os
+import tempfile
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -34,6 +36,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.perf.PerfMiddleware',  # ← métricas (solo con PERF_ENABLED), mide toda la cadena
     'corsheaders.middleware.CorsMiddleware',  # ← CORS primero
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -75,12 +78,90 @@ DATABASES = {
 AUTH_USER_MODEL = 'users.User'
 
 # ── Channels / Redis ──────────────────────────────────────────────────────────
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
-        "CONFIG": {"hosts": [("127.0.0.1", 6379)]},
-    },
-}
+# CHANNEL_LAYER_BACKEND=local → capa en proceso (un solo worker ASGI, sin Redis).
+# CHAT_LOCAL_LAYER_LOCK: fichero de bloqueo que hace fallar a un segundo proceso (vacío = sin comprobar)
+CHANNEL_LAYER_BACKEND = os.getenv("CHANNEL_LAYER_BACKEND", "redis")
+CHAT_LOCAL_LAYER_LOCK = os.getenv(
+    "CHAT_LOCAL_LAYER_LOCK",
+    os.path.join(tempfile.gettempdir(), f"tkd-local-layer-{hashlib.sha1(str(BASE_DIR).encode()).hexdigest()[:12]}.lock"),
+)
+if CHANNEL_LAYER_BACKEND == "local":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "chat.layers.LocalChannelLayer",
+            "CONFIG": {"capacity": 100, "expiry": 60, "single_process_lock": CHAT_LOCAL_LAYER_LOCK},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [(os.getenv("REDIS_HOST", "127.0.0.1"), int(os.getenv("REDIS_PORT", "6379")))]},
+        },
+    }
+
+# ── Chat ──────────────────────────────────────────────────────────────────────
+# Escritura agrupada de mensajes WS: tamaño máximo de lote y ventana (segundos)
+CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", "50"))
+CHAT_WRITE_BATCH_WINDOW = float(os.getenv("CHAT_WRITE_BATCH_WINDOW", "0.01"))
+# Coalescing de typing/read por (conversación, usuario), en segundos
+CHAT_TYPING_INTERVAL = float(os.getenv("CHAT_TYPING_INTERVAL", "3"))
+CHAT_TYPING_TTL = float(os.getenv("CHAT_TYPING_TTL", "5"))
+CHAT_READ_WINDOW = float(os.getenv("CHAT_READ_WINDOW", "2"))
+# Outbox de eventos realtime: hilo despachador en proceso (0 = usar manage.py dispatch_outbox)
+CHAT_OUTBOX_AUTODISPATCH = os.getenv("CHAT_OUTBOX_AUTODISPATCH", "1") == "1"
+CHAT_OUTBOX_BATCH_SIZE = int(os.getenv("CHAT_OUTBOX_BATCH_SIZE", "100"))
+# Segundos que un lote reclamado queda reservado antes de que otro despachador lo reintente
+CHAT_OUTBOX_LEASE = float(os.getenv("CHAT_OUTBOX_LEASE", "60"))
+# Socket multiplexado (ws/chat/): máximo de conversaciones suscritas por conexión
+CHAT_MAX_SUBSCRIPTIONS = int(os.getenv("CHAT_MAX_SUBSCRIPTIONS", "100"))
+# Reanudación (resume_from): tamaño de tramo y máximo de mensajes por backfill
+CHAT_BACKFILL_CHUNK = int(os.getenv("CHAT_BACKFILL_CHUNK", "100"))
+CHAT_BACKFILL_MAX = int(os.getenv("CHAT_BACKFILL_MAX", "1000"))
+# Handshake WS: LRU de tokens verificados y caché de usuarios (TTL en segundos; 0 = sin caché)
+CHAT_WS_TOKEN_CACHE_SIZE = int(os.getenv("CHAT_WS_TOKEN_CACHE_SIZE", "4096"))
+CHAT_WS_USER_CACHE_TTL = float(os.getenv("CHAT_WS_USER_CACHE_TTL", "30"))
+# Revocaciones (logout/blacklist) que comprueba cada acierto de la LRU: alias de CACHES.
+# Con varios procesos usa una caché compartida; vacío = los tokens solo se cachean unos segundos.
+CHAT_WS_REVOCATION_CACHE = os.getenv("CHAT_WS_REVOCATION_CACHE", "default") or None
+
+# ── Rendimiento (backend.perf) ────────────────────────────────────────────────
+# Server-Timing, /metrics/ (Prometheus) y muestreo de peticiones lentas con su SQL
+PERF_ENABLED = os.getenv("PERF_ENABLED", "0") == "1"
+PERF_SLOW_REQUEST_MS = float(os.getenv("PERF_SLOW_REQUEST_MS", "500"))
+PERF_SLOW_SAMPLES = int(os.getenv("PERF_SLOW_SAMPLES", "50"))
+PERF_METRICS_TOKEN = os.getenv("PERF_METRICS_TOKEN", "")
+
+# ── Friends ───────────────────────────────────────────────────────────────────
+# Alias de CACHES para cachear los bloqueos de cada usuario (vacío = sin caché).
+# Con varios procesos usa una caché compartida para que la invalidación llegue a todos.
+FRIENDS_BLOCK_CACHE = os.getenv("FRIENDS_BLOCK_CACHE") or None
+
+# ── Docs ──────────────────────────────────────────────────────────────────────
+# Caché HTTP de docs (niveles, técnicas y listado de documentos por rol): alias de CACHES (vacío = sin caché).
+# Con varios procesos usa una caché compartida: ahí viven las versiones que invalidan.
+DOCS_CACHE = os.getenv("DOCS_CACHE") or None
+DOCS_CACHE_TTL = int(os.getenv("DOCS_CACHE_TTL", "300"))
+# Cache-Control público: navegador (max-age) y CDN/proxy (s-maxage), en segundos
+DOCS_CACHE_MAX_AGE = int(os.getenv("DOCS_CACHE_MAX_AGE", "60"))
+DOCS_CACHE_S_MAXAGE = int(os.getenv("DOCS_CACHE_S_MAXAGE", "300"))
+# Descargas: "x-accel-redirect" (nginx, location internal en DOCS_SENDFILE_PREFIX;
+# recomendado en producción), "x-sendfile" (Apache/lighttpd) o vacío (FileResponse
+# desde Django: bajo daphne/ASGI el fichero pasa por Python, sin sendfile)
+DOCS_SENDFILE_BACKEND = os.getenv("DOCS_SENDFILE_BACKEND", "")
+DOCS_SENDFILE_PREFIX = os.getenv("DOCS_SENDFILE_PREFIX", "/protected-media/")
+# Subidas: tamaño máximo, subida por tramos (máx. por PUT) y sesiones a medias
+DOCS_MAX_UPLOAD_SIZE = int(os.getenv("DOCS_MAX_UPLOAD_SIZE", str(20 * 1024 * 1024)))
+DOCS_UPLOAD_CHUNK_MAX = int(os.getenv("DOCS_UPLOAD_CHUNK_MAX", str(8 * 1024 * 1024)))
+DOCS_UPLOAD_TEMP_DIR = os.getenv("DOCS_UPLOAD_TEMP_DIR", str(BASE_DIR / "tmp" / "uploads"))  # fuera de MEDIA
+DOCS_UPLOAD_SESSION_TTL = int(os.getenv("DOCS_UPLOAD_SESSION_TTL", str(24 * 3600)))
+# Almacenamiento por contenido: un fichero sin referencias solo se borra si no se ha
+# escrito/reutilizado en este tiempo (segundos); si no, lo recoge manage.py gc_media
+DOCS_MEDIA_MIN_AGE = int(os.getenv("DOCS_MEDIA_MIN_AGE", "3600"))
+# Miniaturas WebP de técnicas: anchos, calidad e hilos (0 = en la misma petición)
+DOCS_IMAGE_WIDTHS = tuple(int(w) for w in os.getenv("DOCS_IMAGE_WIDTHS", "160,320,640,1280").split(","))
+DOCS_IMAGE_QUALITY = int(os.getenv("DOCS_IMAGE_QUALITY", "80"))
+DOCS_IMAGE_WORKERS = int(os.getenv("DOCS_IMAGE_WORKERS", "2"))
 
 # ── DRF / JWT / Swagger ───────────────────────────────────────────────────────
 REST_FRAMEWORK = {
@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from . import perf
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
@@ -11,6 +13,10 @@ urlpatterns = [
     path('api/friends/', include('friends.urls')),
     path('api/docs/', include('docs.urls')),
 
+    # Métricas de rendimiento (PERF_ENABLED)
+    path("metrics/", perf.metrics_view, name="perf-metrics"),
+    path("metrics/slow/", perf.slow_requests_view, name="perf-slow-requests"),
+
     # OpenAPI / Swagger
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema")),
@@ -0,0 +1,280 @@
+"""
+Prueba de carga del chat: WebSocket multiplexado (ws/chat/) y REST.
+
+Levanta la app ASGI de ``backend.asgi`` con la capa de canales local sobre una
+BD de test (la del backend configurado: SQLite o PostgreSQL), simula N usuarios
+repartidos en M conversaciones y mide:
+- WS: mensajes/s, latencia de fan-out (p50/p90/p99/max), consultas por mensaje
+  y memoria por conexión;
+- REST: peticiones/s, latencia y consultas por POST de mensaje.
+
+    python -m benchmarks.chat_load --users 50 --conversations 20 --messages 10 --rate 5 > out.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from unittest import mock
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+os.environ.setdefault("CHANNEL_LAYER_BACKEND", "local")
+# BD y capa propias: no compite con un runserver local por el bloqueo de la capa
+os.environ.setdefault("CHAT_LOCAL_LAYER_LOCK", "")
+os.environ.setdefault("CHAT_OUTBOX_AUTODISPATCH", "0")
+
+import django  # noqa: E402
+
+django.setup()
+
+from asgiref.sync import async_to_sync  # noqa: E402
+from channels.testing import WebsocketCommunicator  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from backend.asgi import application  # noqa: E402
+from chat.models import Conversation, ConversationParticipant  # noqa: E402
+from chat.outbox import dispatch_pending  # noqa: E402
+from chat.views import MessageViewSet  # noqa: E402
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pick(p):
+        return round(values[min(len(values) - 1, int(p / 100 * len(values)))], 3)
+
+    return {"p50": pick(50), "p90": pick(90), "p99": pick(99),
+            "max": round(values[-1], 3), "mean": round(statistics.fmean(values), 3)}
+
+
+class QueryCounter:
+    """Cuenta consultas por fase en todas las conexiones (buffer de escritura y outbox usan otros hilos)."""
+
+    def __init__(self):
+        self.phase = "setup"
+        self.counts = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.counts[self.phase] += 1
+        return execute(sql, params, many, context)
+
+    def install(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+@contextmanager
+def phase(counter, name):
+    counter.phase = name
+    try:
+        yield
+    finally:
+        counter.phase = "idle"
+
+
+def build_dataset(n_users, n_conversations, members):
+    User = get_user_model()
+    users = [User.objects.create_user(username=f"load{i}", email=f"load{i}@example.com",
+                                      password="pass12345") for i in range(n_users)]
+    memberships = {u.id: [] for u in users}
+    conversations = []
+    for c in range(n_conversations):
+        picked = [users[(c * members + k) % n_users] for k in range(members)]
+        conv = Conversation.objects.create(is_group=True, name=f"load {c}")
+        ConversationParticipant.objects.bulk_create(
+            [ConversationParticipant(conversation=conv, user=u) for u in picked]
+        )
+        conversations.append((conv.id, len(picked)))
+        for u in picked:
+            memberships[u.id].append(conv.id)
+    return users, conversations, memberships
+
+
+async def ws_phase(users, conversations, memberships, messages, rate, counter):
+    # 1) Conexiones y suscripciones (memoria por conexión)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    with phase(counter, "ws_connect"):
+        sockets = {}
+        for u in users:
+            comm = WebsocketCommunicator(application, f"/ws/chat/?token={AccessToken.for_user(u)}")
+            connected, _ = await comm.connect()
+            assert connected, "handshake rechazado"
+            for conv_id in memberships[u.id]:
+                await comm.send_json_to({"action": "subscribe", "conversation_id": conv_id})
+                await comm.receive_json_from(timeout=5)
+            sockets[u.id] = comm
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    fanout = dict(conversations)
+    senders = [u for u in users if memberships[u.id]]
+    expected = sum(fanout[c] for u in senders for c in memberships[u.id][:1]) * messages
+    latencies, received = [], 0
+    done = asyncio.Event()
+
+    async def reader(comm):
+        # Sin timeout corto: al vencer, el communicator cancela la app. Se cancela la tarea al final.
+        nonlocal received
+        while True:
+            frame = await comm.receive_json_from(timeout=3600)
+            if frame.get("event") == "message.new":
+                sent_at = float(frame["message"]["content"])
+                latencies.append((time.perf_counter() - sent_at) * 1000)
+                received += 1
+                if received >= expected:
+                    done.set()
+
+    async def writer(user):
+        comm = sockets[user.id]
+        conv_id = memberships[user.id][0]
+        interval = 1 / rate if rate else 0
+        await asyncio.sleep(random.random() * interval)
+        for _ in range(messages):
+            await comm.send_json_to({"action": "message", "conversation_id": conv_id,
+                                     "content": repr(time.perf_counter())})
+            await asyncio.sleep(interval)
+
+    # 2) Envío y fan-out
+    with phase(counter, "ws_send"):
+        readers = [asyncio.ensure_future(reader(c)) for c in sockets.values()]
+        started = time.perf_counter()
+        await asyncio.gather(*(writer(u) for u in senders))
+        try:
+            await asyncio.wait_for(done.wait(), timeout=60)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - started
+        for task in readers:
+            task.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+
+    for comm in sockets.values():
+        await comm.disconnect()
+
+    sent = len(senders) * messages
+    return {
+        "connections": len(sockets),
+        "messages_sent": sent,
+        "deliveries_expected": expected,
+        "deliveries_received": received,
+        "seconds": round(elapsed, 4),
+        "messages_per_sec": round(sent / elapsed, 1),
+        "deliveries_per_sec": round(received / elapsed, 1),
+        "fanout_latency_ms": percentiles(latencies),
+        "queries_per_message": round(counter.counts["ws_send"] / sent, 2) if sent else None,
+        "memory_per_connection_kb": round((after - before) / len(sockets) / 1024, 1),
+    }
+
+
+def rest_phase(users, memberships, messages, counter):
+    timings = []
+    sent = 0
+    # Se mide el coste en servidor, no los límites de uso
+    with mock.patch.object(MessageViewSet, "throttle_classes", []), phase(counter, "rest_send"):
+        started = time.perf_counter()
+        for u in users:
+            if not memberships[u.id]:
+                continue
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(u)}")
+            url = f"/api/chat/conversations/{memberships[u.id][0]}/messages/"
+            for i in range(messages):
+                t0 = time.perf_counter()
+                res = client.post(url, {"content": f"rest {i}"}, format="json")
+                timings.append((time.perf_counter() - t0) * 1000)
+                assert res.status_code == 201, res.content
+                sent += 1
+        elapsed = time.perf_counter() - started
+    # Eventos realtime de REST: se drenan aparte (en SQLite el hilo despachador competiría por el lock)
+    with phase(counter, "outbox"):
+        t0 = time.perf_counter()
+        drained = dispatch_pending()
+        drain_seconds = time.perf_counter() - t0
+    return {
+        "requests": sent,
+        "seconds": round(elapsed, 4),
+        "requests_per_sec": round(sent / elapsed, 1) if elapsed else None,
+        "latency_ms": percentiles(timings),
+        "queries_per_request": round(counter.counts["rest_send"] / sent, 2) if sent else None,
+        "outbox_events": drained,
+        "outbox_drain_seconds": round(drain_seconds, 4),
+    }
+
+
+def run(args):
+    random.seed(args.seed)
+    counter = QueryCounter()
+    users, conversations, memberships = build_dataset(args.users, args.conversations, args.members)
+    counter.install(None, connection)
+    connection_created.connect(counter.install)
+    try:
+        ws = async_to_sync(ws_phase)(users, conversations, memberships, args.messages, args.rate, counter)
+        rest = rest_phase(users, memberships, args.rest_messages, counter)
+    finally:
+        connection_created.disconnect(counter.install)
+    return {
+        "config": {
+            "users": args.users,
+            "conversations": args.conversations,
+            "members": args.members,
+            "messages_per_user": args.messages,
+            "rate_per_user": args.rate,
+            "rest_messages_per_user": args.rest_messages,
+            "database": connection.vendor,
+            "channel_layer": settings.CHANNEL_LAYERS["default"]["BACKEND"],
+        },
+        "websocket": ws,
+        "rest": rest,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--conversations", type=int, default=10)
+    parser.add_argument("--members", type=int, default=4, help="participantes por conversación")
+    parser.add_argument("--messages", type=int, default=10, help="mensajes WS por usuario")
+    parser.add_argument("--rate", type=float, default=20.0, help="mensajes/s por usuario (0 = sin pausa)")
+    parser.add_argument("--rest-messages", type=int, default=5, help="POST de mensajes por usuario")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="fichero JSON (por defecto stdout)")
+    args = parser.parse_args(argv)
+    args.members = max(2, min(args.members, args.users))
+
+    setup_test_environment()
+    tmpdir = tempfile.TemporaryDirectory()
+    if connection.vendor == "sqlite":
+        # Fichero en vez de memoria compartida: varios hilos escriben (buffer, outbox)
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(tmpdir.name, "chat_load.sqlite3")
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        result = run(args)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        tmpdir.cleanup()
+
+    payload = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark de ráfaga de reconexiones WebSocket (handshake JWT).
+
+Compara la cadena anterior (JWT + AuthMiddlewareStack, sin cachés) con la
+actual (JWT con LRU de tokens y caché de usuarios) sobre ws/chat/, que no
+hace consultas propias en el connect. Usa una BD de test y la capa de canales
+local, así que no necesita Redis.
+
+    python -m benchmarks.ws_handshake --connections 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+os.environ.setdefault("CHANNEL_LAYER_BACKEND", "local")
+# BD y capa propias: no compite con un runserver local por el bloqueo de la capa
+os.environ.setdefault("CHAT_LOCAL_LAYER_LOCK", "")
+
+import django  # noqa: E402
+
+django.setup()
+
+from channels.auth import AuthMiddlewareStack  # noqa: E402
+from channels.routing import URLRouter  # noqa: E402
+from channels.testing import WebsocketCommunicator  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from backend.asgi import application  # noqa: E402
+from chat import ws_jwt  # noqa: E402
+from chat.routing import websocket_urlpatterns  # noqa: E402
+
+legacy_application = ws_jwt.JWTAuthMiddleware(AuthMiddlewareStack(URLRouter(websocket_urlpatterns)))
+
+
+async def _handshake(app, token):
+    comm = WebsocketCommunicator(app, f"/ws/chat/?token={token}")
+    connected, _ = await comm.connect()
+    await comm.disconnect()
+    return connected
+
+
+async def _storm(app, tokens, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(token):
+        async with sem:
+            return await _handshake(app, token)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(t) for t in tokens))
+    elapsed = time.perf_counter() - started
+    return {
+        "handshakes": len(tokens),
+        "failed": results.count(False),
+        "seconds": round(elapsed, 4),
+        "handshakes_per_sec": round(len(tokens) / elapsed, 1),
+    }
+
+
+def run(connections, concurrency, users):
+    User = get_user_model()
+    accounts = [User.objects.create_user(username=f"bench{i}", email=f"bench{i}@example.com",
+                                         password="pass12345") for i in range(users)]
+    # Reconexiones: cada cliente vuelve con el mismo token
+    tokens = [str(AccessToken.for_user(u)) for u in accounts]
+    storm = [tokens[i % users] for i in range(connections)]
+
+    # Antes: sin cachés y con la pila de sesiones
+    ws_jwt.token_cache.maxsize = 0
+    settings.CHAT_WS_USER_CACHE_TTL = 0
+    ws_jwt.token_cache.clear()
+    ws_jwt.user_cache.clear()
+    before = asyncio.run(_storm(legacy_application, storm, concurrency))
+
+    # Después: cadena actual con cachés
+    ws_jwt.token_cache.maxsize = getattr(settings, "CHAT_WS_TOKEN_CACHE_SIZE", ws_jwt.DEFAULT_TOKEN_CACHE_SIZE)
+    settings.CHAT_WS_USER_CACHE_TTL = ws_jwt.DEFAULT_USER_CACHE_TTL
+    after = asyncio.run(_storm(application, storm, concurrency))
+
+    return {
+        "connections": connections,
+        "concurrency": concurrency,
+        "users": users,
+        "before": before,
+        "after": after,
+        "speedup": round(after["handshakes_per_sec"] / before["handshakes_per_sec"], 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        result = run(args.connections, args.concurrency, args.users)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
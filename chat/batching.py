@@ -0,0 +1,150 @@
+# backend-tkd-main/chat/batching.py
+"""
+Buffer de escritura por proceso para los mensajes que llegan por WebSocket.
+
+Los consumers no crean cada mensaje por separado: lo encolan aquí y esperan.
+El buffer agrupa los mensajes de todos los consumers del proceso y los escribe
+con un único ``bulk_create`` cuando se alcanza el tamaño de lote o vence la
+ventana de tiempo (lo que ocurra antes). Cada emisor recibe su fila con el id
+asignado. Los avisos "inbox.unread" de todo el lote van al outbox en la misma
+transacción (una sola inserción) y los envía su despachador.
+"""
+import asyncio
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+
+from . import outbox
+from .counters import record_new_messages
+from .events import inbox_unread_event, user_group
+from .models import Message
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_BATCH_WINDOW = 0.01  # 10 ms
+
+
+class MessageWriteBuffer:
+    def __init__(self, max_batch=None, window=None):
+        self._max_batch = max_batch
+        self._window = window
+        self._loop = None
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        self.stats = {"batches": 0, "messages": 0}
+
+    @property
+    def max_batch(self):
+        return self._max_batch or getattr(settings, "CHAT_WRITE_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+
+    @property
+    def window(self):
+        if self._window is not None:
+            return self._window
+        return getattr(settings, "CHAT_WRITE_BATCH_WINDOW", DEFAULT_BATCH_WINDOW)
+
+    async def submit(self, conversation_id, sender_id, content, recipients=()):
+        """
+        Encola un mensaje y espera a que su lote se persista. ``recipients``: ids
+        de usuario que reciben "inbox.unread" de ese mensaje.
+        Devuelve el dict del mensaje creado (id, content, sender_id, sender_username, created_at).
+        """
+        self._bind_loop()
+        future = self._loop.create_future()
+        self._pending.append((conversation_id, sender_id, content, tuple(recipients), future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(self.window, self._flush)
+        return await future
+
+    def _bind_loop(self):
+        # El buffer vive por proceso, pero sus futures pertenecen a un event loop:
+        # si cambia el loop (tests, recarga del servidor) empezamos de cero.
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._pending = []
+            self._timer = None
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._write(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, batch):
+        entries = [entry[:-1] for entry in batch]
+        try:
+            results = await database_sync_to_async(self._bulk_insert)(entries)
+        except Exception as exc:
+            results = [exc] * len(batch)
+
+        self.stats["batches"] += 1
+        self.stats["messages"] += len(batch)
+        for result, (*_, future) in zip(results, batch):
+            if future.done():  # el emisor se desconectó mientras esperaba
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def _bulk_insert(entries):
+        messages = [
+            Message(conversation_id=conv_id, sender_id=sender_id, content=content)
+            for conv_id, sender_id, content, _ in entries
+        ]
+        recipients = [r for *_, r in entries]
+        try:
+            with transaction.atomic():
+                Message.objects.bulk_create(messages)
+                record_new_messages(messages)
+                _enqueue_unread(messages, recipients)
+            saved = messages
+        except IntegrityError:
+            # Una fila inválida (p. ej. conversación borrada) no debe tumbar el lote entero
+            saved = []
+            for m, r in zip(messages, recipients):
+                try:
+                    with transaction.atomic():
+                        m.save()
+                        record_new_messages([m])
+                        _enqueue_unread([m], [r])
+                    saved.append(m)
+                except IntegrityError as exc:
+                    saved.append(exc)
+
+        sender_ids = {m.sender_id for m in saved if isinstance(m, Message)}
+        usernames = dict(User.objects.filter(id__in=sender_ids).values_list("id", "username"))
+        return [
+            m if isinstance(m, Exception) else {
+                "id": m.id,
+                "content": m.content,
+                "sender_id": m.sender_id,
+                "sender_username": usernames.get(m.sender_id, ""),
+                "created_at": m.created_at,
+            }
+            for m in saved
+        ]
+
+
+def _enqueue_unread(messages, recipients):
+    items = [(user_group(uid), inbox_unread_event(m.conversation_id, m.id))
+             for m, uids in zip(messages, recipients) for uid in uids]
+    if items:
+        outbox.enqueue_many(items)
+
+
+# Instancia compartida por todos los consumers del proceso
+message_buffer = MessageWriteBuffer()
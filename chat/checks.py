@@ -0,0 +1,32 @@
+# backend-tkd-main/chat/checks.py
+"""
+Comprobaciones de sistema del chat (``manage.py check --database default``;
+``migrate`` también las ejecuta).
+"""
+from django.core.checks import Error, Tags, register
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+
+from .search import missing_index_objects
+
+SEARCH_MIGRATION = ("chat", "0006_message_search")
+
+
+@register(Tags.database)
+def check_search_index(app_configs=None, databases=None, **kwargs):
+    """El índice de búsqueda (SQL crudo de la migración 0006) sigue en su sitio."""
+    errors = []
+    for alias in databases or ():
+        conn = connections[alias]
+        # Antes de aplicar la 0006 aún no debe existir
+        if SEARCH_MIGRATION not in MigrationRecorder(conn).applied_migrations():
+            continue
+        missing = missing_index_objects(conn)
+        if missing:
+            errors.append(Error(
+                f"Faltan objetos del índice de búsqueda de mensajes en '{alias}': {', '.join(missing)}.",
+                hint="Probablemente una migración reconstruyó chat_message. Recréalos con las "
+                     "sentencias de chat/migrations/0006_message_search.py (ver chat.search).",
+                id="chat.E001",
+            ))
+    return errors
@@ -1,129 +1,357 @@
 # backend-tkd-main/chat/consumers.py
+from functools import partial
+from urllib.parse import parse_qs
+
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
-from .models import Conversation, Message, ConversationParticipant
+from . import counters
+from .batching import message_buffer
+from .events import conversation_group, user_group, message_new_event
+from .throttling import fanout_throttle
+from .models import Conversation, ConversationParticipant, Message
+from .pagination import keyset_filter, NEWER
 from friends.utils import is_blocked_either  # helper de bloqueo
 
 User = get_user_model()
 
-class ChatConsumer(AsyncJsonWebsocketConsumer):
-    async def connect(self):
-        self.user = self.scope.get("user")
-        self.conversation_id = self.scope["url_route"]["kwargs"]["conversation_id"]
-        self.group_name = f"conv_{self.conversation_id}"
+DEFAULT_MAX_SUBSCRIPTIONS = 100
+DEFAULT_BACKFILL_CHUNK = 100
+DEFAULT_BACKFILL_MAX = 1000
 
-        # Debe estar autenticado y ser participante
-        if not self.user or not await self._is_participant(self.conversation_id, self.user.id):
-            await self.close()
-            return
 
-        # ⛔ Bloqueo en 1:1: si existe, se rechaza la conexión
-        if await self._is_one_to_one(self.conversation_id):
-            other_id = await self._get_other_participant_id(self.conversation_id, self.user.id)
-            if other_id and await self._is_blocked(self.user.id, other_id):
-                await self.close()
-                return
+class BaseChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Lógica común de los sockets de chat: suscripción a conversaciones con su
+    caché de autorización y acciones (message, read, typing) sobre ellas.
 
-        await self.channel_layer.group_add(self.group_name, self.channel_name)
-        await self.accept()
+    ``self.subscriptions``: {conversation_id: access}, donde access es la caché
+    de autorización cargada al suscribirse y refrescada con eventos "chat.access".
+
+    Reanudación: con ``resume_from=<message_id>`` se envían los mensajes
+    posteriores en tramos {"type": "backfill"} de ``CHAT_BACKFILL_CHUNK`` y luego
+    {"type": "backfill.done"}; después siguen los eventos en vivo. Si faltan más
+    de ``CHAT_BACKFILL_MAX`` se corta con "truncated": true y el cliente sigue
+    por REST (?after=<last_id>).
+    """
 
     async def disconnect(self, code):
-        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        for conv_id in list(getattr(self, "subscriptions", {})):
+            await self.channel_layer.group_discard(conversation_group(conv_id), self.channel_name)
 
-    async def receive_json(self, content, **kwargs):
-        action = content.get("action")
+    # ----------------------
+    # Suscripciones
+    # ----------------------
+    async def subscribe(self, conv_id):
+        """Devuelve None si se suscribe o el motivo del rechazo."""
+        access = await self._load_access(conv_id, self.user.id)
+        # Debe ser participante y, en 1:1, sin bloqueo activo
+        if not access["is_participant"]:
+            return "No perteneces a esta conversación."
+        if access["blocked"]:
+            return "Bloqueo activo en esta conversación."
+        self.subscriptions[conv_id] = access
+        await self.channel_layer.group_add(conversation_group(conv_id), self.channel_name)
+        return None
+
+    async def unsubscribe(self, conv_id):
+        self.backfilled.pop(conv_id, None)
+        if self.subscriptions.pop(conv_id, None) is not None:
+            await self.channel_layer.group_discard(conversation_group(conv_id), self.channel_name)
+
+    async def access_revoked(self, conv_id):
+        await self.unsubscribe(conv_id)
+
+    # ----------------------
+    # Reanudación tras reconexión
+    # ----------------------
+    async def backfill(self, conv_id, resume_from):
+        """Llamar ya suscrito: los eventos en vivo quedan en cola mientras tanto."""
+        try:
+            anchor = await self._message_anchor(conv_id, int(resume_from))
+        except (TypeError, ValueError):
+            anchor = None
+        if anchor is None:
+            await self.send_json({"type": "error", "conversation_id": conv_id,
+                                  "detail": "resume_from no pertenece a esta conversación."})
+            return
+
+        chunk = getattr(settings, "CHAT_BACKFILL_CHUNK", DEFAULT_BACKFILL_CHUNK)
+        limit = getattr(settings, "CHAT_BACKFILL_MAX", DEFAULT_BACKFILL_MAX)
+        sent, truncated = 0, False
+        while True:
+            if sent >= limit:
+                truncated = True
+                break
+            size = min(chunk, limit - sent)
+            rows = await self._messages_after(conv_id, anchor, size)
+            if not rows:
+                break
+            await self.send_json({
+                "type": "backfill",
+                "conversation_id": conv_id,
+                "messages": [self._serialize_row(r) for r in rows],
+            })
+            sent += len(rows)
+            anchor = (rows[-1]["created_at"], rows[-1]["id"])
+            if len(rows) < size:
+                break
+
+        # Los message.new en cola que ya iban en el backfill se descartan
+        self.backfilled[conv_id] = anchor[1]
+        await self.send_json({
+            "type": "backfill.done",
+            "conversation_id": conv_id,
+            "count": sent,
+            "last_id": anchor[1],
+            "truncated": truncated,
+        })
+
+    @staticmethod
+    def _serialize_row(row):
+        return {
+            "id": row["id"],
+            "content": row["content"],
+            "sender": {"id": row["sender_id"], "username": row["sender__username"]},
+            "created_at": row["created_at"].isoformat(),
+        }
+
+    # ----------------------
+    # Acciones sobre una conversación suscrita
+    # ----------------------
+    async def handle_action(self, conv_id, action, content):
+        access = self.subscriptions[conv_id]
 
         if action == "message":
             text = (content.get("content") or "").strip()
-            if text:
-                # ⛔ Check bloqueo 1:1
-                if await self._is_one_to_one(self.conversation_id):
-                    other_id = await self._get_other_participant_id(self.conversation_id, self.user.id)
-                    if other_id and await self._is_blocked(self.user.id, other_id):
-                        await self.send_json({"type": "error", "detail": "Bloqueo activo: no puedes enviar mensajes."})
-                        return
-
-                msg = await self._create_message(self.conversation_id, self.user.id, text)
-                await self.channel_layer.group_send(self.group_name, {
-                    "type": "chat.message",
-                    "event": "message.new",
-                    "message": {
-                        "id": msg["id"],
-                        "content": msg["content"],
-                        "sender": {"id": msg["sender_id"], "username": msg["sender_username"]},
-                        "created_at": msg["created_at"].isoformat(),
-                    },
-                })
+            if not text:
+                return
+            # ⛔ Check bloqueo 1:1 (desde la caché de la conexión, sin consultas)
+            if access["blocked"]:
+                await self.send_json({"type": "error", "conversation_id": conv_id,
+                                      "detail": "Bloqueo activo: no puedes enviar mensajes."})
+                return
 
-        elif action == "read":
-            await self._mark_read(self.conversation_id, self.user.id)
-            await self.channel_layer.group_send(self.group_name, {
-                "type": "chat.message",
-                "event": "conversation.read",
-                "by": self.user.id,
-                "at": timezone.now().isoformat(),
+            # 📥 El aviso al inbox del resto (sin consultas: caché de acceso) se guarda
+            # en el outbox junto con el lote de mensajes: una inserción por lote
+            recipients = [uid for uid in access["participant_ids"] if uid != self.user.id]
+            try:
+                msg = await self._create_message(conv_id, self.user.id, text, recipients)
+            except Exception:
+                await self.send_json({"type": "error", "conversation_id": conv_id,
+                                      "detail": "No se pudo guardar el mensaje."})
+                return
+
+            # ✅ Confirmación al emisor con el id asignado
+            await self.send_json({
+                "type": "message.ack",
+                "conversation_id": conv_id,
+                "id": msg["id"],
+                "client_id": content.get("client_id"),
             })
+            await self.channel_layer.group_send(conversation_group(conv_id), message_new_event(conv_id, {
+                "id": msg["id"],
+                "content": msg["content"],
+                "sender": {"id": msg["sender_id"], "username": msg["sender_username"]},
+                "created_at": msg["created_at"].isoformat(),
+            }))
+
+        elif action == "read":
+            # Como mucho una escritura + difusión por ventana (chat.throttling)
+            await fanout_throttle.read((conv_id, self.user.id), partial(self._flush_read, conv_id))
 
         elif action == "typing.start":
-            await self.channel_layer.group_send(self.group_name, {
-                "type": "chat.message",
-                "event": "typing.start",
-                "by": self.user.id,
-                "at": timezone.now().isoformat(),
-            })
+            await fanout_throttle.typing_start(
+                (conv_id, self.user.id),
+                partial(self._broadcast_typing, conv_id, "typing.start"),
+                partial(self._broadcast_typing, conv_id, "typing.stop"),
+            )
 
         elif action == "typing.stop":
-            await self.channel_layer.group_send(self.group_name, {
-                "type": "chat.message",
-                "event": "typing.stop",
-                "by": self.user.id,
-                "at": timezone.now().isoformat(),
-            })
+            await fanout_throttle.typing_stop(
+                (conv_id, self.user.id), partial(self._broadcast_typing, conv_id, "typing.stop")
+            )
 
+    async def _flush_read(self, conv_id, at):
+        await self._mark_read(conv_id, self.user.id, at)
+        await self.channel_layer.group_send(conversation_group(conv_id), {
+            "type": "chat.message",
+            "event": "conversation.read",
+            "conversation_id": conv_id,
+            "by": self.user.id,
+            "at": at.isoformat(),
+        })
+
+    async def _broadcast_typing(self, conv_id, event):
+        await self.channel_layer.group_send(conversation_group(conv_id), {
+            "type": "chat.message",
+            "event": event,
+            "conversation_id": conv_id,
+            "by": self.user.id,
+            "at": timezone.now().isoformat(),
+        })
+
+    # ----------------------
+    # Eventos de la capa de canales
+    # ----------------------
     async def chat_message(self, event):
+        conv_id = event.get("conversation_id")
+        if event.get("event") == "message.new" and conv_id in self.backfilled:
+            if event["message"]["id"] <= self.backfilled[conv_id]:
+                return  # ya enviado en el backfill
+            del self.backfilled[conv_id]
         await self.send_json(event)
 
+    async def chat_access(self, event):
+        # Cambió la conversación, sus participantes o un bloqueo: recargar la caché
+        conv_id = int(event["conversation_id"])
+        if conv_id not in self.subscriptions:
+            return
+        access = await self._load_access(conv_id, self.user.id)
+        if not access["is_participant"]:
+            await self.access_revoked(conv_id)
+        else:
+            self.subscriptions[conv_id] = access
+
     # ----------------------
     # DB helpers (sync -> async)
     # ----------------------
     @database_sync_to_async
-    def _is_participant(self, conv_id, user_id):
-        return ConversationParticipant.objects.filter(conversation_id=conv_id, user_id=user_id).exists()
-
-    @database_sync_to_async
-    def _is_one_to_one(self, conv_id):
-        try:
-            return not Conversation.objects.values_list("is_group", flat=True).get(pk=conv_id)
-        except Conversation.DoesNotExist:
-            return False
+    def _load_access(self, conv_id, user_id):
+        is_group = (Conversation.objects
+                    .filter(pk=conv_id)
+                    .values_list("is_group", flat=True)
+                    .first())
+        participant_ids = frozenset(ConversationParticipant.objects
+                                    .filter(conversation_id=conv_id)
+                                    .values_list("user_id", flat=True))
+        blocked = False
+        if is_group is False:
+            other_id = next((uid for uid in participant_ids if uid != user_id), None)
+            blocked = bool(other_id) and is_blocked_either(user_id, other_id)
+        return {
+            "is_group": bool(is_group),
+            "participant_ids": participant_ids,
+            "is_participant": user_id in participant_ids,
+            "blocked": blocked,
+        }
 
     @database_sync_to_async
-    def _get_other_participant_id(self, conv_id, current_user_id):
-        return (ConversationParticipant.objects
-                .filter(conversation_id=conv_id)
-                .exclude(user_id=current_user_id)
-                .values_list("user_id", flat=True)
+    def _message_anchor(self, conv_id, message_id):
+        return (Message.objects
+                .filter(pk=message_id, conversation_id=conv_id)
+                .values_list("created_at", "id")
                 .first())
 
     @database_sync_to_async
-    def _is_blocked(self, a_id, b_id):
-        return is_blocked_either(a_id, b_id)
+    def _messages_after(self, conv_id, anchor, size):
+        qs = Message.objects.filter(conversation_id=conv_id, is_deleted=False)
+        return list(keyset_filter(qs, *anchor, direction=NEWER)
+                    .values("id", "content", "sender_id", "sender__username", "created_at")[:size])
 
-    @database_sync_to_async
-    def _create_message(self, conv_id, user_id, content):
-        m = Message.objects.create(conversation_id=conv_id, sender_id=user_id, content=content)
-        return {
-            "id": m.id,
-            "content": m.content,
-            "sender_id": m.sender_id,
-            "sender_username": m.sender.username,
-            "created_at": m.created_at,
-        }
+    async def _create_message(self, conv_id, user_id, content, recipients=()):
+        # Se agrupa con los mensajes del resto de consumers en un bulk_create
+        return await message_buffer.submit(conv_id, user_id, content, recipients)
 
     @database_sync_to_async
-    def _mark_read(self, conv_id, user_id):
-        ConversationParticipant.objects.filter(conversation_id=conv_id, user_id=user_id)\
-            .update(last_read_at=timezone.now())
\ No newline at end of file
+    def _mark_read(self, conv_id, user_id, at):
+        counters.mark_read(conv_id, user_id, at)
+
+
+class ChatConsumer(BaseChatConsumer):
+    """
+    ws/chat/<conversation_id>/ — un socket por conversación.
+    """
+    async def connect(self):
+        self.user = self.scope.get("user")
+        self.conversation_id = int(self.scope["url_route"]["kwargs"]["conversation_id"])
+        self.subscriptions = {}
+        self.backfilled = {}
+
+        if not self.user or await self.subscribe(self.conversation_id):
+            await self.close()
+            return
+        await self.accept()
+
+        # ?resume_from=<message_id>: mensajes perdidos desde el último visto
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        resume_from = (query.get("resume_from") or [None])[0]
+        if resume_from:
+            await self.backfill(self.conversation_id, resume_from)
+
+    async def receive_json(self, content, **kwargs):
+        await self.handle_action(self.conversation_id, content.get("action"), content)
+
+    async def access_revoked(self, conv_id):
+        await super().access_revoked(conv_id)
+        await self.close()
+
+
+class ChatMuxConsumer(BaseChatConsumer):
+    """
+    ws/chat/ — un único socket por usuario para todas sus conversaciones.
+
+    Acciones (JSON):
+    - {"action": "subscribe" | "unsubscribe", "conversation_id": N[, "resume_from": id]}
+    - {"action": "message" | "read" | "typing.start" | "typing.stop", "conversation_id": N, ...}
+    Además recibe los eventos de su inbox (grupo user_<id>): conversation.new, inbox.unread.
+    """
+    async def connect(self):
+        self.user = self.scope.get("user")
+        self.subscriptions = {}
+        self.backfilled = {}
+        if not self.user:
+            await self.close()
+            return
+        self.inbox_group = user_group(self.user.id)
+        await self.channel_layer.group_add(self.inbox_group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        await super().disconnect(code)
+        if getattr(self, "inbox_group", None):
+            await self.channel_layer.group_discard(self.inbox_group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        action = content.get("action")
+        try:
+            conv_id = int(content.get("conversation_id"))
+        except (TypeError, ValueError):
+            await self.send_json({"type": "error", "detail": "conversation_id requerido."})
+            return
+
+        if action == "subscribe":
+            if conv_id in self.subscriptions:
+                error = None
+            elif len(self.subscriptions) >= self.max_subscriptions:
+                error = f"Máximo {self.max_subscriptions} conversaciones por conexión."
+            else:
+                error = await self.subscribe(conv_id)
+            if error:
+                await self.send_json({"type": "error", "conversation_id": conv_id, "detail": error})
+                return
+            await self.send_json({"type": "subscribed", "conversation_id": conv_id})
+            if content.get("resume_from"):
+                await self.backfill(conv_id, content["resume_from"])
+
+        elif action == "unsubscribe":
+            await self.unsubscribe(conv_id)
+            await self.send_json({"type": "unsubscribed", "conversation_id": conv_id})
+
+        elif conv_id not in self.subscriptions:
+            await self.send_json({"type": "error", "conversation_id": conv_id,
+                                  "detail": "No estás suscrito a esta conversación."})
+        else:
+            await self.handle_action(conv_id, action, content)
+
+    async def access_revoked(self, conv_id):
+        await super().access_revoked(conv_id)
+        await self.send_json({"type": "unsubscribed", "conversation_id": conv_id,
+                              "detail": "Ya no tienes acceso a esta conversación."})
+
+    @property
+    def max_subscriptions(self):
+        return getattr(settings, "CHAT_MAX_SUBSCRIPTIONS", DEFAULT_MAX_SUBSCRIPTIONS)
@@ -0,0 +1,77 @@
+# backend-tkd-main/chat/counters.py
+"""
+Mantenimiento de los campos desnormalizados del inbox:
+``Conversation.last_message/last_message_at`` y ``ConversationParticipant.unread_count``.
+
+Se llaman dentro de la misma transacción que crea los mensajes, de modo que
+los contadores nunca divergen de la tabla de mensajes.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Conversation, ConversationParticipant, Message
+
+
+def record_new_messages(messages):
+    """Actualiza puntero de último mensaje y no leídos: un UPDATE de cada tipo por conversación."""
+    by_conversation = defaultdict(list)
+    for m in messages:
+        by_conversation[m.conversation_id].append(m)
+
+    for conv_id, msgs in by_conversation.items():
+        last = max(msgs, key=lambda m: (m.created_at, m.id))
+        (Conversation.objects
+         .filter(pk=conv_id)
+         .filter(Q(last_message_at__isnull=True) | Q(last_message_at__lte=last.created_at))
+         .update(last_message_id=last.id, last_message_at=last.created_at))
+
+        # Cada participante suma los mensajes del lote que no envió él
+        per_sender = Counter(m.sender_id for m in msgs)
+        own = Case(*[When(user_id=uid, then=Value(n)) for uid, n in per_sender.items()], default=Value(0))
+        (ConversationParticipant.objects
+         .filter(conversation_id=conv_id)
+         .update(unread_count=F("unread_count") + Value(len(msgs)) - own))
+
+
+def mark_read(conversation_id, user_id, at):
+    """
+    Marca como leído hasta ``at``. Los mensajes ajenos posteriores siguen contando
+    como no leídos (lecturas diferidas por chat.throttling) y nunca se retrocede
+    un ``last_read_at`` más reciente.
+    """
+    (ConversationParticipant.objects
+     .filter(conversation_id=conversation_id, user_id=user_id)
+     .filter(Q(last_read_at__isnull=True) | Q(last_read_at__lt=at))
+     .update(last_read_at=at, unread_count=Coalesce(Subquery(_unread_after(at)), 0)))
+
+
+def _unread_after(at):
+    """Subconsulta: mensajes ajenos no borrados de la conversación posteriores a ``at``."""
+    return (Message.objects
+            .filter(conversation=OuterRef("conversation_id"), is_deleted=False, created_at__gt=at)
+            .exclude(sender=OuterRef("user_id"))
+            .order_by()
+            .values("conversation")
+            .annotate(n=Count("id"))
+            .values("n"))
+
+
+def rebuild(conversation_ids=None):
+    """Recalcula todos los campos desnormalizados a partir de la tabla de mensajes."""
+    conversations = Conversation.objects.all()
+    participants = ConversationParticipant.objects.all()
+    if conversation_ids is not None:
+        conversations = conversations.filter(pk__in=conversation_ids)
+        participants = participants.filter(conversation_id__in=conversation_ids)
+
+    last = (Message.objects
+            .filter(conversation=OuterRef("pk"), is_deleted=False)
+            .order_by("-created_at", "-id"))
+    conversations.update(
+        last_message_id=Subquery(last.values("id")[:1]),
+        last_message_at=Subquery(last.values("created_at")[:1]),
+    )
+
+    participants.update(unread_count=Coalesce(Subquery(_unread_after(OuterRef("last_read_at"))), 0))
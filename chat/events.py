@@ -0,0 +1,47 @@
+# backend-tkd-main/chat/events.py
+"""
+Helpers para emitir eventos a los grupos de la capa de canales.
+"""
+
+
+def conversation_group(conversation_id) -> str:
+    return f"conv_{conversation_id}"
+
+
+def user_group(user_id) -> str:
+    """Inbox del usuario: lo escucha su socket multiplexado (ws/chat/)."""
+    return f"user_{user_id}"
+
+
+def message_new_event(conversation_id, message: dict) -> dict:
+    """Evento "message.new" común al WS y a REST."""
+    return {
+        "type": "chat.message",
+        "event": "message.new",
+        "conversation_id": conversation_id,
+        "message": message,
+    }
+
+
+def inbox_unread_event(conversation_id, message_id) -> dict:
+    """Evento "inbox.unread" para el grupo de cada destinatario (user_<id>)."""
+    return {
+        "type": "chat.message",
+        "event": "inbox.unread",
+        "conversation_id": conversation_id,
+        "message_id": message_id,
+    }
+
+
+def notify_access_changed(conversation_id):
+    """
+    Avisa a los consumers de la conversación de que su caché de autorización
+    (tipo, participantes, bloqueos) ya no es válida. Va por el outbox: se
+    guarda en la transacción del cambio y se envía fuera de la petición.
+    """
+    from . import outbox
+
+    outbox.enqueue(conversation_group(conversation_id), {
+        "type": "chat.access",
+        "conversation_id": conversation_id,
+    })
@@ -0,0 +1,224 @@
+# backend-tkd-main/chat/layers.py
+"""
+Capa de canales local (en proceso), sin Redis.
+
+Pensada para despliegues de un solo proceso ASGI y para los tests. No comparte
+mensajes entre procesos: con varios workers hay que seguir usando Redis.
+Para que eso no pase en silencio, con ``single_process_lock`` (ruta de un
+fichero; ``CHAT_LOCAL_LAYER_LOCK`` en settings) la capa toma un flock exclusivo
+al crearse y un segundo proceso que intente usarla falla con
+``ImproperlyConfigured`` en vez de perder mensajes.
+
+Frente a ``channels.layers.InMemoryChannelLayer``:
+- la limpieza de caducados no recorre todos los canales en cada envío, sino
+  como mucho una vez por ``sweep_interval``;
+- ``group_send`` copia el mensaje una sola vez y lo reparte en una pasada;
+- las colas por canal están acotadas (``capacity``/``channel_capacity``) y
+  los descartes quedan contados en ``stats()``;
+- los envíos hechos desde otro hilo/event loop (p. ej. el despachador del
+  outbox) se reenvían al loop donde reciben los consumers.
+"""
+import asyncio
+import os
+import time
+import uuid
+from collections import Counter
+from copy import deepcopy
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin comprobación
+    fcntl = None
+
+_process_locks = {}  # ruta -> (pid, fichero con el flock)
+
+
+def claim_single_process(path):
+    """Garantiza que solo un proceso usa la capa local asociada a ``path``."""
+    if fcntl is None:
+        return
+    held = _process_locks.get(path)
+    if held is not None:
+        if held[0] == os.getpid():
+            return
+        # Heredado por fork (p. ej. gunicorn --preload): ya hay otro proceso con la capa
+        raise ImproperlyConfigured(_MULTI_PROCESS_ERROR)
+    fh = open(path, "a+")
+    try:
+        fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        fh.close()
+        raise ImproperlyConfigured(_MULTI_PROCESS_ERROR) from None
+    _process_locks[path] = (os.getpid(), fh)
+
+
+_MULTI_PROCESS_ERROR = (
+    "CHANNEL_LAYER_BACKEND=local con más de un proceso: los mensajes no se comparten "
+    "entre workers. Usa un solo worker ASGI o la capa de Redis."
+)
+
+
+class LocalChannelLayer(BaseChannelLayer):
+    extensions = ["groups", "flush"]
+
+    def __init__(self, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None,
+                 sweep_interval=1.0, single_process_lock=None, **kwargs):
+        if single_process_lock:
+            claim_single_process(single_process_lock)
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity, **kwargs)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.group_expiry = group_expiry
+        self.sweep_interval = sweep_interval
+        self.channels = {}  # canal -> asyncio.Queue de (caduca_en, mensaje)
+        self.groups = {}    # grupo -> {canal: unido_en}
+        self.metrics = Counter()
+        self._last_sweep = 0.0
+        self._home_loop = None  # loop de los consumers (el primero que recibe)
+
+    # Channel layer API
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        assert "__asgi_channel__" not in message
+        if self._is_foreign_loop():
+            return await self._run_in_home_loop(self.send(channel, message))
+
+        self._maybe_sweep()
+        if not self._put(channel, time.monotonic() + self.expiry, deepcopy(message)):
+            raise ChannelFull(channel)
+        self.metrics["sent"] += 1
+
+    async def receive(self, channel):
+        assert self.valid_channel_name(channel)
+        if self._home_loop is None or self._home_loop.is_closed():
+            self._home_loop = asyncio.get_running_loop()
+        queue = self._queue(channel)
+        try:
+            while True:
+                expires_at, message = await queue.get()
+                if expires_at >= time.monotonic():
+                    break
+                self.metrics["expired"] += 1
+        finally:
+            if queue.empty() and self.channels.get(channel) is queue:
+                del self.channels[channel]
+        self.metrics["received"] += 1
+        return message
+
+    async def new_channel(self, prefix="specific."):
+        return f"{prefix}.local!{uuid.uuid4().hex[:12]}"
+
+    # Groups extension
+
+    async def group_add(self, group, channel):
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        self.groups.setdefault(group, {})[channel] = time.monotonic()
+
+    async def group_discard(self, group, channel):
+        assert self.valid_channel_name(channel), "Invalid channel name"
+        assert self.valid_group_name(group), "Invalid group name"
+        members = self.groups.get(group)
+        if members is not None:
+            members.pop(channel, None)
+            if not members:
+                del self.groups[group]
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "Message is not a dict"
+        assert self.valid_group_name(group), "Invalid group name"
+        if self._is_foreign_loop():
+            return await self._run_in_home_loop(self.group_send(group, message))
+
+        self._maybe_sweep()
+        self.metrics["group_sends"] += 1
+        members = self.groups.get(group)
+        if not members:
+            return
+        # Una sola copia compartida por todos los destinatarios (los consumers no la mutan)
+        payload = deepcopy(message)
+        expires_at = time.monotonic() + self.expiry
+        for channel in members:
+            if self._put(channel, expires_at, payload):
+                self.metrics["delivered"] += 1
+
+    # Flush extension
+
+    async def flush(self):
+        self.channels = {}
+        self.groups = {}
+        self.metrics.clear()
+
+    async def close(self):
+        pass
+
+    # Métricas
+
+    def stats(self):
+        return {
+            **self.metrics,
+            "channels": len(self.channels),
+            "groups": len(self.groups),
+            "queued": sum(q.qsize() for q in self.channels.values()),
+        }
+
+    # Internos
+
+    def _is_foreign_loop(self):
+        home = self._home_loop
+        return home is not None and home.is_running() and home is not asyncio.get_running_loop()
+
+    async def _run_in_home_loop(self, coro):
+        # Las colas asyncio no son thread-safe: el envío se ejecuta en el loop de los consumers
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._home_loop))
+
+    def _queue(self, channel):
+        queue = self.channels.get(channel)
+        if queue is None:
+            queue = self.channels[channel] = asyncio.Queue(maxsize=self.get_capacity(channel))
+        return queue
+
+    def _put(self, channel, expires_at, message):
+        try:
+            self._queue(channel).put_nowait((expires_at, message))
+        except asyncio.QueueFull:
+            self.metrics["dropped_full"] += 1
+            return False
+        return True
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+
+        # Mensajes caducados: el canal se da por muerto y sale de sus grupos
+        for channel, queue in list(self.channels.items()):
+            pending = queue._queue
+            if pending and pending[0][0] < now:
+                while pending and pending[0][0] < now:
+                    queue.get_nowait()
+                    self.metrics["expired"] += 1
+                self._remove_from_groups(channel)
+                if queue.empty():
+                    del self.channels[channel]
+
+        # Pertenencias a grupos caducadas
+        limit = now - self.group_expiry
+        for group, members in list(self.groups.items()):
+            for channel, joined_at in list(members.items()):
+                if joined_at < limit:
+                    del members[channel]
+            if not members:
+                del self.groups[group]
+
+    def _remove_from_groups(self, channel):
+        for group, members in list(self.groups.items()):
+            members.pop(channel, None)
+            if not members:
+                del self.groups[group]
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from chat.outbox import dispatch_pending
+
+
+class Command(BaseCommand):
+    help = "Envía a la capa de canales los eventos pendientes del outbox del chat."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Seguir drenando indefinidamente.")
+        parser.add_argument("--interval", type=float, default=0.5, help="Espera entre pasadas con --loop (s).")
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        while True:
+            sent = dispatch_pending(options["batch_size"])
+            if not options["loop"]:
+                self.stdout.write(self.style.SUCCESS(f"{sent} eventos enviados."))
+                return
+            if not sent:
+                time.sleep(options["interval"])
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from chat import counters
+
+
+class Command(BaseCommand):
+    help = "Recalcula last_message/last_message_at de las conversaciones y unread_count de los participantes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--conversation", type=int, action="append", dest="conversations",
+                            help="Limitar a esta conversación (se puede repetir).")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            counters.rebuild(options["conversations"])
+        self.stdout.write(self.style.SUCCESS("Contadores del chat recalculados."))
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0002_alter_conversationparticipant_last_read_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversation",
+            name="last_message",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="chat.message",
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="last_message_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="conversationparticipant",
+            name="unread_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0003_denormalized_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="conversationparticipant",
+            index=models.Index(
+                fields=["user", "conversation"], name="chat_part_user_conv_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["conversation", "-created_at", "-id"],
+                name="chat_msg_timeline_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["sender", "-created_at"], name="chat_msg_sender_idx"
+            ),
+        ),
+    ]
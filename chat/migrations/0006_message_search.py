@@ -0,0 +1,68 @@
+from django.db import migrations
+
+# SQLite: FTS5 external content sobre chat_message, mantenido por triggers
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE chat_message_fts USING fts5(
+        content, content='chat_message', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER chat_message_fts_ai AFTER INSERT ON chat_message BEGIN
+        INSERT INTO chat_message_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER chat_message_fts_ad AFTER DELETE ON chat_message BEGIN
+        INSERT INTO chat_message_fts(chat_message_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER chat_message_fts_au AFTER UPDATE OF content ON chat_message BEGIN
+        INSERT INTO chat_message_fts(chat_message_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO chat_message_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    "INSERT INTO chat_message_fts(chat_message_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS chat_message_fts_au",
+    "DROP TRIGGER IF EXISTS chat_message_fts_ad",
+    "DROP TRIGGER IF EXISTS chat_message_fts_ai",
+    "DROP TABLE IF EXISTS chat_message_fts",
+]
+
+# PostgreSQL: tsvector generado + GIN (el modelo no lo declara: es solo del motor)
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE chat_message ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('spanish', coalesce(content, ''))) STORED
+    """,
+    "CREATE INDEX chat_msg_search_gin ON chat_message USING GIN (search_vector)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS chat_msg_search_gin",
+    "ALTER TABLE chat_message DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0005_outbox_event"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            _run({"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0006_message_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxevent",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 
 User = settings.AUTH_USER_MODEL
@@ -13,6 +14,10 @@ class Conversation(models.Model):
     # cuando la conversación sea 1:1 (ordenado por id de usuario)
     one_to_one_key = models.CharField(max_length=255, blank=True, db_index=True)
 
+    # Desnormalizado: puntero al último mensaje (ver chat.counters)
+    last_message = models.ForeignKey("Message", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    last_message_at = models.DateTimeField(null=True, blank=True)
+
     def __str__(self):
         return self.name or f"Conv {self.pk}"
 
@@ -22,9 +27,15 @@ class ConversationParticipant(models.Model):
     joined_at = models.DateTimeField(auto_now_add=True)
     # Para contadores de no leídos
     last_read_at = models.DateTimeField(default=timezone.make_aware(timezone.datetime.min))
+    # Desnormalizado: mensajes de otros posteriores a last_read_at (ver chat.counters)
+    unread_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         unique_together = ("conversation", "user")
+        indexes = [
+            # Comprobaciones de participación e inbox: filtran primero por usuario
+            models.Index(fields=["user", "conversation"], name="chat_part_user_conv_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} in {self.conversation_id}"
@@ -40,14 +51,33 @@ class Message(models.Model):
 
     class Meta:
         ordering = ["-created_at"]  # latest first
+        indexes = [
+            # Timeline (MessageViewSet + paginación por cursor): solo mensajes vivos
+            models.Index(
+                fields=["conversation", "-created_at", "-id"],
+                condition=Q(is_deleted=False),
+                name="chat_msg_timeline_idx",
+            ),
+            models.Index(fields=["sender", "-created_at"], name="chat_msg_sender_idx"),
+        ]
 
     def __str__(self):
         return f"Msg {self.pk} by {self.sender_id}"
 
-# Índices útiles (opcional, pero recomendado para escalar)
-# from django.db.models import Index
-# class Meta:
-#     indexes = [
-#         Index(fields=["conversation", "-created_at"]),
-#         Index(fields=["sender", "-created_at"]),
-#     ]
+class OutboxEvent(models.Model):
+    """
+    Evento realtime pendiente de enviar a la capa de canales (patrón outbox).
+    Se inserta en la misma transacción que el cambio que lo origina y lo drena
+    chat.outbox en segundo plano. ``claimed_at`` marca el lease de quien lo está
+    enviando; la fila solo se borra cuando el envío ha ido bien.
+    """
+    group = models.CharField(max_length=100)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"Outbox {self.pk} → {self.group}"
@@ -0,0 +1,136 @@
+# backend-tkd-main/chat/outbox.py
+"""
+Outbox transaccional para los eventos realtime emitidos desde REST/servicios.
+
+``enqueue`` guarda el evento en la misma transacción que el cambio de datos:
+si hay rollback no se emite nada y si hay commit el evento no se pierde.
+Tras el commit se despierta un hilo despachador que drena la tabla por lotes
+hacia la capa de canales, así la latencia de la petición no incluye Redis.
+
+En despliegues con un proceso aparte se puede usar ``manage.py dispatch_outbox``
+(y desactivar el hilo con ``CHAT_OUTBOX_AUTODISPATCH = False``).
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_POLL_INTERVAL = 5.0  # segundos; red de seguridad si se pierde un aviso
+DEFAULT_LEASE = 60.0  # segundos que un lote reclamado queda reservado
+
+
+def enqueue(group: str, event: dict):
+    OutboxEvent.objects.create(group=group, payload=event)
+    transaction.on_commit(dispatcher.wake)
+
+
+def enqueue_many(items):
+    """items: iterable de (group, event)."""
+    OutboxEvent.objects.bulk_create([OutboxEvent(group=g, payload=e) for g, e in items])
+    transaction.on_commit(dispatcher.wake)
+
+
+async def _send_batch(pending):
+    """Envía y va sacando de ``pending``: si algo falla, en la lista queda lo no enviado."""
+    channel_layer = get_channel_layer()
+    while pending:
+        ev = pending[0]
+        await channel_layer.group_send(ev.group, ev.payload)
+        pending.pop(0)
+
+
+def dispatch_pending(batch_size=None) -> int:
+    """
+    Envía los eventos pendientes por lotes, en orden de inserción. Devuelve cuántos envió.
+    Cada lote se reclama (lease con ``claimed_at``) en una transacción corta y se
+    envía fuera de ella: ni la conexión ni los bloqueos esperan a la capa de
+    canales. Las filas solo se borran tras enviarse; si el envío falla se libera
+    el lease de lo no enviado, y si el proceso muere el lease caduca a los
+    ``CHAT_OUTBOX_LEASE`` segundos y otro despachador lo reintenta. La entrega es
+    por tanto "al menos una vez".
+    """
+    batch_size = batch_size or getattr(settings, "CHAT_OUTBOX_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+    total = 0
+    while True:
+        batch = _claim(batch_size)
+        if not batch:
+            return total
+        pending = list(batch)
+        try:
+            async_to_sync(_send_batch)(pending)
+        finally:
+            unsent = {ev.id for ev in pending}
+            OutboxEvent.objects.filter(id__in=[ev.id for ev in batch if ev.id not in unsent]).delete()
+            if unsent:
+                OutboxEvent.objects.filter(id__in=unsent).update(claimed_at=None)
+        total += len(batch)
+
+
+def _claim(batch_size):
+    now = timezone.now()
+    expired = now - timedelta(seconds=getattr(settings, "CHAT_OUTBOX_LEASE", DEFAULT_LEASE))
+    with transaction.atomic():
+        batch = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=expired))[:batch_size]
+        )
+        if batch:
+            OutboxEvent.objects.filter(id__in=[ev.id for ev in batch]).update(claimed_at=now)
+    return batch
+
+
+class OutboxDispatcher:
+    """Hilo en segundo plano (uno por proceso) que drena el outbox cuando se le avisa."""
+
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def wake(self):
+        if not getattr(settings, "CHAT_OUTBOX_AUTODISPATCH", True):
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="chat-outbox", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def _run(self):
+        poll = getattr(settings, "CHAT_OUTBOX_POLL_INTERVAL", DEFAULT_POLL_INTERVAL)
+        while not self._stop.is_set():
+            self._wakeup.wait(timeout=poll)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            try:
+                dispatch_pending()
+            except Exception:
+                logger.exception("Error despachando el outbox del chat")
+            finally:
+                close_old_connections()
+
+    def stop(self, timeout=5):
+        """Detiene el hilo (apagado ordenado y tests)."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._wakeup.set()
+            thread.join(timeout)
+
+
+dispatcher = OutboxDispatcher()
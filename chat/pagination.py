@@ -1,8 +1,151 @@
 # backend-tkd-main/chat/pagination.py
-from rest_framework.pagination import CursorPagination
+import base64
+import json
+from datetime import datetime
 
-class MessageCursorPagination(CursorPagination):
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+OLDER = "older"
+NEWER = "newer"
+
+
+def keyset_filter(queryset, created_at, pk, direction=OLDER):
+    """
+    Filtra por la clave compuesta (created_at, id) respecto a un ancla, sin OFFSET.
+    El rango redundante sobre created_at permite al planificador usar el índice del timeline.
+    """
+    if direction == NEWER:
+        return (queryset
+                .filter(created_at__gte=created_at)
+                .filter(Q(created_at__gt=created_at) | Q(id__gt=pk))
+                .order_by("created_at", "id"))
+    return (queryset
+            .filter(created_at__lte=created_at)
+            .filter(Q(created_at__lt=created_at) | Q(id__lt=pk))
+            .order_by("-created_at", "-id"))
+
+
+class MessageCursorPagination(BasePagination):
+    """
+    Paginación keyset sobre (created_at, id), de más reciente a más antiguo.
+
+    - ?cursor=<token>: token opaco de los enlaces next (más antiguos) / previous (más recientes).
+    - ?before=<message_id> / ?after=<message_id>: mensajes anteriores / posteriores a uno dado
+      (p. ej. para recuperar lo perdido tras una reconexión).
+    Los resultados siempre van ordenados por -created_at, -id.
+    """
     page_size = 30
     page_size_query_param = "page_size"
     max_page_size = 100
-    ordering = "-created_at"  # tie-break con -id en queryset
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Cursor inválido"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        anchor, direction = self.decode_anchor(request, queryset)
+        if anchor is None:
+            qs = queryset.order_by("-created_at", "-id")
+        else:
+            qs = keyset_filter(queryset, *anchor, direction=direction)
+
+        rows = list(qs[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if direction == NEWER:
+            rows.reverse()
+
+        self.next_anchor = self.previous_anchor = None
+        if rows:
+            newest, oldest = rows[0], rows[-1]
+            # Hay más antiguos si quedaban filas hacia atrás o si venimos de ellos
+            if (direction == OLDER and has_more) or (direction == NEWER and anchor is not None):
+                self.next_anchor = (oldest.created_at, oldest.id)
+            if (direction == NEWER and has_more) or (direction == OLDER and anchor is not None):
+                self.previous_anchor = (newest.created_at, newest.id)
+        elif anchor is not None:
+            # Página vacía: se puede volver desde el ancla en la dirección contraria
+            if direction == OLDER:
+                self.previous_anchor = anchor
+            else:
+                self.next_anchor = anchor
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_anchor(self, request, queryset):
+        params = request.query_params
+        token = params.get(self.cursor_query_param)
+        if token:
+            try:
+                data = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+                direction = data["d"] if data["d"] in (OLDER, NEWER) else OLDER
+                return (datetime.fromisoformat(data["t"]), int(data["i"])), direction
+            except (ValueError, KeyError, TypeError):
+                raise NotFound(self.invalid_cursor_message) from None
+
+        for param, direction in (("before", OLDER), ("after", NEWER)):
+            if params.get(param):
+                try:
+                    anchor = queryset.filter(pk=int(params[param])).values_list("created_at", "id").first()
+                except ValueError:
+                    anchor = None
+                if anchor is None:
+                    raise NotFound(self.invalid_cursor_message)
+                return anchor, direction
+        return None, OLDER
+
+    def encode_cursor(self, anchor, direction):
+        created_at, pk = anchor
+        token = base64.urlsafe_b64encode(
+            json.dumps({"t": created_at.isoformat(), "i": pk, "d": direction}).encode()
+        ).decode()
+        url = remove_query_param(remove_query_param(self.base_url, "before"), "after")
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def get_next_link(self):
+        return self.encode_cursor(self.next_anchor, OLDER) if self.next_anchor else None
+
+    def get_previous_link(self):
+        return self.encode_cursor(self.previous_anchor, NEWER) if self.previous_anchor else None
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {"name": self.cursor_query_param, "required": False, "in": "query",
+             "description": "Token de paginación (enlaces next/previous).", "schema": {"type": "string"}},
+            {"name": "before", "required": False, "in": "query",
+             "description": "Mensajes anteriores al id dado.", "schema": {"type": "integer"}},
+            {"name": "after", "required": False, "in": "query",
+             "description": "Mensajes posteriores al id dado.", "schema": {"type": "integer"}},
+            {"name": self.page_size_query_param, "required": False, "in": "query",
+             "description": "Tamaño de página (máx. 100).", "schema": {"type": "integer"}},
+        ]
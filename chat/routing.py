@@ -1,6 +1,7 @@
 from django.urls import re_path
-from .consumers import ChatConsumer
+from .consumers import ChatConsumer, ChatMuxConsumer
 
 websocket_urlpatterns = [
+    re_path(r"^ws/chat/$", ChatMuxConsumer.as_asgi()),
     re_path(r"^ws/chat/(?P<conversation_id>\d+)/$", ChatConsumer.as_asgi()),
 ]
@@ -0,0 +1,176 @@
+# backend-tkd-main/chat/search.py
+"""
+Búsqueda de texto completo en los mensajes del chat.
+
+Índice según el motor (ver migración 0006_message_search):
+- SQLite: tabla virtual FTS5 ``chat_message_fts`` (external content sobre
+  chat_message, tokenizer unicode61 sin acentos) mantenida por triggers, así que
+  también cubre los ``bulk_create`` del buffer de escritura y las ediciones.
+- PostgreSQL: columna generada ``search_vector`` (tsvector 'spanish') con GIN.
+- Otros motores: ``icontains`` (sin índice), solo como red de seguridad.
+
+Los triggers y la tabla FTS5 son SQL crudo que Django no conoce: si una
+migración futura hace que SQLite reconstruya ``chat_message`` (copiar a tabla
+nueva y renombrar, como en muchos AlterField/RemoveField), los triggers se
+pierden sin error y el índice deja de actualizarse. Hay que recrearlos en esa
+misma migración (sentencias ``SQLITE_FORWARD`` de la 0006, incluido el
+``rebuild``). ``manage.py check --database default`` lo detecta (chat.E001,
+ver chat.checks).
+
+Resultados: solo de conversaciones donde participa el usuario y sin mensajes
+borrados, ordenados por relevancia y paginados por keyset sobre (rank, id).
+El rank se redondea en SQL a ``RANK_DECIMALS`` y viaja en el cursor como texto
+decimal, así la igualdad del ancla es exacta: sin redondeo, en PostgreSQL
+ts_rank_cd es float4 y el parámetro llega como float8, y los empates se
+perderían o repetirían entre páginas.
+"""
+import base64
+import json
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection
+
+from .models import Message
+
+FTS_TABLE = "chat_message_fts"
+FTS_TRIGGERS = ("chat_message_fts_ai", "chat_message_fts_ad", "chat_message_fts_au")
+RANK_DECIMALS = 12
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(rank, pk) -> str:
+    rank = f"{Decimal(str(rank)):.{RANK_DECIMALS}f}"
+    return base64.urlsafe_b64encode(json.dumps({"r": rank, "i": pk}).encode()).decode()
+
+
+def decode_cursor(token):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        rank = Decimal(data["r"])
+        if not rank.is_finite():
+            raise ValueError(data["r"])
+        return rank, int(data["i"])
+    except (ValueError, KeyError, TypeError, InvalidOperation) as e:
+        raise InvalidCursor(token) from e
+
+
+def terms(q: str):
+    return _WORD_RE.findall(q or "")
+
+
+def _fts_query(words):
+    # Cada término entre comillas (sin sintaxis FTS del usuario); prefijo en el último
+    quoted = [f'"{w}"' for w in words]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def backend() -> str:
+    if connection.vendor == "postgresql":
+        return "postgresql"
+    if connection.vendor == "sqlite":
+        return "sqlite"
+    return "fallback"
+
+
+def missing_index_objects(conn=None) -> list:
+    """Nombres de la tabla/triggers (SQLite) o columna/índice (PostgreSQL) que faltan."""
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE (type = 'table' AND name = %s) OR "
+                "(type = 'trigger' AND tbl_name = 'chat_message')", [FTS_TABLE]
+            )
+            expected = (FTS_TABLE, *FTS_TRIGGERS)
+        elif conn.vendor == "postgresql":
+            cursor.execute(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_name = 'chat_message' AND column_name = 'search_vector' "
+                "UNION SELECT indexname FROM pg_indexes WHERE indexname = 'chat_msg_search_gin'"
+            )
+            expected = ("search_vector", "chat_msg_search_gin")
+        else:
+            return []
+        found = {row[0] for row in cursor.fetchall()}
+    return [name for name in expected if name not in found]
+
+
+def search_messages(user_id, q, conversation_id=None, after=None, limit=20):
+    """
+    Devuelve (mensajes, siguiente_ancla). Cada mensaje lleva ``search_rank``
+    (menor = más relevante). ``after`` es el ancla (rank, id) de la página previa.
+    """
+    words = terms(q)
+    if not words:
+        return [], None
+
+    kind = backend()
+    if kind == "fallback":
+        return _search_fallback(user_id, words, conversation_id, after, limit)
+
+    params = []
+    if kind == "sqlite":
+        rank = f"ROUND(bm25({FTS_TABLE}), {RANK_DECIMALS})"
+        source = f"{FTS_TABLE} JOIN chat_message m ON m.id = {FTS_TABLE}.rowid"
+        match = f"{FTS_TABLE} MATCH %s"
+        params.append(_fts_query(words))
+    else:
+        rank = f"ROUND((-ts_rank_cd(m.search_vector, query))::numeric, {RANK_DECIMALS})"
+        source = "chat_message m CROSS JOIN to_tsquery('spanish', %s) query"
+        match = "m.search_vector @@ query"
+        params.append(" & ".join(f"{w}:*" for w in words))
+
+    where = [match, "m.is_deleted = %s", "p.user_id = %s"]
+    params += [False, user_id]
+    if conversation_id is not None:
+        where.append("m.conversation_id = %s")
+        params.append(conversation_id)
+    if after is not None:
+        where.append(f"({rank} > %s OR ({rank} = %s AND m.id > %s))")
+        # SQLite compara REAL con REAL (un Decimal llegaría como texto); PostgreSQL, numeric
+        anchor = float(after[0]) if kind == "sqlite" else after[0]
+        params += [anchor, anchor, after[1]]
+
+    sql = (
+        f"SELECT m.id, {rank} AS search_rank FROM {source} "
+        f"JOIN chat_conversationparticipant p ON p.conversation_id = m.conversation_id "
+        f"WHERE {' AND '.join(where)} "
+        f"ORDER BY search_rank, m.id LIMIT %s"
+    )
+    params.append(limit + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        hits = cursor.fetchall()
+    return _materialize(hits, limit)
+
+
+def _search_fallback(user_id, words, conversation_id, after, limit):
+    qs = Message.objects.filter(is_deleted=False, conversation__participants__user_id=user_id)
+    if conversation_id is not None:
+        qs = qs.filter(conversation_id=conversation_id)
+    for w in words:
+        qs = qs.filter(content__icontains=w)
+    if after is not None:
+        qs = qs.filter(id__gt=after[1])
+    hits = [(pk, 0.0) for pk in qs.order_by("id").values_list("id", flat=True)[:limit + 1]]
+    return _materialize(hits, limit)
+
+
+def _materialize(hits, limit):
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    by_id = Message.objects.select_related("sender").in_bulk([pk for pk, _ in hits])
+    results = []
+    for pk, rank in hits:
+        msg = by_id.get(pk)
+        if msg is not None:
+            msg.search_rank = float(rank)
+            results.append(msg)
+    next_anchor = (hits[-1][1], hits[-1][0]) if has_more and hits else None
+    return results, next_anchor
@@ -13,12 +13,38 @@ class ConversationParticipantMiniSerializer(serializers.ModelSerializer):
         fields = ["user_id", "last_read_at"]
 
 class ConversationSerializer(serializers.ModelSerializer):
+    """
+    Espera el queryset de ConversationViewSet (last_message con select_related,
+    unread_count anotado y participantes precargados): no hace consultas por fila.
+    """
     participants = serializers.SerializerMethodField()
+    last_message = serializers.SerializerMethodField()
+    unread_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Conversation
+        fields = ["id", "name", "is_group", "created_at", "participants", "last_message", "unread_count"]
 
     @extend_schema_field(serializers.ListField(child=serializers.IntegerField()))
     def get_participants(self, obj):
-        # return list of user IDs, for example
-        return list(obj.participants.values_list("id", flat=True))
+        # ids de usuario desde el prefetch de participants
+        return [p.user_id for p in obj.participants.all()]
+
+    @extend_schema_field(OpenApiTypes.OBJECT)
+    def get_last_message(self, obj):
+        m = obj.last_message
+        if m is None:
+            return None
+        return {
+            "id": m.id,
+            "content": m.content,
+            "sender_id": m.sender_id,
+            "created_at": m.created_at,
+        }
+
+    @extend_schema_field(serializers.IntegerField())
+    def get_unread_count(self, obj):
+        return getattr(obj, "unread_count", 0) or 0
 
 class ConversationCreateSerializer(serializers.Serializer):
     is_group = serializers.BooleanField()
@@ -32,17 +58,45 @@ class UserMiniSerializer(serializers.ModelSerializer):
         fields = ["id", "username"]
 
 class MessageSerializer(serializers.ModelSerializer):
+    sender = UserMiniSerializer(read_only=True)
     seen_by = serializers.SerializerMethodField()
     seen_by_other = serializers.SerializerMethodField()
 
+    class Meta:
+        model = Message
+        fields = ["id", "conversation", "sender", "content", "created_at", "edited_at", "seen_by", "seen_by_other"]
+
+    def _read_marks(self, conversation_id):
+        """
+        [(user_id, last_read_at)] de los participantes de la conversación.
+        Se carga una vez por conversación y se comparte entre todas las filas
+        de la página a través del contexto del serializer raíz.
+        """
+        marks = self.context.setdefault("read_marks", {})
+        if conversation_id not in marks:
+            marks[conversation_id] = list(ConversationParticipant.objects
+                                          .filter(conversation_id=conversation_id)
+                                          .values_list("user_id", "last_read_at"))
+        return marks[conversation_id]
+
     @extend_schema_field(serializers.ListField(child=serializers.IntegerField()))
     def get_seen_by(self, obj):
-        return list(obj.seen_by.values_list("id", flat=True))
+        return [uid for uid, read_at in self._read_marks(obj.conversation_id)
+                if uid != obj.sender_id and read_at >= obj.created_at]
 
     @extend_schema_field(serializers.BooleanField())
     def get_seen_by_other(self, obj):
-        # o el tipo que devuelva realmente
-        return bool(...)  # lógica para determinar si lo ha visto el otro usuario
+        # Visto por al menos un participante distinto del emisor
+        return bool(self.get_seen_by(obj))
+
+class MessageSearchResultSerializer(serializers.ModelSerializer):
+    """Resultado de búsqueda: sin recibos de lectura (pueden venir de muchas conversaciones)."""
+    sender = UserMiniSerializer(read_only=True)
+    rank = serializers.FloatField(source="search_rank", read_only=True)
+
+    class Meta:
+        model = Message
+        fields = ["id", "conversation", "sender", "content", "created_at", "edited_at", "rank"]
 
 class MessageCreateSerializer(serializers.ModelSerializer):
     class Meta:
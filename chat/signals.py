@@ -0,0 +1,52 @@
+# backend-tkd-main/chat/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from friends.models import Block
+from .events import notify_access_changed
+from .models import Conversation, ConversationParticipant
+from .ws_jwt import invalidate_jti, invalidate_user, invalidate_user_tokens, record_revocation
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=Conversation)
+def conversation_changed(sender, instance, **kwargs):
+    notify_access_changed(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=ConversationParticipant)
+def participant_changed(sender, instance, **kwargs):
+    notify_access_changed(instance.conversation_id)
+
+
+@receiver([post_save, post_delete], sender=Block)
+def block_changed(sender, instance, **kwargs):
+    # Un bloqueo solo afecta a la conversación 1:1 entre ambos usuarios
+    a, b = sorted([instance.blocker_id, instance.blocked_id])
+    conv_id = (Conversation.objects
+               .filter(one_to_one_key=f"{a}:{b}")
+               .values_list("id", flat=True)
+               .first())
+    if conv_id:
+        notify_access_changed(conv_id)
+
+
+# ---- Cachés del handshake WS (chat.ws_jwt) ----
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def token_blacklisted(sender, instance, **kwargs):
+    # Logout revoca el refresh: fuera de la caché también los access del usuario
+    outstanding = instance.token
+    invalidate_jti(outstanding.jti)
+    if outstanding.user_id:
+        invalidate_user_tokens(outstanding.user_id)
+    # El resto de procesos lo ven en la caché compartida
+    record_revocation(outstanding.jti, outstanding.user_id, instance.blacklisted_at)
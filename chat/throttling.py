@@ -0,0 +1,151 @@
+# backend-tkd-main/chat/throttling.py
+"""
+Coalescing en servidor de los eventos efímeros del chat (typing y read).
+
+Se comparte por proceso y se indexa por (conversación, usuario), así que varias
+pestañas del mismo usuario también se agrupan.
+
+- typing.start: se difunde como mucho una vez cada ``CHAT_TYPING_INTERVAL``;
+  los repetidos solo renuevan la caducidad. Si no se renueva en ``CHAT_TYPING_TTL``
+  se emite un typing.stop automático. Un typing.stop sin start activo se descarta.
+- read: como mucho una escritura en BD + una difusión por ventana
+  (``CHAT_READ_WINDOW``); las lecturas intermedias se fusionan en un único
+  envío al cerrar la ventana, con el instante de la última lectura fusionada
+  (no el del cierre: lo llegado entre medias sigue sin leer).
+
+``stats`` cuenta lo enviado, descartado, fusionado y caducado.
+"""
+import asyncio
+from collections import Counter
+
+from django.conf import settings
+from django.utils import timezone
+
+DEFAULT_TYPING_INTERVAL = 3.0
+DEFAULT_TYPING_TTL = 5.0
+DEFAULT_READ_WINDOW = 2.0
+
+
+class FanoutThrottle:
+    def __init__(self, typing_interval=None, typing_ttl=None, read_window=None):
+        self._typing_interval = typing_interval
+        self._typing_ttl = typing_ttl
+        self._read_window = read_window
+        self._loop = None
+        self._typing = {}  # key -> {"sent_at", "expiry"}
+        self._read = {}    # key -> {"sent_at", "timer", "flush", "at"}
+        self._tasks = set()
+        self.stats = Counter()
+
+    @property
+    def typing_interval(self):
+        if self._typing_interval is not None:
+            return self._typing_interval
+        return getattr(settings, "CHAT_TYPING_INTERVAL", DEFAULT_TYPING_INTERVAL)
+
+    @property
+    def typing_ttl(self):
+        if self._typing_ttl is not None:
+            return self._typing_ttl
+        return getattr(settings, "CHAT_TYPING_TTL", DEFAULT_TYPING_TTL)
+
+    @property
+    def read_window(self):
+        if self._read_window is not None:
+            return self._read_window
+        return getattr(settings, "CHAT_READ_WINDOW", DEFAULT_READ_WINDOW)
+
+    # ---- typing ----
+
+    async def typing_start(self, key, send_start, send_stop):
+        """send_start/send_stop: funciones async sin argumentos que difunden el evento."""
+        self._bind_loop()
+        now = self._loop.time()
+        state = self._typing.get(key)
+        if state is not None:
+            state["expiry"].cancel()
+            state["expiry"] = self._loop.call_later(self.typing_ttl, self._expire_typing, key, send_stop)
+            if now - state["sent_at"] < self.typing_interval:
+                self.stats["typing_dropped"] += 1
+                return
+            state["sent_at"] = now
+        else:
+            self._typing[key] = {
+                "sent_at": now,
+                "expiry": self._loop.call_later(self.typing_ttl, self._expire_typing, key, send_stop),
+            }
+        self.stats["typing_sent"] += 1
+        await send_start()
+
+    async def typing_stop(self, key, send_stop):
+        self._bind_loop()
+        state = self._typing.pop(key, None)
+        if state is None:
+            self.stats["typing_dropped"] += 1
+            return
+        state["expiry"].cancel()
+        self.stats["typing_sent"] += 1
+        await send_stop()
+
+    def _expire_typing(self, key, send_stop):
+        if self._typing.pop(key, None) is not None:
+            self.stats["typing_expired"] += 1
+            self._spawn(send_stop())
+
+    # ---- read ----
+
+    async def read(self, key, flush):
+        """flush: función async que recibe el instante de la lectura, la persiste y la difunde."""
+        self._bind_loop()
+        now = self._loop.time()
+        at = timezone.now()
+        state = self._read.get(key)
+        if state is None or (state["timer"] is None and now - state["sent_at"] >= self.read_window):
+            self._read[key] = {"sent_at": now, "timer": None, "flush": flush, "at": at}
+            self._loop.call_later(self.read_window, self._forget_read, key, now)
+            self.stats["read_sent"] += 1
+            await flush(at)
+            return
+
+        # Dentro de la ventana: se fusiona con el envío diferido
+        self.stats["read_merged"] += 1
+        state["flush"] = flush
+        state["at"] = at
+        if state["timer"] is None:
+            delay = self.read_window - (now - state["sent_at"])
+            state["timer"] = self._loop.call_later(max(delay, 0), self._flush_read, key)
+
+    def _flush_read(self, key):
+        state = self._read.get(key)
+        if state is None:
+            return
+        now = self._loop.time()
+        state["timer"] = None
+        state["sent_at"] = now
+        self._loop.call_later(self.read_window, self._forget_read, key, now)
+        self.stats["read_sent"] += 1
+        self._spawn(state["flush"](state["at"]))
+
+    def _forget_read(self, key, sent_at):
+        state = self._read.get(key)
+        if state is not None and state["timer"] is None and state["sent_at"] == sent_at:
+            del self._read[key]
+
+    # ---- internos ----
+
+    def _bind_loop(self):
+        # Los timers pertenecen a un event loop: si cambia (tests, recarga) empezamos de cero
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._typing = {}
+            self._read = {}
+
+    def _spawn(self, coro):
+        task = self._loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+# Instancia compartida por todos los consumers del proceso
+fanout_throttle = FanoutThrottle()
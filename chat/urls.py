@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ConversationViewSet, MessageViewSet
+from .views import ConversationViewSet, MessageViewSet, MessageSearchView
 
 router = DefaultRouter()
 router.register(r'conversations', ConversationViewSet, basename='conversation')
@@ -8,8 +8,11 @@ router.register(r'conversations', ConversationViewSet, basename='conversation')
 # Para anidar mensajes bajo conversaciones:
 # /api/chat/conversations/<id>/messages/
 messages_list = MessageViewSet.as_view({'get': 'list', 'post': 'create'})
+messages_search = MessageViewSet.as_view({'get': 'search'})
 
 urlpatterns = [
     path('', include(router.urls)),
     path('conversations/<int:conversation_pk>/messages/', messages_list, name='conversation-messages'),
+    path('conversations/<int:conversation_pk>/messages/search/', messages_search, name='conversation-messages-search'),
+    path('messages/search/', MessageSearchView.as_view(), name='messages-search'),
 ]
\ No newline at end of file
@@ -3,33 +3,80 @@ from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 from django.db import transaction
+from django.db.models import OuterRef, Subquery
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from friends.utils import is_blocked_either
 
+from . import counters, outbox, search
+from .events import conversation_group, user_group, message_new_event, inbox_unread_event
 from .models import Conversation, ConversationParticipant, Message
 from .serializers import (
     ConversationSerializer, ConversationCreateSerializer,
-    MessageSerializer, MessageCreateSerializer
+    MessageSerializer, MessageCreateSerializer, MessageSearchResultSerializer
 )
 from .permissions import IsConversationParticipant
 from .pagination import MessageCursorPagination
 
 User = get_user_model()
 
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+
+
+def search_response(request, conversation_id=None):
+    """
+    ?q=<texto>&cursor=<token>&page_size=20. Resultados por relevancia (rank menor = mejor),
+    solo de conversaciones donde participa el usuario.
+    """
+    q = request.query_params.get("q", "")
+    if not search.terms(q):
+        return Response({"detail": "El parámetro q es obligatorio."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        size = int(request.query_params.get("page_size", SEARCH_PAGE_SIZE))
+    except ValueError:
+        size = SEARCH_PAGE_SIZE
+    size = max(1, min(size, SEARCH_MAX_PAGE_SIZE))
+
+    after = None
+    if token := request.query_params.get("cursor"):
+        try:
+            after = search.decode_cursor(token)
+        except search.InvalidCursor:
+            raise NotFound("Cursor inválido") from None
+
+    results, next_anchor = search.search_messages(
+        request.user.id, q, conversation_id=conversation_id, after=after, limit=size
+    )
+    next_url = None
+    if next_anchor:
+        next_url = replace_query_param(request.build_absolute_uri(), "cursor", search.encode_cursor(*next_anchor))
+    return Response({
+        "next": next_url,
+        "results": MessageSearchResultSerializer(results, many=True, context={"request": request}).data,
+    })
+
+
 class ConversationViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.RetrieveModelMixin):
-    queryset = Conversation.objects.all().prefetch_related("participants__user")
+    queryset = Conversation.objects.all().prefetch_related("participants")
     permission_classes = [IsAuthenticated]
     serializer_class = ConversationSerializer
 
     def get_queryset(self):
-        # Solo conversaciones donde participa el usuario
+        # Solo conversaciones donde participa el usuario. Último mensaje y no
+        # leídos vienen desnormalizados (chat.counters): coste O(conversaciones)
+        my_unread = (ConversationParticipant.objects
+                     .filter(conversation=OuterRef("pk"), user=self.request.user)
+                     .values("unread_count")[:1])
         return (Conversation.objects
                 .filter(participants__user=self.request.user)
-                .prefetch_related("participants__user")
+                .annotate(unread_count=Subquery(my_unread))
+                .select_related("last_message")
+                .prefetch_related("participants")
                 .order_by("-created_at"))
 
     def retrieve(self, request, *args, **kwargs):
@@ -75,7 +122,8 @@ class ConversationViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins
             key = f"{uids[0]}:{uids[1]}"
             conv = Conversation.objects.filter(one_to_one_key=key).first()
             if conv:
-                data = ConversationSerializer(conv, context={"request": request}).data
+                data = ConversationSerializer(self.get_queryset().get(pk=conv.pk),
+                                              context={"request": request}).data
                 return Response(data, status=status.HTTP_200_OK)
             conv = Conversation.objects.create(is_group=False, one_to_one_key=key)
         else:
@@ -85,7 +133,15 @@ class ConversationViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins
         parts = [ConversationParticipant(conversation=conv, user=u) for u in users]
         ConversationParticipant.objects.bulk_create(parts)
 
-        data = ConversationSerializer(conv, context={"request": request}).data
+        # 📥 Aviso al inbox de los participantes (sockets multiplexados)
+        outbox.enqueue_many((user_group(u.id), {
+            "type": "chat.message",
+            "event": "conversation.new",
+            "conversation_id": conv.id,
+        }) for u in users if u.id != current_user.id)
+
+        data = ConversationSerializer(self.get_queryset().get(pk=conv.pk),
+                                      context={"request": request}).data
         return Response(data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=["post"], url_path="read")
@@ -94,22 +150,18 @@ class ConversationViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins
         # Verifica pertenencia
         if not conv.participants.filter(user=request.user).exists():
             return Response(status=status.HTTP_403_FORBIDDEN)
-        # Actualiza last_read_at
         now = timezone.now()
-        ConversationParticipant.objects.filter(conversation=conv, user=request.user)\
-            .update(last_read_at=now)
-
-        # 🔔 Emitir evento WS de read-receipt a la sala de la conversación
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f"conv_{conv.id}",
-            {
+        with transaction.atomic():
+            # Actualiza last_read_at y recalcula los no leídos desde ese instante
+            counters.mark_read(conv.id, request.user.id, now)
+            # 🔔 Read-receipt a la sala vía outbox (se envía tras el commit, fuera de la petición)
+            outbox.enqueue(conversation_group(conv.id), {
                 "type": "chat.message",
                 "event": "conversation.read",
+                "conversation_id": conv.id,
                 "by": request.user.id,
                 "at": now.isoformat(),
-            }
-        )
+            })
         return Response({"status": "ok", "last_read_at": now.isoformat()})
 
 class MessageViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
@@ -123,7 +175,7 @@ class MessageViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.Crea
         ).first():
             return (Message.objects
                     .filter(conversation_id=conv_id, is_deleted=False)
-                    .select_related("sender", "conversation")
+                    .select_related("sender")
                     .order_by("-created_at", "-id"))
         else:
             return Message.objects.none()
@@ -135,11 +187,19 @@ class MessageViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.Crea
 
     def list(self, request, *args, **kwargs):
         """
-        Paginación por cursor: usa ?cursor=<token> y ?page_size=30.
+        Paginación keyset sobre (created_at, id): usa ?cursor=<token> y ?page_size=30,
+        o ?before=<id> / ?after=<id> para pedir mensajes anteriores / posteriores a uno dado.
         Orden: -created_at, -id.
         """
         return super().list(request, *args, **kwargs)
 
+    def search(self, request, *args, **kwargs):
+        """Búsqueda de texto completo dentro de la conversación (ver chat.search)."""
+        conv_id = self.kwargs.get("conversation_pk")
+        if not ConversationParticipant.objects.filter(conversation_id=conv_id, user=request.user).exists():
+            raise PermissionDenied("No perteneces a esta conversación.")
+        return search_response(request, conversation_id=conv_id)
+
     def perform_create(self, serializer):
         conv_id = self.kwargs.get("conversation_pk")
         # Verifica que el usuario sea participante
@@ -159,4 +219,29 @@ class MessageViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.Crea
                 from rest_framework.exceptions import PermissionDenied
                 raise PermissionDenied("No puedes enviar mensajes: uno de los usuarios ha bloqueado al otro.")
 
-        serializer.save(conversation=conv, sender=self.request.user)
+        with transaction.atomic():
+            msg = serializer.save(conversation=conv, sender=self.request.user)
+            counters.record_new_messages([msg])
+            # 🔔 Mismo evento que emite el WS para que los sockets abiertos lo vean
+            recipients = (ConversationParticipant.objects
+                          .filter(conversation=conv)
+                          .exclude(user_id=self.request.user.id)
+                          .values_list("user_id", flat=True))
+            outbox.enqueue_many([
+                (conversation_group(conv.id), message_new_event(conv.id, {
+                    "id": msg.id,
+                    "content": msg.content,
+                    "sender": {"id": self.request.user.id, "username": self.request.user.username},
+                    "created_at": msg.created_at.isoformat(),
+                })),
+                # 📥 Aviso al inbox del resto de participantes
+                *((user_group(uid), inbox_unread_event(conv.id, msg.id)) for uid in recipients),
+            ])
+
+
+class MessageSearchView(APIView):
+    """Búsqueda global en todas las conversaciones del usuario."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return search_response(request)
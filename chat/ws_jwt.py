@@ -1,18 +1,212 @@
-import jwt
-from django.conf import settings
+"""
+Autenticación JWT del handshake WebSocket (?token=<JWT>).
+
+Para aguantar ráfagas de reconexiones el camino rápido no toca la BD:
+- LRU acotada de tokens ya verificados (firma, tipo y blacklist) con sus claims;
+  cada entrada caduca con el ``exp`` del token. La LRU es por proceso, así que
+  las revocaciones (ver chat.signals) se anotan además en una caché de Django
+  (``CHAT_WS_REVOCATION_CACHE``, compartida): una marca por jti y otra por
+  usuario con el instante del último refresh revocado. Cada acierto de la LRU
+  las consulta (una lectura de caché, sin BD); sin esa caché los tokens solo se
+  reutilizan durante ``UNSHARED_TOKEN_TTL`` segundos.
+- Logout pone en la blacklist el refresh, no el access: se rechazan también los
+  access del usuario emitidos antes de que se revocara alguno de sus refresh
+  (el cliente solo tiene que refrescar para obtener uno nuevo).
+- Caché de usuarios por id con TTL corto, invalidada al guardar/borrar el usuario.
+
+``CHAT_WS_TOKEN_CACHE_SIZE = 0`` / ``CHAT_WS_USER_CACHE_TTL = 0`` las desactivan.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
 from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
 from django.contrib.auth import get_user_model
+from django.db.models import Q
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import AccessToken
 
 User = get_user_model()
 
+DEFAULT_TOKEN_CACHE_SIZE = 4096
+DEFAULT_USER_CACHE_SIZE = 4096
+DEFAULT_USER_CACHE_TTL = 30.0  # segundos
+UNSHARED_TOKEN_TTL = 5.0  # segundos en la LRU si no hay caché de revocaciones
+
+
+class LRUCache:
+    """LRU acotada con caducidad por entrada. Thread-safe (los signals llegan desde hilos)."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # clave -> (valor, caduca_en monotonic)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_where(self, predicate):
+        with self._lock:
+            for key in [k for k, (v, _) in self._data.items() if predicate(v)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+token_cache = LRUCache(getattr(settings, "CHAT_WS_TOKEN_CACHE_SIZE", DEFAULT_TOKEN_CACHE_SIZE))
+user_cache = LRUCache(getattr(settings, "CHAT_WS_USER_CACHE_SIZE", DEFAULT_USER_CACHE_SIZE))
+
+
+def invalidate_user(user_id):
+    user_cache.discard(user_id)
+
+
+def invalidate_jti(jti):
+    token_cache.discard_where(lambda claims: claims["jti"] == jti)
+
+
+def invalidate_user_tokens(user_id):
+    token_cache.discard_where(lambda claims: claims["user_id"] == user_id)
+
+
+def _revocation_cache():
+    alias = getattr(settings, "CHAT_WS_REVOCATION_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def _jti_key(jti) -> str:
+    return f"chat:ws:revoked:jti:{jti}"
+
+
+def _user_key(user_id) -> str:
+    return f"chat:ws:revoked:user:{user_id}"
+
+
+def record_revocation(jti, user_id, at):
+    """
+    Anota en la caché compartida un token revocado y, si es de un usuario, que
+    sus access emitidos antes de ``at`` ya no valen. Basta con que duren lo que
+    un access: pasado ese tiempo cualquier token afectado ha caducado.
+    """
+    cache = _revocation_cache()
+    if cache is None:
+        return
+    ttl = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()) + 1
+    marks = {_jti_key(jti): True}
+    if user_id:
+        marks[_user_key(user_id)] = at.timestamp()
+    cache.set_many(marks, timeout=ttl)
+
+
+async def _revoked_since_cached(claims):
+    cache = _revocation_cache()
+    found = await cache.aget_many([_jti_key(claims["jti"]), _user_key(claims["user_id"])])
+    if found.get(_jti_key(claims["jti"])):
+        return True
+    revoked_at = found.get(_user_key(claims["user_id"]))
+    return revoked_at is not None and claims["iat"] is not None and revoked_at > claims["iat"]
+
+
+def _blacklist_enabled():
+    return apps.is_installed("rest_framework_simplejwt.token_blacklist")
+
+
+@database_sync_to_async
+def _is_blacklisted(jti, user_id, issued_at):
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+    revoked = Q(token__jti=jti)
+    if issued_at is not None:
+        # Un refresh del usuario revocado después de emitirse este access (logout)
+        revoked |= Q(token__user_id=user_id, blacklisted_at__gt=issued_at)
+    return BlacklistedToken.objects.filter(revoked).exists()
+
+
+async def verify_token(token):
+    """Devuelve los claims {user_id, jti} del token o None si no es válido."""
+    claims = token_cache.get(token)
+    if claims is not None:
+        if _revocation_cache() is not None and await _revoked_since_cached(claims):
+            token_cache.discard(token)
+            return None
+        return claims
+
+    try:
+        access = AccessToken(token)  # valida firma, tipo y expiración
+    except TokenError:
+        return None
+    claims = {
+        "user_id": access.get(api_settings.USER_ID_CLAIM),
+        "jti": access.get(api_settings.JTI_CLAIM),
+        "iat": access.get("iat"),
+    }
+    if not claims["user_id"]:
+        return None
+    issued_at = datetime.fromtimestamp(claims["iat"], tz=timezone.utc) if claims["iat"] is not None else None
+    if claims["jti"] and _blacklist_enabled() and await _is_blacklisted(
+        claims["jti"], claims["user_id"], issued_at
+    ):
+        return None
+
+    ttl = access["exp"] - time.time()
+    if _revocation_cache() is None:
+        ttl = min(ttl, UNSHARED_TOKEN_TTL)
+    token_cache.set(token, claims, ttl=ttl)
+    return claims
+
+
+async def get_user(user_id):
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    try:
+        user = await User.objects.aget(pk=user_id)
+    except User.DoesNotExist:
+        return None
+    user_cache.set(user_id, user, ttl=getattr(settings, "CHAT_WS_USER_CACHE_TTL", DEFAULT_USER_CACHE_TTL))
+    return user
+
+
 class JWTAuthMiddleware:
     """Extrae ?token=<JWT> del querystring y adjunta scope['user']."""
     def __init__(self, inner):
         self.inner = inner
 
-    def __call__(self, scope):
-        return JWTAuthMiddlewareInstance(scope, self.inner)
+    async def __call__(self, scope, receive, send):
+        # ASGI 3 (Channels 4): una instancia por conexión con su propia copia del scope
+        return await JWTAuthMiddlewareInstance(dict(scope), self.inner)(receive, send)
 
 class JWTAuthMiddlewareInstance:
     def __init__(self, scope, inner):
@@ -24,16 +218,7 @@ class JWTAuthMiddlewareInstance:
         token = (query.get("token") or [None])[0]
         self.scope["user"] = None
         if token:
-            try:
-                access = AccessToken(token)  # valida firma y expiración
-                user_id = access.get("user_id")
-                if user_id:
-                    try:
-                        user = await User.objects.aget(pk=user_id)
-                        self.scope["user"] = user
-                    except User.DoesNotExist:
-                        self.scope["user"] = None
-            except Exception:
-                self.scope["user"] = None
-        inner = self.inner(self.scope)
-        return await inner(receive, send)
+            claims = await verify_token(token)
+            if claims:
+                self.scope["user"] = await get_user(claims["user_id"])
+        return await self.inner(self.scope, receive, send)
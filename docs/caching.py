@@ -0,0 +1,154 @@
+# backend-tkd-main/docs/caching.py
+"""
+Caché HTTP de las lecturas de docs (catálogo y listado de documentos).
+
+Cada tabla tiene un contador de versión en la caché de Django que se
+incrementa con cada alta/cambio/baja (ver docs.signals). La ETag de una
+respuesta sale de: host + ruta + query params + Accept + variante (rol) + versiones
+de las tablas de las que depende, así que se calcula sin tocar la BD:
+- If-None-Match coincidente → 304;
+- si no, se sirve el cuerpo ya renderizado desde la caché;
+- solo en un fallo se ejecuta la vista y se guarda el resultado.
+
+Con ``cache_vary_by_role = False`` (catálogo público, misma salida para todos)
+lo anterior ocurre antes de autenticar: ni siquiera se busca al usuario.
+Con ``True`` la variante es el rol del usuario y se resuelve tras autenticar.
+
+``DOCS_CACHE`` es el alias de ``CACHES`` (``None`` desactiva todo esto). Con
+varios procesos debe ser una caché compartida: las versiones viven ahí.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+
+from .models import role_of
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_AGE = 60
+DEFAULT_S_MAXAGE = 300
+
+
+def docs_cache():
+    alias = getattr(settings, "DOCS_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def _version_key(table) -> str:
+    return f"docs:version:{table}"
+
+
+def get_versions(*tables):
+    cache = docs_cache()
+    if cache is None:
+        return []
+    keys = [_version_key(t) for t in tables]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Valor inicial por tiempo: tras un vaciado de caché no se repiten ETags antiguas
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[k] for k in keys]
+
+
+def bump_version(*tables):
+    cache = docs_cache()
+    if cache is None:
+        return
+    for table in tables:
+        try:
+            cache.incr(_version_key(table))
+        except ValueError:
+            cache.set(_version_key(table), time.time_ns(), timeout=None)
+
+
+def bump_on_change(*tables):
+    """Invalida ya y otra vez al confirmar, por si otra petición cacheó el estado previo."""
+    bump_version(*tables)
+    transaction.on_commit(lambda: bump_version(*tables))
+
+
+class CachedResponseMixin:
+    """
+    Para vistas DRF de solo lectura pública o por rol. Definir ``cache_tables``
+    (nombres de contador de versión) y opcionalmente ``cache_vary_by_role``.
+    """
+    cache_tables = ()
+    cache_vary_by_role = False
+
+    def dispatch(self, request, *args, **kwargs):
+        # Camino rápido antes de DRF (autenticación incluida) para respuestas comunes a todos
+        if request.method in ("GET", "HEAD") and not self.cache_vary_by_role and docs_cache() is not None:
+            cached = self._from_cache(request, *self._cache_key(request, "*"))
+            if cached is not None:
+                return cached
+        return super().dispatch(request, *args, **kwargs)
+
+    def get(self, request, *args, **kwargs):
+        if docs_cache() is None:
+            return super().get(request, *args, **kwargs)
+        # Clave con las versiones leídas ANTES de consultar: si entra una escritura
+        # mientras corre la vista, el cuerpo queda bajo la versión antigua y no se sirve
+        key, etag = self._cache_key(request, self.cache_variant(request))
+        cached = self._from_cache(request, key, etag)
+        if cached is not None:
+            return cached
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        # Se renderiza aquí para poder guardar los bytes
+        response.accepted_renderer = request.accepted_renderer
+        response.accepted_media_type = request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.render()
+        docs_cache().set(key, (response.content, response["Content-Type"]),
+                     getattr(settings, "DOCS_CACHE_TTL", DEFAULT_TTL))
+        return self._decorate(response, etag)
+
+    def cache_variant(self, request):
+        if not self.cache_vary_by_role:
+            return "*"
+        return role_of(request.user)
+
+    # ---- internos ----
+
+    def _cache_key(self, request, variant):
+        versions = get_versions(*self.cache_tables)
+        raw = "|".join([
+            request.get_host(),  # las URLs de ficheros son absolutas
+            request.path,
+            "&".join(f"{k}={v}" for k, v in sorted(request.GET.lists())),
+            request.META.get("HTTP_ACCEPT", ""),
+            variant,
+            ",".join(map(str, versions)),
+        ])
+        digest = hashlib.sha256(raw.encode()).hexdigest()[:32]
+        return f"docs:response:{digest}", f'"{digest}"'
+
+    def _from_cache(self, request, key, etag):
+        if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+            return self._decorate(HttpResponseNotModified(), etag)
+        hit = docs_cache().get(key)
+        if hit is None:
+            return None
+        content, content_type = hit
+        return self._decorate(HttpResponse(content, content_type=content_type), etag)
+
+    def _decorate(self, response, etag):
+        response["ETag"] = etag
+        patch_vary_headers(response, ["Accept"])
+        if self.cache_vary_by_role:
+            patch_vary_headers(response, ["Authorization"])
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True,
+                                max_age=getattr(settings, "DOCS_CACHE_MAX_AGE", DEFAULT_MAX_AGE),
+                                s_maxage=getattr(settings, "DOCS_CACHE_S_MAXAGE", DEFAULT_S_MAXAGE))
+        return response
@@ -0,0 +1,95 @@
+# backend-tkd-main/docs/curriculum.py
+"""
+Temario completo en una respuesta: niveles públicos (por ``order``) con sus
+técnicas anidadas.
+
+- Dos consultas (niveles + un prefetch de técnicas), sin N+1.
+- Se serializa una vez y se guarda ya comprimido (gzip y, si está instalado
+  el paquete ``brotli``, br) en la caché de docs (``DOCS_CACHE``), bajo las
+  versiones de niveles y técnicas de docs.caching: cualquier cambio lo invalida.
+- Cada petición solo elige la codificación según Accept-Encoding: sin BD,
+  sin serializar y sin comprimir. ETag = versiones + codificación (cada
+  representación tiene la suya: ``"<digest>"``, ``"<digest>-gzip"``…) → 304 con
+  If-None-Match solo si coincide la de la codificación elegida.
+"""
+import gzip
+import hashlib
+
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from .caching import docs_cache, get_versions
+from .models import BeltLevel, Technique
+from .serializers import LevelSerializer, TechniqueSerializer
+
+try:
+    import brotli
+except ImportError:  # opcional
+    brotli = None
+
+CACHE_TTL = None  # las versiones ya invalidan
+GZIP_LEVEL = 9  # se comprime una vez por versión: compensa el nivel alto
+
+
+class CurriculumLevelSerializer(LevelSerializer):
+    techniques = TechniqueSerializer(many=True, read_only=True)
+
+    class Meta(LevelSerializer.Meta):
+        fields = LevelSerializer.Meta.fields + ["techniques"]
+
+
+def build_payload(request=None) -> bytes:
+    levels = (BeltLevel.objects.filter(is_public=True).order_by("order", "id")
+              .prefetch_related(Prefetch("techniques", queryset=Technique.objects.order_by("id"))))
+    data = CurriculumLevelSerializer(levels, many=True, context={"request": request}).data
+    return JSONRenderer().render({"levels": data})
+
+
+def encode(payload: bytes):
+    blobs = {"identity": payload, "gzip": gzip.compress(payload, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        blobs["br"] = brotli.compress(payload)
+    return blobs
+
+
+def get_blobs(request):
+    """(etag, {codificación: bytes}); construye y cachea si no está."""
+    cache = docs_cache()
+    if cache is None:
+        # Sin caché no hay versiones: ni ETag ni compresión por petición
+        return None, {"identity": build_payload(request)}
+    versions = get_versions("levels", "techniques")
+    digest = hashlib.sha256(f"{request.get_host()}|{versions}".encode()).hexdigest()[:32]
+    key = f"docs:curriculum:{digest}"
+    blobs = cache.get(key)
+    if blobs is None:
+        blobs = encode(build_payload(request))
+        cache.set(key, blobs, CACHE_TTL)
+    return f'"{digest}"', blobs
+
+
+def coding_etag(etag, coding):
+    """ETag de una representación concreta (identity conserva la base)."""
+    if etag is None or coding == "identity":
+        return etag
+    return f'{etag[:-1]}-{coding}"'
+
+
+def pick_encoding(accept_encoding, available):
+    """Mejor codificación aceptada (br > gzip > identity), respetando q=0."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            accepted[token.lower()] = q
+    for coding in ("br", "gzip"):
+        if coding in available and accepted.get(coding, accepted.get("*", 0)) > 0:
+            return coding
+    return "identity"
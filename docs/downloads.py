@@ -0,0 +1,192 @@
+# backend-tkd-main/docs/downloads.py
+"""
+Entrega de ficheros (PDFs de nivel, imágenes de técnica, documentos) tras
+comprobar permisos en la vista.
+
+Según ``DOCS_SENDFILE_BACKEND``:
+- ``"x-accel-redirect"`` (nginx): cabecera ``X-Accel-Redirect`` con
+  ``DOCS_SENDFILE_PREFIX`` + nombre; nginx sirve el fichero (location internal).
+  Es el despliegue recomendado: el proyecto corre bajo daphne (ASGI) y ahí no
+  hay ``sendfile``.
+- ``"x-sendfile"`` (Apache mod_xsendfile, lighttpd): ruta absoluta en ``X-Sendfile``.
+- vacío: ``FileResponse`` desde Python. Bajo ASGI el fichero se lee por bloques
+  en un hilo y se envía como cuerpo de respuesta (copias en memoria, un worker
+  ocupado por descarga); solo con un servidor WSGI con ``wsgi.file_wrapper``
+  (gunicorn en modo WSGI) se usaría ``sendfile``. Sirve para desarrollo y
+  volúmenes pequeños.
+
+En todos los casos: ETag (el SHA-256 en docs.storage; si no, nombre + tamaño + mtime), 304 con If-None-Match y,
+sin servidor delante, peticiones Range de un solo tramo con If-Range.
+
+Estas URLs van por pk (``levels/<pk>/pdf/``…): el fichero detrás puede cambiar,
+así que nunca son ``immutable``; llevan ``DOCS_CACHE_MAX_AGE`` y se revalidan
+por ETag. Solo las URLs con el hash en la ruta (``MEDIA_URL`` + ``cas/…``) se
+pueden servir como inmutables, y eso se configura en el servidor web.
+"""
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import content_disposition_header, http_date, parse_etags, quote_etag
+from django.utils.text import get_valid_filename
+from rest_framework.negotiation import BaseContentNegotiation
+
+from .storage import is_content_addressed
+from .validators import MAGIC_MIN_BYTES, sniff_content_type
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """Las descargas no son JSON: el Accept del cliente (application/pdf…) no debe dar 406."""
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class FileRange:
+    """Vista de solo lectura de [start, start + length) de un fichero abierto."""
+
+    def __init__(self, fh, start, length):
+        fh.seek(start)
+        self._fh = fh
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self._fh.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._fh.fileno()
+
+    def close(self):
+        self._fh.close()
+
+
+def _etag(name, size, mtime_ns):
+    return quote_etag(hashlib.sha1(f"{name}:{size}:{mtime_ns}".encode()).hexdigest()[:32])
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusivo, None si no hay rango utilizable (se sirve entero) o
+    "unsatisfiable" si el rango no cabe en el fichero. Varios tramos → None.
+    """
+    match = _RANGE_RE.match((header or "").replace(" ", ""))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:  # sufijo: últimos N bytes
+        length = int(last)
+        if length == 0:
+            return "unsatisfiable"
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, end
+
+
+def serve_file(request, field_file, public=False, content_type=None, filename=None):
+    """
+    ``content_type``: el detectado al subir (``Document.content_type``). Si no
+    se conoce se detecta por los magic bytes del fichero, nunca por la extensión.
+    ``filename``: nombre para el usuario en Content-Disposition (ver ``display_name``);
+    por defecto el del almacenamiento, que es el hash.
+    """
+    if not field_file:
+        raise Http404("Sin fichero.")
+    storage, name = field_file.storage, field_file.name
+    try:
+        path = storage.path(name)
+        stat = os.stat(path)
+    except NotImplementedError:  # almacenamiento remoto: sin sendfile
+        path, stat = None, None
+    except FileNotFoundError:
+        raise Http404("Fichero no encontrado.")
+
+    size = stat.st_size if stat else storage.size(name)
+    mtime_ns = stat.st_mtime_ns if stat else 0
+    # Direccionado por contenido: el propio hash es la ETag
+    etag = quote_etag(os.path.splitext(os.path.basename(name))[0]) if is_content_addressed(name) \
+        else _etag(name, size, mtime_ns)
+    filename = filename or os.path.basename(name)
+
+    if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+        return _decorate(HttpResponseNotModified(), etag, stat, public)
+
+    backend = getattr(settings, "DOCS_SENDFILE_BACKEND", "")
+    if path and backend in ("x-accel-redirect", "x-sendfile"):
+        # El servidor web resuelve Range/If-Range; aquí solo la cabecera
+        response = HttpResponse(content_type=content_type or _sniff(storage, name))
+        if backend == "x-accel-redirect":
+            response["X-Accel-Redirect"] = getattr(settings, "DOCS_SENDFILE_PREFIX", "/protected-media/") + name
+        else:
+            response["X-Sendfile"] = path
+        response["Content-Disposition"] = content_disposition_header(False, filename)
+        return _decorate(response, etag, stat, public)
+
+    byte_range = None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range or if_range == etag or (stat and if_range == http_date(stat.st_mtime)):
+        byte_range = parse_range(request.META.get("HTTP_RANGE"), size)
+
+    if byte_range == "unsatisfiable":
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return _decorate(response, etag, stat, public)
+
+    content_type = content_type or _sniff(storage, name)
+    fh = open(path, "rb") if path else storage.open(name, "rb")
+    if byte_range is None:
+        response = FileResponse(fh, filename=filename, content_type=content_type)
+        response["Content-Length"] = size
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(fh, start, end - start + 1), status=206,
+                                filename=filename, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+    response["Accept-Ranges"] = "bytes"
+    return _decorate(response, etag, stat, public)
+
+
+def display_name(label, name):
+    """Nombre legible a partir de un título (``label``) con la extensión del fichero guardado."""
+    ext = os.path.splitext(name)[1]
+    try:
+        return get_valid_filename(label) + ext
+    except SuspiciousFileOperation:
+        return os.path.basename(name)
+
+
+def _sniff(storage, name):
+    with storage.open(name, "rb") as fh:
+        return sniff_content_type(fh.read(MAGIC_MIN_BYTES)) or "application/octet-stream"
+
+
+def _decorate(response, etag, stat, public):
+    response["ETag"] = etag
+    response["X-Content-Type-Options"] = "nosniff"  # el navegador no reinterpreta el tipo
+    if stat:
+        response["Last-Modified"] = http_date(stat.st_mtime)
+    if public:
+        patch_cache_control(response, public=True, max_age=getattr(settings, "DOCS_CACHE_MAX_AGE", 60))
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ["Authorization"])
+    return response
@@ -0,0 +1,142 @@
+# backend-tkd-main/docs/images.py
+"""
+Derivados de ``Technique.image``: miniaturas WebP en varios anchos.
+
+- Se generan al guardar una técnica con imagen nueva (tras el commit) en un
+  pool de hilos (``DOCS_IMAGE_WORKERS``; 0 = en línea, útil en tests).
+- Se guardan en el almacenamiento por contenido (``cas/ab/cd/<sha256>.webp``,
+  ver docs.storage), así que sus URLs son inmutables. Como el original también
+  tiene nombre por contenido, si otra técnica (o esta misma) ya tiene derivados
+  completos del mismo original se reutilizan sin volver a renderizar.
+- Se guardan en ``Technique.image_variants`` ({"src": nombre original,
+  "widths": {ancho: nombre}}) y el serializer expone ``thumbnail`` y ``srcset``.
+
+Backfill de las existentes: ``manage.py build_image_variants``.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (160, 320, 640, 1280)
+DEFAULT_QUALITY = 80
+VARIANTS_DIR = "techniques/variants"  # upload_to; el nombre final lo decide docs.storage
+
+
+def widths():
+    return tuple(sorted(getattr(settings, "DOCS_IMAGE_WIDTHS", DEFAULT_WIDTHS)))
+
+
+def target_widths(width):
+    """Anchos menores que el original (como mínimo uno: nunca se amplía)."""
+    return [w for w in widths() if w < width] or [min(width, widths()[0])]
+
+
+def render_variant(img, width) -> bytes:
+    height = max(1, round(img.height * width / img.width))
+    buf = BytesIO()
+    img.resize((width, height), Image.LANCZOS).save(
+        buf, "WEBP", quality=getattr(settings, "DOCS_IMAGE_QUALITY", DEFAULT_QUALITY), method=4
+    )
+    return buf.getvalue()
+
+
+def build_variants(technique_id, force=False):
+    """
+    Genera (si faltan) y registra los derivados de la imagen actual de la técnica.
+    Con ``force`` se renderizan aunque ya existan.
+    """
+    from . import caching
+    from .models import Technique
+
+    technique = Technique.objects.filter(pk=technique_id).only("id", "image").first()
+    if technique is None or not technique.image:
+        return None
+    source = technique.image.name
+    storage = technique.image.storage
+    with technique.image.open("rb") as fh:
+        data = fh.read()
+
+    with Image.open(BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        wanted = target_widths(img.width)
+        names = None if force else existing_variants(source, wanted, storage)
+        if names is None:
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "P") else "RGB")
+            names = {
+                str(width): storage.save(f"{VARIANTS_DIR}/{width}.webp", ContentFile(render_variant(img, width)))
+                for width in wanted
+            }
+
+    variants = {"src": source, "widths": names}
+    # Solo si la imagen no ha cambiado mientras tanto; update() no dispara signals
+    if Technique.objects.filter(pk=technique_id, image=source).update(image_variants=variants):
+        caching.bump_version("techniques")
+    return variants
+
+
+def existing_variants(source, wanted, storage):
+    """Derivados ya registrados del mismo original con todos los anchos pedidos, o None."""
+    from .models import Technique
+
+    expected = {str(w) for w in wanted}
+    for variants in Technique.objects.filter(image=source).values_list("image_variants", flat=True):
+        variants = variants or {}
+        names = variants.get("widths") or {}
+        if variants.get("src") == source and set(names) == expected and all(map(storage.exists, names.values())):
+            return dict(names)
+    return None
+
+
+def needs_variants(technique):
+    name = technique.image.name if technique.image else ""
+    return (technique.image_variants or {}).get("src", "") != name
+
+
+class VariantPool:
+    """Pool de hilos (uno por proceso, perezoso) para no alargar la petición de subida."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, technique_id):
+        workers = getattr(settings, "DOCS_IMAGE_WORKERS", 2)
+        if workers <= 0:
+            return _build(technique_id)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="docs-images")
+        return self._executor.submit(_run_in_worker, technique_id)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def _build(technique_id):
+    try:
+        return build_variants(technique_id)
+    except Exception:
+        logger.exception("Error generando derivados de la técnica %s", technique_id)
+        return None
+
+
+def _run_in_worker(technique_id):
+    try:
+        return _build(technique_id)
+    finally:
+        close_old_connections()
+
+
+pool = VariantPool()
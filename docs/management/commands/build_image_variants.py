@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from docs import images
+from docs.models import Technique
+
+
+class Command(BaseCommand):
+    help = "Genera las miniaturas WebP de las técnicas que no las tienen (o todas con --force)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="regenerar también las ya hechas")
+
+    def handle(self, *args, **options):
+        count = 0
+        for technique in Technique.objects.exclude(image="").exclude(image=None).only("id", "image", "image_variants"):
+            if options["force"] or images.needs_variants(technique):
+                if images.build_variants(technique.pk, force=options["force"]):
+                    count += 1
+        self.stdout.write(self.style.SUCCESS(f"Técnicas con miniaturas generadas: {count}."))
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from docs import images, storage
+
+
+class Command(BaseCommand):
+    help = "Borra ficheros del almacenamiento por contenido (y miniaturas) que ya no referencia ninguna fila."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-age", type=int, default=None,
+                            help="segundos: no tocar ficheros escritos o reutilizados hace menos "
+                                 "(por defecto DOCS_MEDIA_MIN_AGE)")
+        parser.add_argument("--dry-run", action="store_true", help="solo listar")
+
+    def handle(self, *args, **options):
+        media = storage.content_storage()
+        referenced = storage.referenced_names()
+        min_age = options["min_age"] if options["min_age"] is not None else storage.min_age()
+        cutoff = time.time() - min_age
+        removed = freed = 0
+        for root in (storage.PREFIX, images.VARIANTS_DIR):
+            for name in self._walk(media, root):
+                if name in referenced or media.get_modified_time(name).timestamp() > cutoff:
+                    continue
+                freed += media.size(name)
+                removed += 1
+                if options["dry_run"]:
+                    self.stdout.write(name)
+                else:
+                    media.delete(name)
+        verb = "Se borrarían" if options["dry_run"] else "Borrados"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} ficheros huérfanos ({freed // 1024} KB)."))
+
+    def _walk(self, media, path):
+        if not media.exists(path):
+            return
+        dirs, files = media.listdir(path)
+        for f in files:
+            yield f"{path}/{f}"
+        for d in dirs:
+            yield from self._walk(media, f"{path}/{d}")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from docs import uploads
+
+
+class Command(BaseCommand):
+    help = "Borra las subidas por tramos abandonadas (y sus ficheros temporales)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-age", type=int, default=None,
+                            help="segundos sin actividad (por defecto DOCS_UPLOAD_SESSION_TTL)")
+
+    def handle(self, *args, **options):
+        count = uploads.purge_stale(options["max_age"])
+        self.stdout.write(self.style.SUCCESS(f"Subidas borradas: {count}."))
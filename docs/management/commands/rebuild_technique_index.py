@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from docs import search
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de técnicas (texto completo y trigramas)."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Índice de técnicas reconstruido ({count} técnicas)."))
@@ -0,0 +1,145 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:00
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copia congelada de docs.search en el momento de la migración: si el analizador
+# cambia después, esta migración no debe cambiar con él (se reindexa con
+# ``manage.py rebuild_technique_index``).
+FTS_TABLE = "docs_technique_fts"
+PG_TABLE = "docs_technique_search"
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset(
+    "a al con de del el en la las lo los o para por que se su sus un una uno unos unas y e u".split()
+)
+SUFFIXES = (
+    "amientos", "imientos", "amiento", "imiento", "aciones", "uciones",
+    "mente", "acion", "ucion", "ancia", "encia", "ismo", "ista", "able", "ible",
+    "oso", "osa",
+)
+
+
+def fold(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def stem(word):
+    if len(word) < 4 or word.isdigit():
+        return word
+    if word.endswith("ces"):
+        word = word[:-3] + "z"
+    elif word.endswith("es") and len(word) > 4 and word[-3] not in "aeiou":
+        word = word[:-2]
+    elif word.endswith("s"):
+        word = word[:-1]
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    if len(word) > 3 and word[-1] in "aeo":
+        word = word[:-1]
+    return word
+
+
+def analyze(text):
+    return [stem(w) for w in _WORD_RE.findall(fold(text or "")) if w not in STOPWORDS]
+
+
+def trigrams(text):
+    grams = set()
+    for word in _WORD_RE.findall(fold(text or "")):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+CREATE = {
+    "sqlite": [
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, description, tokenize='unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        f"CREATE TABLE {PG_TABLE} (technique_id bigint PRIMARY KEY "
+        f"REFERENCES docs_technique (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, document tsvector NOT NULL)",
+        f"CREATE INDEX docs_tech_search_gin ON {PG_TABLE} USING GIN (document)",
+    ],
+}
+DROP = {
+    "sqlite": [f"DROP TABLE IF EXISTS {FTS_TABLE}"],
+    "postgresql": [f"DROP TABLE IF EXISTS {PG_TABLE}"],
+}
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in CREATE.get(vendor, []):
+        schema_editor.execute(sql)
+
+    # Indexar las técnicas existentes
+    Technique = apps.get_model("docs", "Technique")
+    TechniqueTrigram = apps.get_model("docs", "TechniqueTrigram")
+    with schema_editor.connection.cursor() as cursor:
+        for t in Technique.objects.only("id", "name", "description").iterator():
+            name, description = " ".join(analyze(t.name)), " ".join(analyze(t.description))
+            if vendor == "sqlite":
+                cursor.execute(f"INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (%s, %s, %s)",
+                               [t.id, name, description])
+            elif vendor == "postgresql":
+                cursor.execute(
+                    f"INSERT INTO {PG_TABLE} (technique_id, document) VALUES (%s, "
+                    f"setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B'))",
+                    [t.id, name, description],
+                )
+            TechniqueTrigram.objects.bulk_create(
+                [TechniqueTrigram(technique_id=t.id, trigram=g) for g in trigrams(t.name)]
+            )
+
+
+def drop_index(apps, schema_editor):
+    for sql in DROP.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docs", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TechniqueTrigram",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("trigram", models.CharField(max_length=3)),
+                (
+                    "technique",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="docs.technique",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["trigram", "technique"], name="docs_tech_trigram_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:07
+
+from django.db import migrations, models
+
+# Copia de docs.models.VISIBILITY_ROLES/ROLE_BITS en el momento de la migración
+MASKS = {"public": 15, "alumno": 14, "instructor": 12, "admin": 8}
+
+
+def fill_masks(apps, schema_editor):
+    Document = apps.get_model("docs", "Document")
+    for visibility, mask in MASKS.items():
+        Document.objects.filter(visibility=visibility).update(visibility_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docs", "0002_technique_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="visibility_mask",
+            field=models.PositiveSmallIntegerField(default=14, editable=False),
+        ),
+        migrations.RunPython(fill_masks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                fields=["-created_at", "id"], name="docs_document_listing_idx"
+            ),
+        ),
+    ]
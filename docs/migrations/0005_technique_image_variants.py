@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docs", "0004_upload_sessions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="technique",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:18
+
+import docs.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docs", "0005_technique_image_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="beltlevel",
+            name="pdf",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                storage=docs.storage.content_storage,
+                upload_to="levels/pdfs/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="document",
+            name="file",
+            field=models.FileField(
+                storage=docs.storage.content_storage, upload_to="documents/files/"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="technique",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=docs.storage.content_storage,
+                upload_to="techniques/images/",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docs", "0006_content_addressed_storage"),
+    ]
+
+    # Un campo normal no se puede convertir en generado: se quita y se vuelve a crear
+    operations = [
+        migrations.RemoveField(
+            model_name="document",
+            name="visibility_mask",
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="visibility_mask",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Case(
+                    models.When(then=models.Value(15), visibility="public"),
+                    models.When(then=models.Value(14), visibility="alumno"),
+                    models.When(then=models.Value(12), visibility="instructor"),
+                    models.When(then=models.Value(8), visibility="admin"),
+                    default=models.Value(8),
+                ),
+                output_field=models.PositiveSmallIntegerField(),
+            ),
+        ),
+    ]
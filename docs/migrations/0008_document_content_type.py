@@ -0,0 +1,47 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:25
+
+from django.db import migrations, models
+
+# Copia de docs.validators.sniff_content_type en el momento de la migración
+SIGNATURES = (
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+)
+
+
+def sniff(head):
+    for magic, content_type in SIGNATURES:
+        if head.startswith(magic):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return ""
+
+
+def fill_content_types(apps, schema_editor):
+    # Los documentos ya subidos: tipo por su contenido (si falta el fichero, se detecta al servir)
+    Document = apps.get_model("docs", "Document")
+    for doc in Document.objects.exclude(file="").only("id", "file").iterator():
+        try:
+            with doc.file.open("rb") as fh:
+                content_type = sniff(fh.read(12))
+        except (FileNotFoundError, OSError):
+            continue
+        Document.objects.filter(pk=doc.pk).update(content_type=content_type)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docs", "0007_document_visibility_mask_generated"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="content_type",
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_content_types, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,39 @@
+import uuid
+
 from django.conf import settings
 from django.db import models
+from django.db.models import Case, F, Value, When
+
+from .storage import content_storage
 
 User = settings.AUTH_USER_MODEL
 
+# Un bit por rol (ANON = sin sesión o rol desconocido) para ``Document.visibility_mask``
+ROLE_BITS = {"ANON": 1, "ALUMNO": 2, "INSTRUCTOR": 4, "ADMIN": 8}
+# Qué roles ven cada visibilidad
+VISIBILITY_ROLES = {
+    "public": ("ANON", "ALUMNO", "INSTRUCTOR", "ADMIN"),
+    "alumno": ("ALUMNO", "INSTRUCTOR", "ADMIN"),
+    "instructor": ("INSTRUCTOR", "ADMIN"),
+    "admin": ("ADMIN",),
+}
+
+
+def visibility_mask(visibility) -> int:
+    return sum(ROLE_BITS[r] for r in VISIBILITY_ROLES.get(visibility, ("ADMIN",)))
+
+
+def role_of(user) -> str:
+    if user is None or not user.is_authenticated:
+        return "ANON"
+    role = getattr(user, "role", "ALUMNO")
+    return role if role in ROLE_BITS else "ANON"
+
 class BeltLevel(models.Model):
     name = models.CharField(max_length=100, unique=True)
     order = models.PositiveIntegerField(default=0, db_index=True)
     is_public = models.BooleanField(default=True)  # visible para anónimos si abres API pública
-    pdf = models.FileField(upload_to="levels/pdfs/", blank=True, null=True)  # luego migraremos a S3
+    pdf = models.FileField(upload_to="levels/pdfs/", storage=content_storage, blank=True, null=True)  # luego migraremos a S3
 
     class Meta:
         ordering = ["order", "id"]
@@ -19,7 +45,8 @@ class Technique(models.Model):
     level = models.ForeignKey(BeltLevel, on_delete=models.CASCADE, related_name="techniques")
     name = models.CharField(max_length=150)
     description = models.TextField(blank=True)
-    image = models.ImageField(upload_to="techniques/images/", blank=True, null=True)  # luego S3
+    image = models.ImageField(upload_to="techniques/images/", storage=content_storage, blank=True, null=True)  # luego S3
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # miniaturas (docs.images)
     video_url = models.URLField(blank=True)
 
     class Meta:
@@ -29,10 +56,27 @@ class Technique(models.Model):
     def __str__(self):
         return f"{self.level.name} · {self.name}"
 
+class DocumentQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        role = role_of(user)
+        if role == "ADMIN":
+            return self
+        bit = ROLE_BITS[role]
+        return self.alias(_visible=F("visibility_mask").bitand(bit)).filter(_visible=bit)
+
+
 class Document(models.Model):
     """
     Documentos varios (circulares, normas, hojas de inscripción, etc.)
     visibility: quién puede verlo.
+    visibility_mask: roles que lo ven (bits de ROLE_BITS). Columna generada
+    (persistida) a partir de visibility: la mantiene la BD, también con
+    ``QuerySet.update``. El filtro por rol es un test de bit sobre un entero.
+
+    Límite: el test de bit no usa índices. El listado recorre
+    ``docs_document_listing_idx`` en orden y descarta las filas que el rol no ve,
+    así que el coste crece con los documentos que se salta (los de visibilidad
+    superior a su rol) hasta llenar la página.
     """
     class Visibility(models.TextChoices):
         PUBLIC = "public", "Public"
@@ -41,12 +85,67 @@ class Document(models.Model):
         ADMIN = "admin", "Admin"
 
     title = models.CharField(max_length=200)
-    file = models.FileField(upload_to="documents/files/")
+    file = models.FileField(upload_to="documents/files/", storage=content_storage)  # nombre = SHA-256 (docs.storage)
     visibility = models.CharField(max_length=20, choices=Visibility.choices, default=Visibility.ALUMNO)
+    visibility_mask = models.GeneratedField(
+        expression=Case(
+            *[When(visibility=v, then=Value(visibility_mask(v))) for v in VISIBILITY_ROLES],
+            default=Value(ROLE_BITS["ADMIN"]),
+        ),
+        output_field=models.PositiveSmallIntegerField(),
+        db_persist=True,
+    )
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True, editable=False)  # subidas por tramos
+    content_type = models.CharField(max_length=100, blank=True, editable=False)  # por magic bytes, no por nombre
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = DocumentQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at", "id"]
+        indexes = [models.Index(fields=["-created_at", "id"], name="docs_document_listing_idx")]
 
     def __str__(self):
         return f"{self.title} ({self.visibility})"
+
+class UploadSession(models.Model):
+    """
+    Subida reanudable por tramos de un documento (ver docs.uploads).
+    Los bytes recibidos se van escribiendo en ``temp_path``; ``received`` es el
+    offset desde el que el cliente debe continuar.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="upload_sessions")
+    title = models.CharField(max_length=200)
+    visibility = models.CharField(max_length=20, choices=Document.Visibility.choices,
+                                  default=Document.Visibility.ALUMNO)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    content_type = models.CharField(max_length=100, blank=True)  # por magic bytes del primer tramo
+    temp_path = models.CharField(max_length=500)
+    document = models.ForeignKey(Document, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+    @property
+    def completed(self):
+        return self.document_id is not None
+
+
+class TechniqueTrigram(models.Model):
+    """
+    Trigramas del nombre de cada técnica: respaldo de la búsqueda para erratas.
+    Lo mantiene docs.search (signals de Technique).
+    """
+    technique = models.ForeignKey(Technique, on_delete=models.CASCADE, related_name="+")
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [models.Index(fields=["trigram", "technique"], name="docs_tech_trigram_idx")]
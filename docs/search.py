@@ -0,0 +1,219 @@
+# backend-tkd-main/docs/search.py
+"""
+Búsqueda indexada de técnicas.
+
+- Análisis en Python (igual al indexar y al buscar): minúsculas, sin acentos,
+  sin stopwords y con un stemmer ligero de español ("patadas" → "patad").
+- Índice de texto completo con el texto ya analizado:
+  SQLite → tabla FTS5 ``docs_technique_fts`` (bm25, nombre pesa más que la descripción);
+  PostgreSQL → tabla ``docs_technique_search`` con tsvector 'simple' + GIN.
+- Respaldo por trigramas del nombre (``TechniqueTrigram``) cuando el texto
+  completo no encuentra nada, para tolerar erratas ("ap chagui").
+
+El índice se mantiene con signals de ``Technique`` (ver docs.signals) y se
+reconstruye con ``manage.py rebuild_technique_index``.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Count
+from django.utils.html import escape
+
+FTS_TABLE = "docs_technique_fts"
+PG_TABLE = "docs_technique_search"
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+TRIGRAM_THRESHOLD = 0.3
+MAX_RESULTS = 500
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset(
+    "a al con de del el en la las lo los o para por que se su sus un una uno unos unas y e u".split()
+)
+# De más largo a más corto: se quita el primero que encaje
+SUFFIXES = (
+    "amientos", "imientos", "amiento", "imiento", "aciones", "uciones",
+    "mente", "acion", "ucion", "ancia", "encia", "ismo", "ista", "able", "ible",
+    "oso", "osa",
+)
+
+
+# ----------------------
+# Análisis
+# ----------------------
+def fold(text: str) -> str:
+    """Minúsculas y sin diacríticos (la ñ pasa a n, como en FTS5 remove_diacritics)."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def stem(word: str) -> str:
+    if len(word) < 4 or word.isdigit():
+        return word
+    if word.endswith("ces"):
+        word = word[:-3] + "z"
+    elif word.endswith("es") and len(word) > 4 and word[-3] not in "aeiou":
+        word = word[:-2]
+    elif word.endswith("s"):
+        word = word[:-1]
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    if len(word) > 3 and word[-1] in "aeo":
+        word = word[:-1]
+    return word
+
+
+def analyze(text: str):
+    return [stem(w) for w in _WORD_RE.findall(fold(text or "")) if w not in STOPWORDS]
+
+
+def trigrams(text: str):
+    grams = set()
+    for word in _WORD_RE.findall(fold(text or "")):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+# ----------------------
+# Mantenimiento del índice
+# ----------------------
+def index_technique(technique):
+    from .models import TechniqueTrigram
+
+    name = " ".join(analyze(technique.name))
+    description = " ".join(analyze(technique.description))
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [technique.pk])
+            cursor.execute(f"INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (%s, %s, %s)",
+                           [technique.pk, name, description])
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                f"INSERT INTO {PG_TABLE} (technique_id, document) VALUES "
+                f"(%s, setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')) "
+                f"ON CONFLICT (technique_id) DO UPDATE SET document = EXCLUDED.document",
+                [technique.pk, name, description],
+            )
+
+    TechniqueTrigram.objects.filter(technique_id=technique.pk).delete()
+    TechniqueTrigram.objects.bulk_create(
+        [TechniqueTrigram(technique_id=technique.pk, trigram=g) for g in trigrams(technique.name)]
+    )
+
+
+def unindex_technique(technique_id):
+    # Los trigramas caen por CASCADE
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [technique_id])
+        elif connection.vendor == "postgresql":
+            cursor.execute(f"DELETE FROM {PG_TABLE} WHERE technique_id = %s", [technique_id])
+
+
+def rebuild_index():
+    from .models import Technique, TechniqueTrigram
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        elif connection.vendor == "postgresql":
+            cursor.execute(f"DELETE FROM {PG_TABLE}")
+    TechniqueTrigram.objects.all().delete()
+    count = 0
+    for technique in Technique.objects.only("id", "name", "description").iterator():
+        index_technique(technique)
+        count += 1
+    return count
+
+
+# ----------------------
+# Búsqueda
+# ----------------------
+def search_techniques(q: str, limit=MAX_RESULTS):
+    """
+    Devuelve [(technique_id, score)] de más a menos relevante (score mayor = mejor)
+    y los stems de la consulta (para resaltar).
+    """
+    stems = analyze(q)
+    if not stems:
+        return [], stems
+    hits = _search_fulltext(stems, limit)
+    if not hits:
+        hits = _search_trigrams(q, limit)
+    return hits, stems
+
+
+def _search_fulltext(stems, limit):
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                f"SELECT rowid, -bm25({FTS_TABLE}, %s, %s) AS score FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s ORDER BY score DESC, rowid LIMIT %s",
+                [NAME_WEIGHT, DESCRIPTION_WEIGHT, " ".join(f'"{s}"*' for s in stems), limit],
+            )
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                f"SELECT technique_id, ts_rank(document, query) AS score "
+                f"FROM {PG_TABLE} CROSS JOIN to_tsquery('simple', %s) query "
+                f"WHERE document @@ query ORDER BY score DESC, technique_id LIMIT %s",
+                [" & ".join(f"{s}:*" for s in stems), limit],
+            )
+        else:
+            return []
+        return [(pk, float(score)) for pk, score in cursor.fetchall()]
+
+
+def _search_trigrams(q, limit):
+    from .models import TechniqueTrigram
+
+    grams = trigrams(q)
+    if not grams:
+        return []
+    rows = (TechniqueTrigram.objects
+            .filter(trigram__in=grams)
+            .values("technique_id")
+            .annotate(shared=Count("id"))
+            .filter(shared__gte=max(1, int(len(grams) * TRIGRAM_THRESHOLD)))
+            .order_by("-shared", "technique_id")[:limit])
+    return [(r["technique_id"], round(r["shared"] / len(grams), 4)) for r in rows]
+
+
+# ----------------------
+# Resaltado
+# ----------------------
+def highlight(text: str, stems, max_words=None) -> str:
+    """
+    Marca con <mark> las palabras cuyo stem empieza por algún stem de la consulta.
+    Con ``max_words`` devuelve un fragmento alrededor de la primera coincidencia.
+    El resultado va escapado (HTML seguro).
+    """
+    text = text or ""
+    words = list(_WORD_RE.finditer(text))
+    hits = [i for i, m in enumerate(words)
+            if any(stem(fold(m.group())).startswith(s) for s in stems)]
+
+    start_char, end_char, prefix, suffix = 0, len(text), "", ""
+    if max_words and len(words) > max_words:
+        first = hits[0] if hits else 0
+        lo = max(0, first - max_words // 3)
+        hi = min(len(words), lo + max_words)
+        start_char, end_char = words[lo].start(), words[hi - 1].end()
+        prefix = "…" if lo > 0 else ""
+        suffix = "…" if hi < len(words) else ""
+
+    out, pos = [prefix], start_char
+    for i in hits:
+        m = words[i]
+        if m.start() < start_char or m.end() > end_char:
+            continue
+        out.append(escape(text[pos:m.start()]))
+        out.append(f"<mark>{escape(m.group())}</mark>")
+        pos = m.end()
+    out.append(escape(text[pos:end_char]))
+    out.append(suffix)
+    return "".join(out)
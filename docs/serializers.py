@@ -1,19 +1,113 @@
 # docs/serializers.py
+from django.urls import reverse
 from rest_framework import serializers
-from .validators import validate_uploaded_file
-from .models import BeltLevel as Level, Technique, Document
+from .validators import sniff_file, stored_name
+from .search import highlight
+from .models import BeltLevel as Level, Technique, Document, UploadSession
 
 class LevelSerializer(serializers.ModelSerializer):
+    # ``pdf`` solo se escribe: leer por pdf_url, que comprueba si el nivel es público
+    pdf_url = serializers.SerializerMethodField()
+
     class Meta:
         model = Level
-        fields = ["id", "name", "order", "is_public", "pdf"]
+        fields = ["id", "name", "order", "is_public", "pdf", "pdf_url"]
+        extra_kwargs = {"pdf": {"write_only": True}}
+
+    def get_pdf_url(self, obj) -> str | None:
+        if not obj.pdf:
+            return None
+        url = reverse("level-pdf", args=[obj.pk])
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
 
 class TechniqueSerializer(serializers.ModelSerializer):
+    # Miniaturas WebP (docs.images): la más pequeña para listados y srcset para <img>
+    thumbnail = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = Technique
-        fields = ["id", "level", "name", "description", "image", "video_url"]
+        fields = ["id", "level", "name", "description", "image", "thumbnail", "srcset", "video_url"]
+
+    def _variant_urls(self, obj):
+        variants = (obj.image_variants or {}).get("widths", {})
+        if not obj.image or obj.image_variants.get("src") != obj.image.name:
+            return []
+        request = self.context.get("request")
+        storage = obj.image.storage
+        urls = []
+        for width, name in sorted(variants.items(), key=lambda item: int(item[0])):
+            url = storage.url(name)
+            urls.append((int(width), request.build_absolute_uri(url) if request else url))
+        return urls
+
+    def get_thumbnail(self, obj) -> str | None:
+        urls = self._variant_urls(obj)
+        return urls[0][1] if urls else None
+
+    def get_srcset(self, obj) -> str:
+        return ", ".join(f"{url} {width}w" for width, url in self._variant_urls(obj))
+
+class TechniqueSearchSerializer(TechniqueSerializer):
+    """Técnica con relevancia y resaltado (?q=). Ver docs.search."""
+    score = serializers.SerializerMethodField()
+    highlight = serializers.SerializerMethodField()
+
+    class Meta(TechniqueSerializer.Meta):
+        fields = TechniqueSerializer.Meta.fields + ["score", "highlight"]
+
+    def get_score(self, obj) -> float:
+        return self.context["search_scores"].get(obj.id)
+
+    def get_highlight(self, obj) -> dict:
+        stems = self.context["search_stems"]
+        return {
+            "name": highlight(obj.name, stems),
+            "description": highlight(obj.description, stems, max_words=30),
+        }
 
 class DocumentSerializer(serializers.ModelSerializer):
+    # ``file`` solo se escribe: leer siempre por download_url, que comprueba visibilidad
+    # (la ruta directa en MEDIA la sirve cualquiera que la conozca)
+    download_url = serializers.SerializerMethodField()
+
     class Meta:
         model = Document
-        fields = ["id", "title", "file", "visibility", "created_at"]
\ No newline at end of file
+        fields = ["id", "title", "file", "download_url", "visibility", "created_at"]
+        extra_kwargs = {"file": {"write_only": True}}
+
+    def validate_file(self, value):
+        # El tipo sale de los magic bytes; la extensión guardada, también
+        content_type = sniff_file(value)
+        if content_type is None:
+            raise serializers.ValidationError("Tipo de archivo no permitido. Usa PDF o imagen (PNG/JPEG/WEBP).")
+        value.name = stored_name(value.name, content_type)
+        value.content_type = content_type
+        return value
+
+    def validate(self, attrs):
+        if "file" in attrs:
+            attrs["content_type"] = attrs["file"].content_type
+        return attrs
+
+    def get_download_url(self, obj) -> str:
+        url = reverse("document-download", args=[obj.pk])
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Subida por tramos: el cliente continúa desde ``received``."""
+    completed = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ["id", "title", "visibility", "filename", "size", "received",
+                  "content_type", "completed", "document", "created_at"]
+        read_only_fields = ["received", "content_type", "document", "created_at"]
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Tamaño inválido.")
+        return value
@@ -0,0 +1,63 @@
+# backend-tkd-main/docs/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import caching, images, search, storage
+from .models import BeltLevel, Document, Technique
+
+
+@receiver(post_save, sender=Technique)
+def technique_saved(sender, instance, raw=False, **kwargs):
+    if not raw:  # loaddata: se reindexa con rebuild_technique_index
+        search.index_technique(instance)
+
+
+@receiver(post_save, sender=Technique)
+def technique_image_saved(sender, instance, raw=False, **kwargs):
+    if raw or not images.needs_variants(instance):
+        return
+    if not instance.image:
+        Technique.objects.filter(pk=instance.pk).update(image_variants={})
+        return
+    # Miniaturas fuera de la petición (docs.images); solo si la imagen llega a guardarse
+    transaction.on_commit(lambda: images.pool.submit(instance.pk))
+
+
+@receiver(post_delete, sender=Technique)
+def technique_deleted(sender, instance, **kwargs):
+    search.unindex_technique(instance.pk)
+
+
+# Versiones de la caché HTTP del catálogo (docs.caching)
+@receiver([post_save, post_delete], sender=BeltLevel)
+def level_changed(sender, **kwargs):
+    caching.bump_on_change("levels")
+
+
+@receiver([post_save, post_delete], sender=Technique)
+def technique_changed(sender, **kwargs):
+    caching.bump_on_change("techniques")
+
+
+@receiver([post_save, post_delete], sender=Document)
+def document_changed(sender, **kwargs):
+    caching.bump_on_change("documents")
+
+
+# Recuento de referencias del almacenamiento por contenido (docs.storage)
+@receiver(post_delete, sender=BeltLevel)
+def level_file_released(sender, instance, **kwargs):
+    storage.release(instance.pdf.name if instance.pdf else "")
+
+
+@receiver(post_delete, sender=Document)
+def document_file_released(sender, instance, **kwargs):
+    storage.release(instance.file.name if instance.file else "")
+
+
+@receiver(post_delete, sender=Technique)
+def technique_file_released(sender, instance, **kwargs):
+    # Las miniaturas salen del mismo contenido: caen con la imagen
+    variants = (instance.image_variants or {}).get("widths", {}).values()
+    storage.release(instance.image.name if instance.image else "", extra=tuple(variants))
@@ -0,0 +1,129 @@
+# backend-tkd-main/docs/storage.py
+"""
+Almacenamiento direccionado por contenido para los ficheros de docs
+(``BeltLevel.pdf``, ``Technique.image``, ``Document.file``).
+
+- El nombre es el SHA-256 del contenido: ``cas/ab/cd/<sha256>.<ext>`` (dos
+  niveles de subdirectorio para no tener miles de ficheros por carpeta).
+- Si ya existe, no se vuelve a escribir: el mismo PDF subido para varios
+  niveles/documentos ocupa disco una sola vez.
+- La URL de un contenido (``MEDIA_URL`` + nombre) no cambia nunca: el servidor
+  web la puede servir como ``immutable``. Las descargas por pk de docs.downloads
+  usan el hash como ETag pero no son inmutables.
+- Recuento de referencias: al borrar un modelo, su fichero se elimina si ya
+  ninguna fila lo usa (ver docs.signals) y no se ha escrito ni reutilizado en
+  los últimos ``DOCS_MEDIA_MIN_AGE`` segundos. Reutilizar un contenido ya
+  guardado actualiza su mtime: así no se borra bajo una transacción que aún
+  no ha confirmado la fila que lo referencia. Lo que quede huérfano (ficheros
+  recientes, reemplazados, subidas abortadas) lo recoge ``manage.py gc_media``.
+"""
+import hashlib
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+PREFIX = "cas"
+DEFAULT_MIN_AGE = 3600
+
+# (app_label.Model, campo) que guardan ficheros en este almacenamiento
+FILE_FIELDS = (
+    ("docs.BeltLevel", "pdf"),
+    ("docs.Technique", "image"),
+    ("docs.Document", "file"),
+)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def content_name(self, name, content) -> str:
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        ext = os.path.splitext(name)[1].lower()
+        return f"{PREFIX}/{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}{ext}"
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.touch(name):
+            return name  # mismo contenido: sin escribir otra copia
+        return super().save(name, content, max_length=max_length)
+
+    def touch(self, name) -> bool:
+        """Marca ``name`` como recién usado (ver ``release``). False si no existe."""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+
+def is_content_addressed(name) -> bool:
+    return bool(name) and name.startswith(f"{PREFIX}/")
+
+
+_storage = ContentAddressedStorage()
+
+
+def min_age():
+    return getattr(settings, "DOCS_MEDIA_MIN_AGE", DEFAULT_MIN_AGE)
+
+
+def content_storage():
+    """Callable para ``FileField(storage=...)`` (la migración guarda la ruta, no la instancia)."""
+    return _storage
+
+
+# ----------------------
+# Referencias
+# ----------------------
+def reference_count(name) -> int:
+    total = 0
+    for label, field in FILE_FIELDS:
+        total += apps.get_model(label).objects.filter(**{field: name}).count()
+    return total
+
+
+def referenced_names():
+    """Todos los nombres en uso (ficheros y miniaturas de técnicas)."""
+    names = set()
+    for label, field in FILE_FIELDS:
+        names.update(apps.get_model(label).objects.exclude(**{field: ""})
+                     .exclude(**{f"{field}__isnull": True}).values_list(field, flat=True))
+    Technique = apps.get_model("docs.Technique")
+    for variants in Technique.objects.exclude(image_variants={}).values_list("image_variants", flat=True):
+        names.update((variants or {}).get("widths", {}).values())
+    return names
+
+
+def release(name, extra=()):
+    """
+    Tras el commit, borra ``name`` (y sus ``extra``, p. ej. miniaturas) si es
+    direccionado por contenido, ninguna fila lo referencia ya y es más antiguo
+    que ``DOCS_MEDIA_MIN_AGE``; si no, se queda para ``gc_media``.
+    """
+    if not is_content_addressed(name):
+        return
+
+    def _release():
+        if reference_count(name) != 0:
+            return
+        cutoff = time.time() - min_age()
+        for orphan in (name, *extra):
+            try:
+                if _storage.get_modified_time(orphan).timestamp() > cutoff:
+                    continue  # escrito o reutilizado hace poco: quizá por una transacción en curso
+            except FileNotFoundError:
+                continue
+            _storage.delete(orphan)
+
+    transaction.on_commit(_release)
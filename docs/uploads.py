@@ -0,0 +1,205 @@
+# backend-tkd-main/docs/uploads.py
+"""
+Subidas reanudables por tramos (alternativa a multipart para ficheros grandes).
+
+1. ``start_session``: se declara nombre y tamaño; se rechaza ya si supera
+   ``DOCS_MAX_UPLOAD_SIZE`` (antes de recibir un solo byte).
+2. ``write_chunk``: cada PUT trae ``Content-Range: bytes a-b/total`` y se
+   escribe en disco por bloques (nunca el tramo entero en memoria). El primer
+   tramo se valida por magic bytes. Si se corta, el cliente consulta
+   ``received`` y reenvía desde ahí. La copia va sin transacción; ``received``
+   avanza con un UPDATE condicional (solo si sigue valiendo el inicio del tramo).
+3. ``complete``: SHA-256 del fichero; si ya hay un documento con el mismo
+   contenido se reutiliza su fichero en vez de guardar otra copia.
+
+Los tramos a medias viven en ``DOCS_UPLOAD_TEMP_DIR`` (fuera de MEDIA) y se
+limpian con ``manage.py purge_upload_sessions``.
+"""
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Document, UploadSession
+from .storage import content_storage
+from .validators import DEFAULT_MAX_SIZE, MAGIC_MIN_BYTES, sniff_content_type, stored_name
+
+BLOCK_SIZE = 64 * 1024
+DEFAULT_CHUNK_MAX = 8 * 1024 * 1024
+DEFAULT_SESSION_TTL = 24 * 3600
+
+_CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+class UploadError(Exception):
+    def __init__(self, detail, status=400, discard=False, **extra):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+        self.discard = discard  # la sesión no tiene arreglo: se borra
+        self.extra = extra
+
+
+def max_upload_size():
+    return getattr(settings, "DOCS_MAX_UPLOAD_SIZE", DEFAULT_MAX_SIZE)
+
+
+def _temp_dir():
+    path = getattr(settings, "DOCS_UPLOAD_TEMP_DIR", os.path.join(settings.BASE_DIR, "tmp", "uploads"))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def parse_content_range(header):
+    match = _CONTENT_RANGE_RE.match((header or "").strip())
+    if not match:
+        raise UploadError("Falta Content-Range válido (bytes inicio-fin/total).")
+    start, end, total = map(int, match.groups())
+    if end < start:
+        raise UploadError("Content-Range inválido.")
+    return start, end, total
+
+
+def start_session(owner, title, visibility, filename, size):
+    if size > max_upload_size():
+        raise UploadError(f"Archivo demasiado grande. Máximo {max_upload_size() // (1024 * 1024)} MB.", status=413)
+    session = UploadSession(owner=owner, title=title, visibility=visibility,
+                            filename=os.path.basename(filename), size=size)
+    session.temp_path = os.path.join(_temp_dir(), f"{session.id}.part")
+    open(session.temp_path, "wb").close()
+    session.save()
+    return session
+
+
+def write_chunk(session_id, start, end, total, stream):
+    """Escribe ``stream`` en [start, end] y devuelve la sesión actualizada."""
+    try:
+        return _write_chunk(session_id, start, end, total, stream)
+    except UploadError as e:
+        if e.discard:
+            session = UploadSession.objects.filter(pk=session_id).first()
+            if session is not None:
+                abort(session)
+        raise
+
+
+def _write_chunk(session_id, start, end, total, stream):
+    # Sin transacción ni bloqueo durante la copia: solo el avance de received es
+    # condicional (UPDATE ... WHERE received = start). Dos PUT del mismo tramo
+    # escriben los mismos bytes; solo uno avanza y el otro recibe 409.
+    session = UploadSession.objects.get(pk=session_id)
+    if session.completed:
+        raise UploadError("La subida ya está completada.", status=409, received=session.received)
+    if total != session.size or end >= session.size:
+        raise UploadError("El rango no encaja con el tamaño declarado.")
+    if start != session.received:
+        # Tramo repetido o adelantado: el cliente debe continuar desde received
+        raise UploadError("Offset incorrecto.", status=409, received=session.received)
+    length = end - start + 1
+    if length > getattr(settings, "DOCS_UPLOAD_CHUNK_MAX", DEFAULT_CHUNK_MAX):
+        raise UploadError("Tramo demasiado grande.", status=413)
+    if start == 0 and length < min(MAGIC_MIN_BYTES, session.size):
+        raise UploadError(f"El primer tramo debe tener al menos {MAGIC_MIN_BYTES} bytes.")
+
+    changes = {"received": end + 1, "updated_at": timezone.now()}
+    written = 0
+    with open(session.temp_path, "r+b") as fh:
+        fh.seek(start)
+        if start == 0:
+            head = _read_exact(stream, min(MAGIC_MIN_BYTES, length))
+            content_type = sniff_content_type(head)
+            if content_type is None:
+                raise UploadError("Tipo de archivo no permitido. Usa PDF o imagen (PNG/JPEG/WEBP).",
+                                  status=415, discard=True)
+            changes["content_type"] = content_type
+            fh.write(head)
+            written = len(head)
+        while written < length:
+            block = stream.read(min(BLOCK_SIZE, length - written))
+            if not block:
+                break
+            fh.write(block)
+            written += len(block)
+    if written < length:
+        # Lo escrito más allá de received no cuenta: el reenvío lo sobrescribe
+        raise UploadError("Tramo incompleto.", received=session.received)
+
+    advanced = (UploadSession.objects
+                .filter(pk=session_id, received=start, document__isnull=True)
+                .update(**changes))
+    session.refresh_from_db()
+    if not advanced:
+        raise UploadError("Offset incorrecto.", status=409, received=session.received)
+    return session
+
+
+def _read_exact(stream, size):
+    data = b""
+    while len(data) < size:
+        block = stream.read(size - len(data))
+        if not block:
+            break
+        data += block
+    return data
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def complete(session_id):
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session_id)
+        if session.completed:
+            return session.document
+        if session.received != session.size:
+            raise UploadError("Faltan tramos por subir.", status=409, received=session.received)
+
+        sha256 = _sha256(session.temp_path)
+        doc = Document(title=session.title, visibility=session.visibility, sha256=sha256,
+                       content_type=session.content_type)
+        duplicate = Document.objects.filter(sha256=sha256).exclude(file="").only("file").first()
+        # touch: el fichero compartido cuenta como recién usado (ver docs.storage.release)
+        if duplicate is not None and content_storage().touch(duplicate.file.name):
+            doc.file.name = duplicate.file.name  # mismo contenido: sin segunda copia
+            doc.save()
+        else:
+            with open(session.temp_path, "rb") as fh:
+                doc.file.save(stored_name(session.filename, session.content_type), File(fh), save=True)
+
+        session.document = doc
+        session.save(update_fields=["document", "updated_at"])
+    _remove(session.temp_path)
+    return doc
+
+
+def abort(session):
+    _remove(session.temp_path)
+    session.delete()
+
+
+def purge_stale(max_age=None):
+    """Borra sesiones (y sus ficheros temporales) sin actividad en ``max_age`` segundos."""
+    max_age = max_age if max_age is not None else getattr(settings, "DOCS_UPLOAD_SESSION_TTL", DEFAULT_SESSION_TTL)
+    stale = UploadSession.objects.filter(updated_at__lt=timezone.now() - timedelta(seconds=max_age))
+    count = 0
+    for session in stale.iterator():
+        abort(session)
+        count += 1
+    return count
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -4,18 +4,32 @@ from .views import (
     LevelListCreateView, LevelDetailView,
     TechniqueListCreateView, TechniqueDetailView,
     DocumentListCreateView, DocumentDetailView,
+    LevelPdfView, TechniqueImageView, DocumentDownloadView,
+    UploadSessionCreateView, UploadSessionDetailView, UploadSessionCompleteView,
+    CurriculumView,
 )
 
 urlpatterns = [
     # Levels
     path("levels/", LevelListCreateView.as_view()),
     path("levels/<int:pk>/", LevelDetailView.as_view()),
+    path("levels/<int:pk>/pdf/", LevelPdfView.as_view(), name="level-pdf"),
 
     # Techniques
     path("techniques/", TechniqueListCreateView.as_view()),
     path("techniques/<int:pk>/", TechniqueDetailView.as_view()),
+    path("techniques/<int:pk>/image/", TechniqueImageView.as_view()),
+
+    # Temario completo (niveles + técnicas) en una petición
+    path("curriculum/", CurriculumView.as_view()),
 
     # Documents
     path("documents/", DocumentListCreateView.as_view()),
     path("documents/<int:pk>/", DocumentDetailView.as_view()),
+    path("documents/<int:pk>/download/", DocumentDownloadView.as_view(), name="document-download"),
+
+    # Subidas por tramos (reanudables)
+    path("documents/uploads/", UploadSessionCreateView.as_view()),
+    path("documents/uploads/<uuid:pk>/", UploadSessionDetailView.as_view()),
+    path("documents/uploads/<uuid:pk>/complete/", UploadSessionCompleteView.as_view()),
 ]
@@ -1,3 +1,5 @@
+import os
+
 from django.conf import settings
 from django.core.exceptions import ValidationError
 
@@ -8,8 +10,47 @@ ALLOWED_CONTENT_TYPES = {
     "image/webp",
 }
 
+# Extensión con la que se guarda cada tipo: sale del contenido, no del nombre del cliente
+EXTENSIONS = {
+    "application/pdf": ".pdf",
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+}
+
 DEFAULT_MAX_SIZE = 20 * 1024 * 1024  # 20 MB
 
+# Bytes necesarios para reconocer el tipo por su firma (RIFF....WEBP)
+MAGIC_MIN_BYTES = 12
+
+
+def sniff_content_type(head: bytes):
+    """Tipo real según los primeros bytes (magic bytes) o None si no es uno permitido."""
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def sniff_file(file_obj):
+    """``sniff_content_type`` de un fichero abierto (lo deja al principio)."""
+    file_obj.seek(0)
+    head = file_obj.read(MAGIC_MIN_BYTES)
+    file_obj.seek(0)
+    return sniff_content_type(head)
+
+
+def stored_name(filename, content_type) -> str:
+    """Nombre del cliente con la extensión del tipo detectado ("x.html" con un PDF → "x.pdf")."""
+    stem = os.path.splitext(os.path.basename(filename or ""))[0] or "documento"
+    return stem + EXTENSIONS[content_type]
+
+
 def validate_uploaded_file(file_obj):
     """
     Valida content-type y tamaño de archivo.
@@ -1,11 +1,26 @@
-from django.db.models import Q
-from rest_framework import generics, permissions
+import io
+
+from django.conf import settings
+from django.db.models import Case, IntegerField, When
+from django.http import HttpResponse, HttpResponseNotModified
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import generics, permissions, status
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from users.permissions import IsEmailVerified
-from .models import BeltLevel as Level, Technique, Document
-from .serializers import LevelSerializer, TechniqueSerializer, DocumentSerializer
+from .models import BeltLevel as Level, Technique, Document, UploadSession
+from . import curriculum, search, uploads
+from .caching import CachedResponseMixin
+from .downloads import IgnoreClientContentNegotiation, display_name, serve_file
+from .serializers import (
+    LevelSerializer, TechniqueSerializer, TechniqueSearchSerializer, DocumentSerializer,
+    UploadSessionSerializer,
+)
 from .permissions import (
     IsAdminOrInstructorOrReadOnly,
     IsAdminInstructorAlumnoReadOnly,
@@ -23,14 +38,17 @@ class DefaultPagination(PageNumberPagination):
 # ------------------------------
 # 🔹 Niveles (lectura pública)
 # ------------------------------
-class LevelListCreateView(generics.ListCreateAPIView):
+# Lecturas con ETag/304 y respuesta cacheada (docs.caching); la salida no depende del rol
+class LevelListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
+    cache_tables = ("levels",)
     queryset = Level.objects.all().order_by("order", "id")
     serializer_class = LevelSerializer
     permission_classes = [IsAdminOrInstructorOrReadOnly]
     pagination_class = DefaultPagination
 
 
-class LevelDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LevelDetailView(CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
+    cache_tables = ("levels",)
     queryset = Level.objects.all()
     serializer_class = LevelSerializer
     permission_classes = [IsAdminOrInstructorOrReadOnly]
@@ -39,7 +57,8 @@ class LevelDetailView(generics.RetrieveUpdateDestroyAPIView):
 # ------------------------------
 # 🔹 Técnicas (lectura pública)
 # ------------------------------
-class TechniqueListCreateView(generics.ListCreateAPIView):
+class TechniqueListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
+    cache_tables = ("techniques",)
     serializer_class = TechniqueSerializer
     permission_classes = [IsAdminOrInstructorOrReadOnly]
     pagination_class = DefaultPagination
@@ -52,44 +71,220 @@ class TechniqueListCreateView(generics.ListCreateAPIView):
         if level_id:
             queryset = queryset.filter(level_id=level_id)
         if q:
-            queryset = queryset.filter(
-                Q(name__icontains=q) | Q(description__icontains=q)
-            )
+            # Índice de búsqueda (docs.search) en vez de icontains; orden por relevancia
+            hits, self.search_stems = search.search_techniques(q)
+            self.search_scores = dict(hits)
+            if not hits:
+                return queryset.none()
+            ranking = Case(*[When(id=pk, then=pos) for pos, (pk, _) in enumerate(hits)],
+                           output_field=IntegerField())
+            return queryset.filter(id__in=self.search_scores).order_by(ranking, "id")
 
         return queryset.order_by("id")
 
+    def _searching(self):
+        return self.request.method == "GET" and bool(self.request.query_params.get("q"))
+
+    def get_serializer_class(self):
+        return TechniqueSearchSerializer if self._searching() else TechniqueSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self._searching():
+            context["search_scores"] = getattr(self, "search_scores", {})
+            context["search_stems"] = getattr(self, "search_stems", [])
+        return context
 
-class TechniqueDetailView(generics.RetrieveUpdateDestroyAPIView):
+
+class TechniqueDetailView(CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
+    cache_tables = ("techniques",)
     queryset = Technique.objects.select_related("level").all()
     serializer_class = TechniqueSerializer
     permission_classes = [IsAdminOrInstructorOrReadOnly]
 
 
+# ------------------------------
+# 🔹 Temario completo (docs.curriculum)
+# ------------------------------
+class CurriculumView(APIView):
+    """Niveles públicos con sus técnicas, precomprimido y cacheado por versión."""
+    authentication_classes = []  # público: ni siquiera se busca al usuario
+    permission_classes = [permissions.AllowAny]
+    content_negotiation_class = IgnoreClientContentNegotiation
+
+    def get(self, request):
+        etag, blobs = curriculum.get_blobs(request)
+        coding = curriculum.pick_encoding(request.META.get("HTTP_ACCEPT_ENCODING"), blobs)
+        etag = curriculum.coding_etag(etag, coding)
+        if etag and etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(blobs[coding], content_type="application/json")
+            if coding != "identity":
+                response["Content-Encoding"] = coding
+        if etag:
+            response["ETag"] = etag
+        patch_vary_headers(response, ["Accept-Encoding"])
+        patch_cache_control(response, public=True,
+                            max_age=getattr(settings, "DOCS_CACHE_MAX_AGE", 60),
+                            s_maxage=getattr(settings, "DOCS_CACHE_S_MAXAGE", 300))
+        return response
+
+
 # ------------------------------
 # 🔹 Documentos (solo autenticados)
 # ------------------------------
 
-class DocumentListCreateView(generics.ListCreateAPIView):
+class DocumentListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
     serializer_class = DocumentSerializer
     permission_classes = [IsAdminInstructorAlumnoReadOnly]
     pagination_class = DefaultPagination
     parser_classes = [MultiPartParser, FormParser]  # 👈 IMPORTANTE
+    # Mismas páginas para todos los usuarios de un rol: caché por (rol, page, page_size)
+    cache_tables = ("documents",)
+    cache_vary_by_role = True
 
     def get_queryset(self):
-        user = self.request.user
-        qs = Document.objects.all().order_by("-created_at", "id")
-        if not user.is_authenticated:
-            return qs.filter(visibility="public")
-        role = getattr(user, "role", "ALUMNO")
-        if role == "ADMIN":
-            return qs
-        if role == "INSTRUCTOR":
-            return qs.filter(visibility__in=["public", "instructor", "alumno"])
-        if role == "ALUMNO":
-            return qs.filter(visibility__in=["public", "alumno"])
-        return qs.filter(visibility="public")
+        return Document.objects.visible_to(self.request.user).order_by("-created_at", "id")
 
 class DocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Document.objects.all()
     serializer_class = DocumentSerializer
     permission_classes = [IsAdminInstructorAlumnoReadOnly]
+
+    def get_queryset(self):
+        return Document.objects.visible_to(self.request.user)
+
+
+# ------------------------------
+# 🔹 Subidas por tramos (docs.uploads)
+# ------------------------------
+def _upload_error(e):
+    return Response({"detail": e.detail, **e.extra}, status=e.status)
+
+
+class UploadSessionCreateView(generics.CreateAPIView):
+    """POST: abre la subida (title, visibility, filename, size)."""
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAdminInstructorAlumnoReadOnly]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            session = uploads.start_session(owner=request.user, **serializer.validated_data)
+        except uploads.UploadError as e:
+            return _upload_error(e)
+        return Response(self.get_serializer(session).data, status=status.HTTP_201_CREATED)
+
+
+class UploadSessionDetailView(APIView):
+    """
+    GET: estado (``received`` = offset desde el que continuar).
+    PUT: un tramo en bruto con ``Content-Range: bytes a-b/total``.
+    DELETE: cancela la subida.
+    """
+    permission_classes = [IsAdminInstructorAlumnoReadOnly]
+
+    def get_object(self, pk):
+        return get_object_or_404(UploadSession, pk=pk, owner=self.request.user)
+
+    def get(self, request, pk):
+        return Response(UploadSessionSerializer(self.get_object(pk)).data)
+
+    def put(self, request, pk):
+        session = self.get_object(pk)
+        try:
+            start, end, total = uploads.parse_content_range(request.headers.get("Content-Range"))
+            # Se lee del stream por bloques: el cuerpo no pasa por los parsers ni se carga entero
+            session = uploads.write_chunk(session.pk, start, end, total, request.stream or io.BytesIO())
+        except uploads.UploadError as e:
+            return _upload_error(e)
+        return Response(UploadSessionSerializer(session).data)
+
+    def delete(self, request, pk):
+        uploads.abort(self.get_object(pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionCompleteView(APIView):
+    """POST: ensambla el documento (o reutiliza uno idéntico por SHA-256)."""
+    permission_classes = [IsAdminInstructorAlumnoReadOnly]
+
+    def post(self, request, pk):
+        session = get_object_or_404(UploadSession, pk=pk, owner=request.user)
+        try:
+            doc = uploads.complete(session.pk)
+        except uploads.UploadError as e:
+            return _upload_error(e)
+        return Response(DocumentSerializer(doc, context={"request": request}).data,
+                        status=status.HTTP_201_CREATED)
+
+
+# ------------------------------
+# 🔹 Descargas (permiso comprobado aquí; entrega en docs.downloads)
+# ------------------------------
+class FileDownloadView(generics.GenericAPIView):
+    content_negotiation_class = IgnoreClientContentNegotiation
+    file_field = None
+
+    def is_public(self, obj):
+        """True → cacheable por navegadores/CDN; False → privada (Vary: Authorization)."""
+        return False
+
+    def content_type(self, obj):
+        """Tipo ya detectado al subir; None → se detecta por magic bytes al servir."""
+        return None
+
+    def download_label(self, obj):
+        """Nombre legible (sin extensión) para Content-Disposition; el guardado es el hash."""
+        return None
+
+    def get(self, request, *args, **kwargs):
+        obj = self.get_object()
+        field_file = getattr(obj, self.file_field)
+        label = self.download_label(obj)
+        return serve_file(request, field_file, public=self.is_public(obj),
+                          content_type=self.content_type(obj),
+                          filename=display_name(label, field_file.name) if label and field_file else None)
+
+
+class DocumentDownloadView(FileDownloadView):
+    permission_classes = [IsAdminInstructorAlumnoReadOnly]
+    file_field = "file"
+
+    def get_queryset(self):
+        return Document.objects.visible_to(self.request.user)
+
+    def content_type(self, obj):
+        return obj.content_type or None
+
+    def download_label(self, obj):
+        return obj.title
+
+
+class LevelPdfView(FileDownloadView):
+    permission_classes = [IsAdminOrInstructorOrReadOnly]
+    file_field = "pdf"
+
+    def get_queryset(self):
+        # Niveles no públicos: solo con sesión
+        qs = Level.objects.all()
+        return qs if self.request.user.is_authenticated else qs.filter(is_public=True)
+
+    def is_public(self, obj):
+        return obj.is_public
+
+    def download_label(self, obj):
+        return obj.name
+
+
+class TechniqueImageView(FileDownloadView):
+    queryset = Technique.objects.all()
+    permission_classes = [IsAdminOrInstructorOrReadOnly]
+    file_field = "image"
+
+    def is_public(self, obj):
+        return True
+
+    def download_label(self, obj):
+        return obj.name
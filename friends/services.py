@@ -2,6 +2,31 @@
 from django.utils import timezone
 from django.db import transaction
 from .models import FriendRequest, Friendship, Block
+from .utils import is_blocked_either
+
+@transaction.atomic
+def create_friend_request(from_user, to_user, message: str = "") -> FriendRequest:
+    """
+    Crea la solicitud pendiente from_user -> to_user. Si ya existe una pendiente
+    en ese sentido se devuelve; si existe en sentido contrario se acepta.
+    """
+    if is_blocked_either(from_user.id, to_user.id):
+        raise PermissionError("Bloqueo activo entre ambos usuarios.")
+    if are_friends(from_user.id, to_user.id):
+        raise ValueError("Ya sois amigos.")
+
+    reverse = FriendRequest.objects.filter(
+        status=FriendRequest.Status.PENDING, from_user=to_user, to_user=from_user
+    ).first()
+    if reverse:
+        accept_request(reverse)
+        return reverse
+
+    fr, _ = FriendRequest.objects.get_or_create(
+        from_user=from_user, to_user=to_user, status=FriendRequest.Status.PENDING,
+        defaults={"message": message},
+    )
+    return fr
 
 @transaction.atomic
 def accept_request(fr: FriendRequest) -> Friendship:
@@ -37,10 +62,31 @@ def cancel_request(fr: FriendRequest):
 
 def are_friends(user_id: int, other_id: int) -> bool:
     a, b = Friendship.normalize_pair(user_id, other_id)
-    from .models import Friendship as F
-    return F.objects.filter(user1_id=a, user2_id=b).exists()
+    return Friendship.objects.filter(user1_id=a, user2_id=b).exists()
+
+def unfriend(user_id: int, other_id: int) -> bool:
+    a, b = Friendship.normalize_pair(user_id, other_id)
+    deleted, _ = Friendship.objects.filter(user1_id=a, user2_id=b).delete()
+    return bool(deleted)
+
+@transaction.atomic
+def block_user(blocker, blocked) -> Block:
+    """Bloquear rompe la amistad y cancela las solicitudes pendientes entre ambos."""
+    block, _ = Block.objects.get_or_create(blocker=blocker, blocked=blocked)
+    unfriend(blocker.id, blocked.id)
+    FriendRequest.objects.filter(
+        status=FriendRequest.Status.PENDING,
+        from_user_id__in=[blocker.id, blocked.id], to_user_id__in=[blocker.id, blocked.id],
+    ).update(status=FriendRequest.Status.CANCELED, decided_at=timezone.now())
+    return block
+
+def unblock_user(blocker, blocked) -> bool:
+    deleted = 0
+    # delete() por instancia para que salten los signals (caché de bloqueos, chat)
+    for block in Block.objects.filter(blocker=blocker, blocked=blocked):
+        block.delete()
+        deleted += 1
+    return bool(deleted)
 
 def is_blocked(user_id: int, other_id: int) -> bool:
-    from .models import Block
-    return Block.objects.filter(blocker_id=user_id, blocked_id=other_id).exists() or \
-           Block.objects.filter(blocker_id=other_id, blocked_id=user_id).exists()
+    return is_blocked_either(user_id, other_id)
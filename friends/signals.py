@@ -0,0 +1,15 @@
+# backend-tkd-main/friends/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Block
+from .utils import invalidate_block_cache
+
+
+@receiver([post_save, post_delete], sender=Block)
+def block_changed(sender, instance, **kwargs):
+    ids = (instance.blocker_id, instance.blocked_id)
+    invalidate_block_cache(*ids)
+    # Y otra vez al confirmar, por si otra petición rellenó la caché con el estado previo
+    transaction.on_commit(lambda: invalidate_block_cache(*ids))
@@ -4,12 +4,20 @@ from .views import (
     FriendRequestCreateView,
     FriendRequestAcceptView,
     FriendRequestRejectView,
+    FriendRequestCancelView,
+    FriendRequestListView,
     FriendsListView,
+    UnfriendView,
+    BlockView,
 )
 
 urlpatterns = [
     path("requests/", FriendRequestCreateView.as_view(), name="friendrequest-create"),
+    path("requests/pending/", FriendRequestListView.as_view(), name="friendrequest-list"),
     path("requests/<int:id>/accept/", FriendRequestAcceptView.as_view(), name="friendrequest-accept"),
     path("requests/<int:id>/reject/", FriendRequestRejectView.as_view(), name="friendrequest-reject"),
+    path("requests/<int:id>/cancel/", FriendRequestCancelView.as_view(), name="friendrequest-cancel"),
+    path("unfriend/<int:user_id>/", UnfriendView.as_view(), name="friends-unfriend"),
+    path("block/<int:user_id>/", BlockView.as_view(), name="friends-block"),
     path("", FriendsListView.as_view(), name="friends-list"),
 ]
@@ -1,6 +1,77 @@
 # backend-tkd-main/friends/utils.py
+"""
+Comprobaciones de bloqueo entre usuarios.
+
+Opcionalmente se cachea el conjunto de bloqueos de cada usuario en una caché de
+Django (``FRIENDS_BLOCK_CACHE`` = alias de ``CACHES``; ``None`` la desactiva).
+La caché se invalida en cada alta/baja de ``Block`` (ver ``friends.signals``),
+así que en despliegues con varios procesos debe ser una caché compartida.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+
 from .models import Block
 
+BLOCK_CACHE_TTL = 300  # segundos
+
+
+def _block_cache():
+    alias = getattr(settings, "FRIENDS_BLOCK_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def _cache_key(user_id) -> str:
+    return f"friends:blocks:{user_id}"
+
+
+def _other_ids(user_id: int, rows) -> set:
+    return {blocked if blocker == user_id else blocker for blocker, blocked in rows}
+
+
+def get_block_set(user_id: int) -> frozenset:
+    """Ids de los usuarios con los que ``user_id`` tiene un bloqueo, en cualquier sentido."""
+    cache = _block_cache()
+    if cache is not None:
+        cached = cache.get(_cache_key(user_id))
+        if cached is not None:
+            return cached
+
+    rows = (Block.objects
+            .filter(Q(blocker_id=user_id) | Q(blocked_id=user_id))
+            .values_list("blocker_id", "blocked_id"))
+    ids = frozenset(_other_ids(user_id, rows))
+    if cache is not None:
+        cache.set(_cache_key(user_id), ids, getattr(settings, "FRIENDS_BLOCK_CACHE_TTL", BLOCK_CACHE_TTL))
+    return ids
+
+
 def is_blocked_either(a_id: int, b_id: int) -> bool:
-    return Block.objects.filter(blocker_id=a_id, blocked_id=b_id).exists() or \
-           Block.objects.filter(blocker_id=b_id, blocked_id=a_id).exists()
+    """True si cualquiera de los dos usuarios ha bloqueado al otro (una sola consulta)."""
+    if _block_cache() is not None:
+        return b_id in get_block_set(a_id)
+    return Block.objects.filter(
+        Q(blocker_id=a_id, blocked_id=b_id) | Q(blocker_id=b_id, blocked_id=a_id)
+    ).exists()
+
+
+def blocked_pairs(user_id: int, candidate_ids) -> set:
+    """Subconjunto de ``candidate_ids`` con bloqueo (en cualquier sentido) respecto a ``user_id``."""
+    candidates = set(candidate_ids)
+    candidates.discard(user_id)
+    if not candidates:
+        return set()
+    if _block_cache() is not None:
+        return candidates & get_block_set(user_id)
+
+    rows = (Block.objects
+            .filter(Q(blocker_id=user_id, blocked_id__in=candidates) |
+                    Q(blocked_id=user_id, blocker_id__in=candidates))
+            .values_list("blocker_id", "blocked_id"))
+    return _other_ids(user_id, rows)
+
+
+def invalidate_block_cache(*user_ids):
+    cache = _block_cache()
+    if cache is not None:
+        cache.delete_many([_cache_key(uid) for uid in user_ids])
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, permissions
+from rest_framework import generics, status, permissions
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.throttling import ScopedRateThrottle
 
 from django.contrib.auth import get_user_model
-from .models import FriendRequest
-from .serializers import FriendRequestCreateSerializer
+from .models import FriendRequest, Friendship
+from .serializers import (
+    BlockSerializer, FriendListItemSerializer,
+    FriendRequestCreateSerializer, FriendRequestSerializer,
+)
 from . import services
 
 User = get_user_model()
@@ -24,8 +29,14 @@ class FriendRequestCreateView(APIView):
         ser.is_valid(raise_exception=True)
         target = ser.validated_data["target_user"]
 
-        fr = services.create_friend_request(request.user, target)
-        created = fr.status == "pending" and fr.from_user_id == request.user.id and fr.to_user_id == target.id
+        try:
+            fr = services.create_friend_request(request.user, target)
+        except PermissionError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        created = (fr.status == FriendRequest.Status.PENDING
+                   and fr.from_user_id == request.user.id and fr.to_user_id == target.id)
 
         return Response(
             {
@@ -67,3 +78,82 @@ class FriendRequestRejectView(APIView):
 
         services.reject_request(fr)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class FriendRequestCancelView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = "friends"
+
+    def post(self, request, id: int, *args, **kwargs):
+        fr = get_object_or_404(FriendRequest, id=id)
+        if fr.from_user_id != request.user.id:
+            return Response({"detail": "No autorizado."}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            services.cancel_request(fr)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class FriendsPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class FriendsListView(generics.ListAPIView):
+    """Amigos del usuario autenticado (una consulta + count, sin N+1)."""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = FriendListItemSerializer
+    pagination_class = FriendsPagination
+
+    def get_queryset(self):
+        me = self.request.user.id
+        as_user1 = Friendship.objects.filter(user1_id=me).values("user2_id")
+        as_user2 = Friendship.objects.filter(user2_id=me).values("user1_id")
+        return (User.objects
+                .filter(Q(id__in=as_user1) | Q(id__in=as_user2))
+                .only("id", "username", "email")
+                .order_by("username", "id"))
+
+
+class FriendRequestListView(generics.ListAPIView):
+    """Solicitudes pendientes: recibidas (por defecto) o enviadas (?box=sent)."""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = FriendRequestSerializer
+    pagination_class = FriendsPagination
+
+    def get_queryset(self):
+        qs = (FriendRequest.objects
+              .filter(status=FriendRequest.Status.PENDING)
+              .select_related("from_user", "to_user")
+              .order_by("-created_at", "-id"))
+        if self.request.query_params.get("box") == "sent":
+            return qs.filter(from_user=self.request.user)
+        return qs.filter(to_user=self.request.user)
+
+
+class UnfriendView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, user_id: int, *args, **kwargs):
+        if not services.unfriend(request.user.id, user_id):
+            return Response({"detail": "No sois amigos."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class BlockView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, user_id: int, *args, **kwargs):
+        target = get_object_or_404(User, id=user_id)
+        if target.id == request.user.id:
+            return Response({"detail": "No puedes bloquearte a ti mismo."}, status=status.HTTP_400_BAD_REQUEST)
+        block = services.block_user(request.user, target)
+        return Response(BlockSerializer(block).data, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, user_id: int, *args, **kwargs):
+        if not services.unblock_user(request.user, get_object_or_404(User, id=user_id)):
+            return Response({"detail": "No hay bloqueo."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
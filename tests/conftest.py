@@ -43,3 +43,39 @@ def auth_client_factory():
         client.credentials(HTTP_AUTHORIZATION=f"Bearer {str(access)}")
         return client, str(refresh)
     return _make
+
+@pytest.fixture(autouse=True)
+def in_memory_channel_layer(settings):
+    """Los tests no dependen de Redis: capa de canales local en proceso."""
+    settings.CHANNEL_LAYERS = {"default": {"BACKEND": "chat.layers.LocalChannelLayer"}}
+    # El outbox se drena a mano en los tests (chat.outbox.dispatch_pending)
+    settings.CHAT_OUTBOX_AUTODISPATCH = False
+
+@pytest.fixture(autouse=True)
+def isolated_media(settings, tmp_path):
+    """Ficheros subidos y tramos a medias en tmp_path: nunca en el media real (gc_media lo recorre)."""
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    settings.DOCS_UPLOAD_TEMP_DIR = str(tmp_path / "uploads")
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """La caché local sobrevive entre tests: se vacía en cada uno."""
+    from django.core.cache import caches
+    for cache in caches.all():
+        cache.clear()
+    yield
+
+@pytest.fixture
+def conversation_factory(db):
+    """Crea una conversación con los usuarios dados como participantes."""
+    from chat.models import Conversation, ConversationParticipant
+
+    def _make(users, is_group=None, name=""):
+        is_group = len(users) > 2 if is_group is None else is_group
+        key = "" if is_group else ":".join(str(i) for i in sorted(u.id for u in users))
+        conv = Conversation.objects.create(is_group=is_group, name=name, one_to_one_key=key)
+        ConversationParticipant.objects.bulk_create(
+            [ConversationParticipant(conversation=conv, user=u) for u in users]
+        )
+        return conv
+    return _make
@@ -0,0 +1,62 @@
+"""
+Soporte para presupuestos de consultas por endpoint.
+
+``QueryRecorder`` cuenta las consultas SQL y su tiempo total mientras está
+activo. Los presupuestos vigentes están en ``query_budgets.json`` (junto a
+este fichero); se regeneran con:
+
+    UPDATE_QUERY_BUDGETS=1 python -m pytest tests/test_query_budgets.py
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+from django.db import connection
+
+BUDGETS_PATH = Path(__file__).with_name("query_budgets.json")
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []  # (sql, segundos)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    def __enter__(self):
+        self._ctx = connection.execute_wrapper(self)
+        self._ctx.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._ctx.__exit__(*exc)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def sql_ms(self):
+        return round(sum(t for _, t in self.queries) * 1000, 3)
+
+    def describe(self):
+        return "\n".join(sql for sql, _ in self.queries)
+
+
+def updating_budgets() -> bool:
+    return os.getenv("UPDATE_QUERY_BUDGETS") == "1"
+
+
+def load_budgets() -> dict:
+    if not BUDGETS_PATH.exists():
+        return {}
+    return json.loads(BUDGETS_PATH.read_text())
+
+
+def save_budgets(report: dict):
+    BUDGETS_PATH.write_text(json.dumps(dict(sorted(report.items())), indent=2) + "\n")
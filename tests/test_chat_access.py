@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.asgi import application
+from chat.models import ConversationParticipant
+from chat.outbox import dispatch_pending
+from friends.models import Block
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def _communicator(conv, user):
+    return WebsocketCommunicator(application, f"/ws/chat/{conv.id}/?token={AccessToken.for_user(user)}")
+
+
+def test_send_path_does_not_query_authorization(create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conv = conversation_factory([a, b])
+
+    async def run():
+        comm = _communicator(conv, a)
+        assert (await comm.connect())[0]
+        for i in range(5):
+            await comm.send_json_to({"action": "message", "content": f"hola {i}"})
+            await comm.receive_json_from(timeout=2)  # ack
+            await comm.receive_json_from(timeout=2)  # message.new
+        await comm.disconnect()
+
+    with CaptureQueriesContext(connection) as ctx:
+        async_to_sync(run)()
+    sqls = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+    # Solo las consultas del connect; ninguna por mensaje
+    assert sum("chat_conversationparticipant" in q for q in sqls) == 1
+    assert sum("friends_block" in q for q in sqls) <= 2
+
+
+def test_block_created_after_connect_invalidates_cache(create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conv = conversation_factory([a, b])
+
+    async def run():
+        comm = _communicator(conv, a)
+        assert (await comm.connect())[0]
+        await database_sync_to_async(Block.objects.create)(blocker=b, blocked=a)
+        await database_sync_to_async(dispatch_pending)()
+        await asyncio.sleep(0.1)
+        await comm.send_json_to({"action": "message", "content": "hola"})
+        reply = await comm.receive_json_from(timeout=2)
+        await comm.disconnect()
+        return reply
+
+    reply = async_to_sync(run)()
+    assert reply["type"] == "error"
+
+
+def test_removed_participant_is_disconnected(create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    c = create_user("carla", "carla@example.com")
+    conv = conversation_factory([a, b, c])
+
+    async def run():
+        comm = _communicator(conv, c)
+        assert (await comm.connect())[0]
+        await database_sync_to_async(
+            ConversationParticipant.objects.filter(conversation=conv, user=c).delete
+        )()
+        await database_sync_to_async(dispatch_pending)()
+        output = await comm.receive_output(timeout=2)
+        await comm.wait()
+        return output
+
+    assert async_to_sync(run)()["type"] == "websocket.close"
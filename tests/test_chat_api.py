@@ -0,0 +1,117 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from chat import counters
+from chat.models import ConversationParticipant, Message
+
+pytestmark = pytest.mark.django_db
+
+
+def _send(conv, sender, content):
+    msg = Message.objects.create(conversation=conv, sender=sender, content=content)
+    counters.record_new_messages([msg])
+    return msg
+
+
+def _count_queries(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        res = client.get(url)
+    assert res.status_code == 200
+    return len(ctx.captured_queries), res
+
+
+def test_conversation_list_constant_queries(auth_client_factory, create_user, conversation_factory):
+    me = create_user("ana", "ana@example.com")
+    others = [create_user(f"u{i}", f"u{i}@example.com") for i in range(12)]
+    client, _ = auth_client_factory(me)
+
+    for other in others[:3]:
+        conv = conversation_factory([me, other])
+        _send(conv, other, "hola")
+    small, _ = _count_queries(client, "/api/chat/conversations/")
+
+    for other in others[3:]:
+        conv = conversation_factory([me, other])
+        _send(conv, other, "hola")
+    big, res = _count_queries(client, "/api/chat/conversations/")
+
+    assert small == big
+    assert len(res.data) == 12
+    first = res.data[0]
+    assert first["unread_count"] == 1
+    assert first["last_message"]["content"] == "hola"
+    assert set(first["participants"]) == {me.id, others[-1].id}
+
+
+def test_unread_count_resets_on_read(auth_client_factory, create_user, conversation_factory):
+    me = create_user("ana", "ana@example.com")
+    other = create_user("beto", "beto@example.com")
+    conv = conversation_factory([me, other])
+    _send(conv, other, "1")
+    _send(conv, me, "mío")
+    counters.mark_read(conv.id, me.id, timezone.now())
+    _send(conv, other, "2")
+
+    client, _ = auth_client_factory(me)
+    res = client.get("/api/chat/conversations/")
+    assert res.data[0]["unread_count"] == 1
+    assert res.data[0]["last_message"]["content"] == "2"
+
+
+def test_message_list_seen_by_constant_queries(auth_client_factory, create_user, conversation_factory):
+    me = create_user("ana", "ana@example.com")
+    other = create_user("beto", "beto@example.com")
+    conv = conversation_factory([me, other])
+    client, _ = auth_client_factory(me)
+    url = f"/api/chat/conversations/{conv.id}/messages/"
+
+    for i in range(3):
+        Message.objects.create(conversation=conv, sender=me, content=f"a{i}")
+    small, _ = _count_queries(client, url)
+
+    ConversationParticipant.objects.filter(conversation=conv, user=other).update(last_read_at=timezone.now())
+    for i in range(20):
+        Message.objects.create(conversation=conv, sender=me, content=f"b{i}")
+    big, res = _count_queries(client, url)
+
+    assert small == big
+    results = res.data["results"]
+    seen = {m["content"]: m["seen_by"] for m in results}
+    assert seen["a0"] == [other.id]
+    assert seen["b0"] == []
+    assert results[0]["sender"] == {"id": me.id, "username": "ana"}
+
+
+def test_unread_counters_maintained_and_rebuilt(auth_client_factory, create_user, conversation_factory):
+    from django.core.management import call_command
+    from chat.models import Conversation
+
+    me = create_user("ana", "ana@example.com")
+    other = create_user("beto", "beto@example.com")
+    conv = conversation_factory([me, other])
+    c_me, _ = auth_client_factory(me)
+    c_other, _ = auth_client_factory(other)
+    url = f"/api/chat/conversations/{conv.id}/messages/"
+
+    for i in range(3):
+        assert c_other.post(url, {"content": f"m{i}"}, format="json").status_code == 201
+    assert c_me.post(url, {"content": "yo"}, format="json").status_code == 201
+
+    parts = dict(ConversationParticipant.objects.filter(conversation=conv).values_list("user_id", "unread_count"))
+    assert parts == {me.id: 3, other.id: 1}
+    conv.refresh_from_db()
+    assert conv.last_message.content == "yo"
+
+    assert c_me.post(f"/api/chat/conversations/{conv.id}/read/").status_code == 200
+    assert ConversationParticipant.objects.get(conversation=conv, user=me).unread_count == 0
+
+    # Rompemos los contadores a mano y el comando los reconstruye
+    ConversationParticipant.objects.update(unread_count=99)
+    Conversation.objects.update(last_message=None, last_message_at=None)
+    call_command("rebuild_chat_counters")
+    parts = dict(ConversationParticipant.objects.filter(conversation=conv).values_list("user_id", "unread_count"))
+    assert parts == {me.id: 0, other.id: 1}
+    conv.refresh_from_db()
+    assert conv.last_message.content == "yo"
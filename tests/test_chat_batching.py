@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.asgi import application
+from chat.batching import MessageWriteBuffer
+from chat.models import Message, OutboxEvent
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def test_buffer_coalesces_concurrent_messages(create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conv = conversation_factory([a, b])
+    buf = MessageWriteBuffer(max_batch=50, window=0.05)
+
+    async def run():
+        return await asyncio.gather(*(buf.submit(conv.id, a.id, f"m{i}") for i in range(10)))
+
+    rows = async_to_sync(run)()
+    assert buf.stats == {"batches": 1, "messages": 10}
+    assert len({r["id"] for r in rows}) == 10
+    assert all(r["sender_username"] == "ana" for r in rows)
+    assert Message.objects.filter(conversation=conv).count() == 10
+
+
+def test_buffer_enqueues_inbox_unread_with_the_batch(create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    c = create_user("carla", "carla@example.com")
+    conv = conversation_factory([a, b, c], is_group=True)
+    OutboxEvent.objects.all().delete()
+    buf = MessageWriteBuffer(max_batch=50, window=0.05)
+
+    async def run():
+        return await asyncio.gather(*(buf.submit(conv.id, a.id, f"m{i}", [b.id, c.id]) for i in range(3)))
+
+    rows = async_to_sync(run)()
+    events = list(OutboxEvent.objects.values_list("group", "payload"))
+    assert len(events) == 6
+    assert {g for g, _ in events} == {f"user_{b.id}", f"user_{c.id}"}
+    assert {p["message_id"] for _, p in events} == {r["id"] for r in rows}
+    assert all(p["event"] == "inbox.unread" for _, p in events)
+
+
+def test_buffer_flushes_when_batch_is_full(create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conv = conversation_factory([a, b])
+    buf = MessageWriteBuffer(max_batch=3, window=10)
+
+    async def run():
+        return await asyncio.gather(*(buf.submit(conv.id, b.id, f"m{i}") for i in range(6)))
+
+    rows = async_to_sync(run)()
+    assert buf.stats == {"batches": 2, "messages": 6}
+    assert [r["content"] for r in rows] == [f"m{i}" for i in range(6)]
+
+
+def test_ws_message_is_acked_and_broadcast(create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conv = conversation_factory([a, b])
+
+    async def run():
+        comm = WebsocketCommunicator(application, f"/ws/chat/{conv.id}/?token={AccessToken.for_user(a)}")
+        connected, _ = await comm.connect()
+        assert connected
+        await comm.send_json_to({"action": "message", "content": "hola", "client_id": "c1"})
+        ack = await comm.receive_json_from(timeout=2)
+        event = await comm.receive_json_from(timeout=2)
+        await comm.disconnect()
+        return ack, event
+
+    ack, event = async_to_sync(run)()
+    assert ack["type"] == "message.ack" and ack["client_id"] == "c1"
+    assert event["event"] == "message.new"
+    assert event["message"]["id"] == ack["id"]
+    assert event["message"]["sender"] == {"id": a.id, "username": "ana"}
@@ -0,0 +1,78 @@
+import pytest
+from asgiref.sync import async_to_sync
+from channels.exceptions import ChannelFull
+
+from chat.layers import LocalChannelLayer
+
+
+def test_group_send_fans_out_to_every_member():
+    layer = LocalChannelLayer()
+
+    async def run():
+        channels = [await layer.new_channel() for _ in range(5)]
+        for ch in channels:
+            await layer.group_add("conv_1", ch)
+        await layer.group_send("conv_1", {"type": "chat.message", "n": 1})
+        return [await layer.receive(ch) for ch in channels]
+
+    received = async_to_sync(run)()
+    assert [m["n"] for m in received] == [1] * 5
+    assert layer.stats()["delivered"] == 5
+
+
+def test_bounded_queues_drop_and_count():
+    layer = LocalChannelLayer(capacity=2)
+
+    async def run():
+        ch = await layer.new_channel()
+        await layer.group_add("g", ch)
+        for i in range(4):
+            await layer.group_send("g", {"type": "x", "i": i})
+        with pytest.raises(ChannelFull):
+            await layer.send(ch, {"type": "x"})
+        return [(await layer.receive(ch))["i"] for _ in range(2)]
+
+    assert async_to_sync(run)() == [0, 1]
+    assert layer.stats()["dropped_full"] == 3
+
+
+def test_expired_messages_are_skipped_and_channel_leaves_groups():
+    layer = LocalChannelLayer(expiry=0, sweep_interval=0)
+
+    async def run():
+        ch = await layer.new_channel()
+        await layer.group_add("g", ch)
+        await layer.send(ch, {"type": "old"})
+        await layer.group_send("g", {"type": "new"})  # barre el caducado y expulsa al canal
+
+    async_to_sync(run)()
+    stats = layer.stats()
+    assert stats["expired"] == 1
+    assert stats["groups"] == 0
+
+
+def test_second_process_refuses_local_layer(tmp_path):
+    import subprocess
+    import sys
+
+    from django.core.exceptions import ImproperlyConfigured
+
+    lock = str(tmp_path / "layer.lock")
+    # Otro proceso ya usa la capa local con este fichero de bloqueo
+    holder = subprocess.Popen(
+        [sys.executable, "-c",
+         "import fcntl, sys, time; f = open(sys.argv[1], 'a+'); fcntl.flock(f, fcntl.LOCK_EX); "
+         "print('ok', flush=True); time.sleep(30)", lock],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        assert holder.stdout.readline().strip() == "ok"
+        with pytest.raises(ImproperlyConfigured):
+            LocalChannelLayer(single_process_lock=lock)
+    finally:
+        holder.kill()
+        holder.wait()
+
+    # Libre: este proceso la toma y puede crear más instancias
+    LocalChannelLayer(single_process_lock=lock)
+    LocalChannelLayer(single_process_lock=lock)
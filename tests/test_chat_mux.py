@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.asgi import application
+from chat.models import ConversationParticipant
+from chat.outbox import dispatch_pending
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def _mux(user):
+    return WebsocketCommunicator(application, f"/ws/chat/?token={AccessToken.for_user(user)}")
+
+
+async def _subscribe(comm, conv_id):
+    await comm.send_json_to({"action": "subscribe", "conversation_id": conv_id})
+    return await comm.receive_json_from(timeout=2)
+
+
+def test_one_socket_serves_several_conversations(create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    c = create_user("carla", "carla@example.com")
+    conv_ab = conversation_factory([a, b])
+    conv_ac = conversation_factory([a, c])
+
+    async def run():
+        ana, beto = _mux(a), _mux(b)
+        assert (await ana.connect())[0] and (await beto.connect())[0]
+        assert (await _subscribe(ana, conv_ab.id))["type"] == "subscribed"
+        assert (await _subscribe(ana, conv_ac.id))["type"] == "subscribed"
+        assert (await _subscribe(beto, conv_ab.id))["type"] == "subscribed"
+
+        await beto.send_json_to({"action": "message", "conversation_id": conv_ab.id, "content": "hola"})
+        ack = await beto.receive_json_from(timeout=2)
+        await database_sync_to_async(dispatch_pending)()  # inbox.unread va por el outbox
+        received = [await ana.receive_json_from(timeout=2) for _ in range(2)]
+        await ana.disconnect()
+        await beto.disconnect()
+        return ack, received
+
+    ack, received = async_to_sync(run)()
+    assert ack["type"] == "message.ack" and ack["conversation_id"] == conv_ab.id
+    events = {ev["event"]: ev for ev in received}
+    assert events["message.new"]["conversation_id"] == conv_ab.id
+    assert events["message.new"]["message"]["content"] == "hola"
+    assert events["inbox.unread"]["message_id"] == ack["id"]
+
+
+def test_subscribe_checks_participation_and_limit(settings, create_user, conversation_factory):
+    settings.CHAT_MAX_SUBSCRIPTIONS = 1
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    c = create_user("carla", "carla@example.com")
+    conv_ab = conversation_factory([a, b])
+    conv_ac = conversation_factory([a, c])
+    conv_bc = conversation_factory([b, c])
+
+    async def run():
+        ana = _mux(a)
+        assert (await ana.connect())[0]
+        foreign = await _subscribe(ana, conv_bc.id)
+        first = await _subscribe(ana, conv_ab.id)
+        over_limit = await _subscribe(ana, conv_ac.id)
+        await ana.send_json_to({"action": "message", "conversation_id": conv_ac.id, "content": "x"})
+        not_subscribed = await ana.receive_json_from(timeout=2)
+        await ana.disconnect()
+        return foreign, first, over_limit, not_subscribed
+
+    foreign, first, over_limit, not_subscribed = async_to_sync(run)()
+    assert foreign["type"] == "error"
+    assert first["type"] == "subscribed"
+    assert over_limit["type"] == "error"
+    assert not_subscribed["type"] == "error"
+
+
+def test_removed_participant_is_unsubscribed_but_socket_stays(create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    c = create_user("carla", "carla@example.com")
+    group = conversation_factory([a, b, c], is_group=True)
+    other = conversation_factory([a, b])
+
+    async def run():
+        ana = _mux(a)
+        assert (await ana.connect())[0]
+        await _subscribe(ana, group.id)
+        await _subscribe(ana, other.id)
+        await database_sync_to_async(
+            ConversationParticipant.objects.filter(conversation=group, user=a).delete
+        )()
+        await database_sync_to_async(dispatch_pending)()
+        revoked = await ana.receive_json_from(timeout=2)
+        await asyncio.sleep(0.05)
+        await ana.send_json_to({"action": "typing.start", "conversation_id": other.id})
+        still_open = await ana.receive_json_from(timeout=2)
+        await ana.disconnect()
+        return revoked, still_open
+
+    revoked, still_open = async_to_sync(run)()
+    assert revoked == {"type": "unsubscribed", "conversation_id": group.id,
+                       "detail": "Ya no tienes acceso a esta conversación."}
+    assert still_open["event"] == "typing.start" and still_open["conversation_id"] == other.id
+
+
+def test_new_conversation_reaches_the_inbox(settings, create_user, auth_client_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    client, _ = auth_client_factory(a)
+
+    async def run():
+        beto = _mux(b)
+        assert (await beto.connect())[0]
+        res = await database_sync_to_async(client.post)(
+            "/api/chat/conversations/create/", {"is_group": False, "users": [b.id]}, format="json"
+        )
+        await database_sync_to_async(dispatch_pending)()
+        event = await beto.receive_json_from(timeout=2)
+        await beto.disconnect()
+        return res, event
+
+    res, event = async_to_sync(run)()
+    assert res.status_code == 201
+    assert event["event"] == "conversation.new" and event["conversation_id"] == res.data["id"]
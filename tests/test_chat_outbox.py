@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.utils import timezone
+
+from chat.events import conversation_group
+from chat.models import OutboxEvent
+from chat.outbox import _claim, dispatch_pending, dispatcher, enqueue
+
+pytestmark = pytest.mark.django_db
+
+
+def _join(conv):
+    layer = get_channel_layer()
+    channel = async_to_sync(layer.new_channel)()
+    async_to_sync(layer.group_add)(conversation_group(conv.id), channel)
+    return layer, channel
+
+
+def test_rest_events_go_through_outbox(auth_client_factory, create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conv = conversation_factory([a, b])
+    dispatch_pending()  # chat.access del alta de la conversación
+    layer, channel = _join(conv)
+    client, _ = auth_client_factory(a)
+
+    res = client.post(f"/api/chat/conversations/{conv.id}/messages/", {"content": "hola"}, format="json")
+    assert res.status_code == 201
+    assert client.post(f"/api/chat/conversations/{conv.id}/read/").status_code == 200
+    # Nada sale hasta que el despachador drena la tabla
+    assert layer.stats().get("delivered", 0) == 0
+    # message.new + inbox.unread de beto + conversation.read
+    assert OutboxEvent.objects.count() == 3
+
+    assert dispatch_pending(batch_size=1) == 3
+    assert OutboxEvent.objects.count() == 0
+    first = async_to_sync(layer.receive)(channel)
+    second = async_to_sync(layer.receive)(channel)
+    assert first["event"] == "message.new" and first["message"]["content"] == "hola"
+    assert second["event"] == "conversation.read" and second["by"] == a.id
+
+
+def test_rolled_back_events_are_never_sent(create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conv = conversation_factory([a, b])
+    dispatch_pending()
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            enqueue(conversation_group(conv.id), {"type": "chat.message", "event": "x"})
+            raise RuntimeError("rollback")
+    assert dispatch_pending() == 0
+
+
+def test_failed_send_requeues_unsent_events(monkeypatch):
+    for i in range(3):
+        enqueue(f"g{i}", {"type": "chat.message", "event": str(i)})
+    layer = get_channel_layer()
+    real_send = layer.group_send
+
+    async def flaky_send(group, message):
+        if group == "g1":
+            raise ConnectionError("capa caída")
+        await real_send(group, message)
+
+    monkeypatch.setattr(layer, "group_send", flaky_send)
+    with pytest.raises(ConnectionError):
+        dispatch_pending()
+    # g0 salió y se borró; g1 y g2 siguen en la tabla sin lease (mismo orden)
+    assert list(OutboxEvent.objects.values_list("group", "claimed_at")) == [("g1", None), ("g2", None)]
+
+    monkeypatch.setattr(layer, "group_send", real_send)
+    assert dispatch_pending() == 2
+
+
+def test_claimed_events_survive_a_dead_dispatcher(settings):
+    settings.CHAT_OUTBOX_LEASE = 60
+    enqueue("g0", {"type": "chat.message", "event": "0"})
+    # Un despachador reclama el lote y muere antes de enviarlo
+    assert [ev.group for ev in _claim(10)] == ["g0"]
+    assert OutboxEvent.objects.count() == 1
+    # Mientras el lease está vigente nadie más lo toma
+    assert dispatch_pending() == 0
+
+    OutboxEvent.objects.update(claimed_at=timezone.now() - timedelta(seconds=61))
+    assert dispatch_pending() == 1
+    assert OutboxEvent.objects.count() == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_background_dispatcher_delivers_to_open_sockets(settings, auth_client_factory, create_user,
+                                                        conversation_factory):
+    from channels.db import database_sync_to_async
+    from channels.testing import WebsocketCommunicator
+    from rest_framework_simplejwt.tokens import AccessToken
+    from backend.asgi import application
+
+    settings.CHAT_OUTBOX_AUTODISPATCH = True
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conv = conversation_factory([a, b])
+    client, _ = auth_client_factory(a)
+
+    async def run():
+        comm = WebsocketCommunicator(application, f"/ws/chat/{conv.id}/?token={AccessToken.for_user(b)}")
+        assert (await comm.connect())[0]
+        res = await database_sync_to_async(client.post)(
+            f"/api/chat/conversations/{conv.id}/messages/", {"content": "desde REST"}, format="json"
+        )
+        assert res.status_code == 201
+        event = await comm.receive_json_from(timeout=3)
+        await comm.disconnect()
+        return event
+
+    try:
+        event = async_to_sync(run)()
+    finally:
+        dispatcher.stop()
+    assert event["event"] == "message.new" and event["message"]["content"] == "desde REST"
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from chat.models import Message
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def timeline(create_user, conversation_factory):
+    """25 mensajes; los 10 primeros comparten created_at (como tras un bulk_create)."""
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conv = conversation_factory([a, b])
+    base = timezone.now() - timedelta(hours=1)
+    msgs = Message.objects.bulk_create([Message(conversation=conv, sender=a, content=str(i)) for i in range(25)])
+    for i, m in enumerate(msgs):
+        m.created_at = base if i < 10 else base + timedelta(seconds=i)
+    Message.objects.bulk_update(msgs, ["created_at"])
+    return a, conv, msgs
+
+
+def _ids(res):
+    return [m["id"] for m in res.data["results"]]
+
+
+def test_cursor_walks_whole_history_without_gaps_or_offset(auth_client_factory, timeline):
+    user, conv, msgs = timeline
+    client, _ = auth_client_factory(user)
+    url = f"/api/chat/conversations/{conv.id}/messages/?page_size=4"
+
+    seen = []
+    with CaptureQueriesContext(connection) as ctx:
+        while url:
+            res = client.get(url)
+            assert res.status_code == 200
+            seen += _ids(res)
+            url = res.data["next"]
+    assert seen == [m.id for m in reversed(msgs)]
+    assert not any("OFFSET" in q["sql"] for q in ctx.captured_queries)
+
+
+def test_previous_link_returns_newer_page(auth_client_factory, timeline):
+    user, conv, msgs = timeline
+    client, _ = auth_client_factory(user)
+    first = client.get(f"/api/chat/conversations/{conv.id}/messages/?page_size=5")
+    assert first.data["previous"] is None
+    second = client.get(first.data["next"])
+    back = client.get(second.data["previous"])
+    assert _ids(back) == _ids(first)
+
+
+def test_after_message_id_returns_newer_messages(auth_client_factory, timeline):
+    user, conv, msgs = timeline
+    client, _ = auth_client_factory(user)
+    res = client.get(f"/api/chat/conversations/{conv.id}/messages/?after={msgs[5].id}&page_size=100")
+    assert _ids(res) == [m.id for m in reversed(msgs[6:])]
+    assert res.data["previous"] is None
+
+    bad = client.get(f"/api/chat/conversations/{conv.id}/messages/?cursor=nope")
+    assert bad.status_code == 404
@@ -0,0 +1,56 @@
+"""
+Regresión de planes de consulta: timeline de mensajes e inbox deben usar índices.
+"""
+import pytest
+from django.db import connection
+
+from chat.models import Message
+from chat.pagination import NEWER, OLDER, keyset_filter
+from chat.views import ConversationViewSet
+
+pytestmark = pytest.mark.django_db
+
+
+def _explain(qs):
+    if connection.vendor == "postgresql":
+        # Con tablas diminutas Postgres prefiere seq scan; lo desactivamos para ver el índice elegible
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+    return qs.explain()
+
+
+def _assert_index_scan(plan, index_name, ordered_by_index=False):
+    if connection.vendor == "sqlite":
+        assert f"INDEX {index_name}" in plan, plan
+        if ordered_by_index:
+            assert "TEMP B-TREE" not in plan, plan
+    elif connection.vendor == "postgresql":
+        assert index_name in plan and "Index" in plan, plan
+    else:
+        pytest.skip(f"Sin aserciones de plan para {connection.vendor}")
+
+
+def test_message_timeline_uses_partial_index(create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conv = conversation_factory([a, b])
+    qs = (Message.objects
+          .filter(conversation_id=conv.id, is_deleted=False)
+          .order_by("-created_at", "-id"))
+
+    _assert_index_scan(_explain(qs[:30]), "chat_msg_timeline_idx", ordered_by_index=True)
+    # Páginas siguientes: seek keyset sobre (created_at, id) en ambos sentidos
+    for direction in (OLDER, NEWER):
+        page = keyset_filter(qs, conv.created_at, 1, direction=direction)[:30]
+        _assert_index_scan(_explain(page), "chat_msg_timeline_idx", ordered_by_index=True)
+
+
+def test_inbox_uses_participant_user_index(rf, create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conversation_factory([a, b])
+    view = ConversationViewSet()
+    view.request = rf.get("/api/chat/conversations/")
+    view.request.user = a
+
+    _assert_index_scan(_explain(view.get_queryset()), "chat_part_user_conv_idx")
@@ -0,0 +1,87 @@
+import pytest
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.asgi import application
+from chat.models import Message
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def _messages(conv, sender, n):
+    return [Message.objects.create(conversation=conv, sender=sender, content=f"m{i}") for i in range(n)]
+
+
+def _receive_until_done(comm):
+    async def run():
+        frames = []
+        while not frames or frames[-1]["type"] not in ("backfill.done", "error"):
+            frames.append(await comm.receive_json_from(timeout=2))
+        return frames
+    return run()
+
+
+def test_resume_from_streams_missed_messages_in_chunks(settings, create_user, conversation_factory):
+    settings.CHAT_BACKFILL_CHUNK = 2
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conv = conversation_factory([a, b])
+    msgs = _messages(conv, b, 5)
+
+    async def run():
+        comm = WebsocketCommunicator(
+            application, f"/ws/chat/{conv.id}/?token={AccessToken.for_user(a)}&resume_from={msgs[1].id}"
+        )
+        assert (await comm.connect())[0]
+        frames = await _receive_until_done(comm)
+        await comm.disconnect()
+        return frames
+
+    frames = async_to_sync(run)()
+    assert [f["type"] for f in frames] == ["backfill", "backfill", "backfill.done"]
+    streamed = [m["id"] for f in frames[:-1] for m in f["messages"]]
+    assert streamed == [m.id for m in msgs[2:]]
+    assert frames[-1] == {"type": "backfill.done", "conversation_id": conv.id,
+                          "count": 3, "last_id": msgs[-1].id, "truncated": False}
+
+
+def test_backfill_is_capped_and_continues_over_rest(settings, create_user, conversation_factory):
+    settings.CHAT_BACKFILL_CHUNK = 2
+    settings.CHAT_BACKFILL_MAX = 3
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conv = conversation_factory([a, b])
+    msgs = _messages(conv, b, 6)
+
+    async def run():
+        comm = WebsocketCommunicator(application, f"/ws/chat/?token={AccessToken.for_user(a)}")
+        assert (await comm.connect())[0]
+        await comm.send_json_to({"action": "subscribe", "conversation_id": conv.id, "resume_from": msgs[0].id})
+        assert (await comm.receive_json_from(timeout=2))["type"] == "subscribed"
+        frames = await _receive_until_done(comm)
+        await comm.disconnect()
+        return frames
+
+    done = async_to_sync(run)()[-1]
+    assert done["count"] == 3 and done["truncated"] is True
+    assert done["last_id"] == msgs[3].id
+
+
+def test_resume_from_foreign_message_is_rejected(create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    c = create_user("carla", "carla@example.com")
+    conv = conversation_factory([a, b])
+    foreign = _messages(conversation_factory([b, c]), b, 1)[0]
+
+    async def run():
+        comm = WebsocketCommunicator(
+            application, f"/ws/chat/{conv.id}/?token={AccessToken.for_user(a)}&resume_from={foreign.id}"
+        )
+        assert (await comm.connect())[0]
+        frames = await _receive_until_done(comm)
+        await comm.disconnect()
+        return frames
+
+    assert async_to_sync(run)()[-1]["type"] == "error"
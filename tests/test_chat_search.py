@@ -0,0 +1,118 @@
+import pytest
+
+from chat.models import Message
+
+pytestmark = pytest.mark.django_db
+
+
+def _msg(conv, sender, content):
+    return Message.objects.create(conversation=conv, sender=sender, content=content)
+
+
+@pytest.fixture
+def chat(create_user, conversation_factory, auth_client_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    c = create_user("carla", "carla@example.com")
+    conv_ab = conversation_factory([a, b])
+    conv_bc = conversation_factory([b, c])
+    client, _ = auth_client_factory(a)
+    return a, b, conv_ab, conv_bc, client
+
+
+def test_search_in_conversation_is_ranked_and_accent_insensitive(chat):
+    a, b, conv, _, client = chat
+    weak = _msg(conv, b, "mañana entrenamos la patada y luego estiramientos")
+    strong = _msg(conv, a, "patada patada: revisa la técnica de la patada")
+    _msg(conv, b, "nada que ver")
+
+    res = client.get(f"/api/chat/conversations/{conv.id}/messages/search/", {"q": "PATADA"})
+    assert res.status_code == 200
+    assert [m["id"] for m in res.data["results"]] == [strong.id, weak.id]
+
+    res = client.get(f"/api/chat/conversations/{conv.id}/messages/search/", {"q": "manana"})
+    assert [m["id"] for m in res.data["results"]] == [weak.id]
+
+
+def test_global_search_only_covers_my_conversations(chat):
+    a, b, conv_ab, conv_bc, client = chat
+    mine = _msg(conv_ab, b, "examen de cinturón el sábado")
+    _msg(conv_bc, b, "examen de cinturón secreto")
+
+    res = client.get("/api/chat/messages/search/", {"q": "examen cinturon"})
+    assert [m["id"] for m in res.data["results"]] == [mine.id]
+    assert client.get(f"/api/chat/conversations/{conv_bc.id}/messages/search/", {"q": "examen"}).status_code == 403
+
+
+def test_index_follows_edits_deletes_and_bulk_inserts(chat):
+    a, b, conv, _, client = chat
+    edited = _msg(conv, b, "combate el viernes")
+    hidden = _msg(conv, b, "combate cancelado")
+    Message.objects.bulk_create([Message(conversation=conv, sender=b, content="combate en grupo")])
+
+    edited.content = "sparring el viernes"
+    edited.save()
+    hidden.is_deleted = True
+    hidden.save()
+
+    res = client.get("/api/chat/messages/search/", {"q": "combate"})
+    assert [m["content"] for m in res.data["results"]] == ["combate en grupo"]
+    res = client.get("/api/chat/messages/search/", {"q": "sparr"})  # prefijo
+    assert [m["id"] for m in res.data["results"]] == [edited.id]
+
+
+def test_search_is_keyset_paginated(chat):
+    a, b, conv, _, client = chat
+    ids = {_msg(conv, b, f"poomsae número {i}").id for i in range(5)}
+
+    seen, url, params = [], "/api/chat/messages/search/", {"q": "poomsae", "page_size": 2}
+    while url:
+        res = client.get(url, params)
+        seen += [m["id"] for m in res.data["results"]]
+        url, params = res.data["next"], None
+    assert len(seen) == 5 and set(seen) == ids
+
+
+def test_keyset_anchor_survives_rank_ties(chat):
+    from chat import search
+
+    a, b, conv, _, client = chat
+    # Mismo contenido → mismo rank: el corte de página cae dentro del empate
+    ids = [_msg(conv, b, "kibon dong jak").id for _ in range(4)]
+    _msg(conv, b, "kibon")
+
+    token = search.encode_cursor(*search.decode_cursor(search.encode_cursor(-1.00000000000049, 7)))
+    assert search.decode_cursor(token) == (search.Decimal("-1.000000000000"), 7)
+
+    seen, url, params = [], "/api/chat/messages/search/", {"q": "kibon dong", "page_size": 1}
+    while url:
+        res = client.get(url, params)
+        seen += [m["id"] for m in res.data["results"]]
+        url, params = res.data["next"], None
+    assert seen == sorted(ids)
+
+
+def test_search_requires_query(chat):
+    *_, client = chat
+    assert client.get("/api/chat/messages/search/", {"q": "  "}).status_code == 400
+    assert client.get("/api/chat/messages/search/", {"q": "x", "cursor": "nope"}).status_code == 404
+
+
+def test_system_check_detects_lost_index_triggers():
+    from django.db import connection
+
+    from chat.checks import check_search_index
+    from chat.search import FTS_TRIGGERS, missing_index_objects
+
+    assert missing_index_objects() == []
+    assert check_search_index(databases=["default"]) == []
+    if connection.vendor != "sqlite":
+        pytest.skip("Triggers FTS5 solo en SQLite")
+
+    # Lo que deja una reconstrucción de chat_message en SQLite: tabla nueva sin triggers
+    with connection.cursor() as cursor:
+        for name in FTS_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER {name}")
+    errors = check_search_index(databases=["default"])
+    assert [e.id for e in errors] == ["chat.E001"]
+    assert "chat_message_fts_ai" in errors[0].msg
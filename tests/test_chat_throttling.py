@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+
+from chat import counters
+from chat.models import ConversationParticipant, Message
+from chat.throttling import FanoutThrottle
+
+
+def _recorder():
+    sent = []
+
+    def make(name):
+        async def _send(*args):
+            sent.append(name)
+        return _send
+    return sent, make
+
+
+def test_typing_start_is_debounced_and_expires():
+    throttle = FanoutThrottle(typing_interval=10, typing_ttl=0.05)
+    sent, make = _recorder()
+
+    async def run():
+        for _ in range(20):
+            await throttle.typing_start(("c", 1), make("start"), make("stop"))
+        await asyncio.sleep(0.1)  # sin renovar: typing.stop automático
+        await throttle.typing_stop(("c", 1), make("stop"))  # ya caducado: se descarta
+
+    async_to_sync(run)()
+    assert sent == ["start", "stop"]
+    assert throttle.stats["typing_dropped"] == 20
+    assert throttle.stats["typing_expired"] == 1
+
+
+def test_reads_are_collapsed_per_window():
+    throttle = FanoutThrottle(read_window=0.05)
+    sent, make = _recorder()
+
+    async def run():
+        for _ in range(10):
+            await throttle.read(("c", 1), make("read"))
+        assert sent == ["read"]
+        await asyncio.sleep(0.1)  # cierre de ventana: un único envío fusionado
+        await throttle.read(("c", 2), make("read-other"))
+
+    async_to_sync(run)()
+    assert sent == ["read", "read", "read-other"]
+    assert throttle.stats["read_merged"] == 9
+    assert throttle.stats["read_sent"] == 3
+
+
+@pytest.mark.django_db
+def test_merged_read_keeps_the_time_of_the_last_read(create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conv = conversation_factory([a, b])
+    throttle = FanoutThrottle(read_window=0.05)
+    flushed = []
+
+    async def flush(at):
+        flushed.append(at)
+        await database_sync_to_async(counters.mark_read)(conv.id, a.id, at)
+
+    @database_sync_to_async
+    def new_message():
+        counters.record_new_messages([Message.objects.create(conversation=conv, sender=b, content="hola")])
+
+    async def run():
+        await throttle.read(("c", a.id), flush)
+        await throttle.read(("c", a.id), flush)  # fusionada: se envía al cerrar la ventana
+        await new_message()  # llega dentro de la ventana, tras la última lectura
+        await asyncio.sleep(0.1)
+
+    async_to_sync(run)()
+    msg = Message.objects.get()
+    part = ConversationParticipant.objects.get(conversation=conv, user=a)
+    assert len(flushed) == 2 and flushed[1] < msg.created_at
+    assert part.last_read_at == flushed[1]
+    assert part.unread_count == 1
@@ -0,0 +1,118 @@
+import time
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from backend.asgi import application
+from chat.ws_jwt import record_revocation, token_cache, user_cache
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    token_cache.clear()
+    user_cache.clear()
+    yield
+    token_cache.clear()
+    user_cache.clear()
+
+
+def _handshake(token):
+    async def run():
+        comm = WebsocketCommunicator(application, f"/ws/chat/?token={token}")
+        connected, _ = await comm.connect()
+        await comm.disconnect()
+        return connected
+    return async_to_sync(run)()
+
+
+def test_reconnect_with_same_token_skips_the_database(create_user):
+    a = create_user("ana", "ana@example.com")
+    token = str(AccessToken.for_user(a))
+
+    with CaptureQueriesContext(connection) as first:
+        assert _handshake(token)
+    with CaptureQueriesContext(connection) as second:
+        assert _handshake(token)
+    assert len(first.captured_queries) >= 1
+    assert len(second.captured_queries) == 0
+
+
+def test_expired_and_invalid_tokens_are_rejected(create_user):
+    a = create_user("ana", "ana@example.com")
+    expired = AccessToken.for_user(a)
+    expired.set_exp(from_time=timezone.now() - timedelta(hours=2))
+
+    assert not _handshake(str(expired))
+    assert not _handshake("no-es-un-jwt")
+    assert len(token_cache) == 0
+
+
+def test_blacklisted_token_is_evicted_from_cache(create_user):
+    a = create_user("ana", "ana@example.com")
+    access = AccessToken.for_user(a)
+    assert _handshake(str(access))
+
+    outstanding = OutstandingToken.objects.create(
+        user=a, jti=access["jti"], token=str(access), expires_at=timezone.now() + timedelta(hours=1)
+    )
+    BlacklistedToken.objects.create(token=outstanding)
+    assert not _handshake(str(access))
+
+
+def test_logout_rejects_cached_access_tokens(create_user):
+    a = create_user("ana", "ana@example.com")
+    refresh = RefreshToken.for_user(a)
+    access = refresh.access_token
+    access.set_iat(at_time=timezone.now() - timedelta(minutes=2))
+    assert _handshake(str(access))
+
+    # Logout pone en la blacklist el refresh (jti distinto del access)
+    refresh.blacklist()
+    assert not _handshake(str(access))
+    # iat va en segundos: se aleja la revocación para que el login nuevo no caiga en el mismo
+    BlacklistedToken.objects.update(blacklisted_at=timezone.now() - timedelta(minutes=1))
+    # Un login nuevo sigue funcionando
+    assert _handshake(str(RefreshToken.for_user(a).access_token))
+
+
+def test_revocation_from_another_process_reaches_the_cached_token(create_user):
+    a = create_user("ana", "ana@example.com")
+    access = AccessToken.for_user(a)
+    access.set_iat(at_time=timezone.now() - timedelta(minutes=2))
+    assert _handshake(str(access))
+
+    # Otro proceso hizo logout: su LRU no es esta, solo queda la marca compartida
+    record_revocation("otro-jti", a.id, timezone.now())
+    assert len(token_cache) == 1
+    with CaptureQueriesContext(connection) as ctx:
+        assert not _handshake(str(access))
+    assert len(ctx.captured_queries) == 0
+    assert len(token_cache) == 0
+
+
+def test_without_shared_cache_tokens_are_cached_briefly(settings, create_user):
+    settings.CHAT_WS_REVOCATION_CACHE = None
+    a = create_user("ana", "ana@example.com")
+    token = str(AccessToken.for_user(a))
+    assert _handshake(token)
+    _, expires_at = token_cache._data[token]
+    assert expires_at - time.monotonic() <= 5
+
+
+def test_user_cache_is_invalidated_on_save(create_user):
+    a = create_user("ana", "ana@example.com")
+    assert _handshake(str(AccessToken.for_user(a)))
+    assert user_cache.get(a.id) is not None
+
+    a.first_name = "Ana"
+    a.save()
+    assert user_cache.get(a.id) is None
@@ -0,0 +1,186 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from docs.caching import bump_version
+from docs.models import BeltLevel as Level, Technique
+from docs.views import LevelListCreateView
+
+pytestmark = pytest.mark.django_db
+
+LEVELS = "/api/docs/levels/"
+TECHNIQUES = "/api/docs/techniques/"
+
+
+@pytest.fixture(autouse=True)
+def docs_cache(settings):
+    settings.DOCS_CACHE = "default"
+
+
+@pytest.fixture
+def catalogue():
+    lvl = Level.objects.create(name="Blanco", order=1)
+    tech = Technique.objects.create(level=lvl, name="Ap Chagi", description="Patada frontal.")
+    return lvl, tech
+
+
+def test_etag_and_cdn_headers(client, catalogue):
+    res = client.get(LEVELS)
+    assert res.status_code == 200
+    assert res["ETag"].startswith('"')
+    cc = res["Cache-Control"]
+    assert "public" in cc and "max-age=60" in cc and "s-maxage=300" in cc
+    assert "Accept" in res["Vary"]
+
+
+def test_not_modified_and_cached_body_without_queries(client, auth_client_factory, alumno_user, catalogue):
+    first = client.get(TECHNIQUES, {"level": catalogue[0].id})
+    etag = first["ETag"]
+
+    with CaptureQueriesContext(connection) as ctx:
+        res = client.get(TECHNIQUES, {"level": catalogue[0].id}, HTTP_IF_NONE_MATCH=etag)
+    assert res.status_code == 304
+    assert res["ETag"] == etag
+    assert len(ctx.captured_queries) == 0
+
+    with CaptureQueriesContext(connection) as ctx:
+        res = client.get(TECHNIQUES, {"level": catalogue[0].id})
+    assert res.status_code == 200
+    assert res.content == first.content
+    assert len(ctx.captured_queries) == 0
+
+    # Autenticado: misma variante (salida pública), ni siquiera se carga el usuario
+    auth, _ = auth_client_factory(alumno_user)
+    with CaptureQueriesContext(connection) as ctx:
+        res = auth.get(TECHNIQUES, {"level": catalogue[0].id}, HTTP_IF_NONE_MATCH=etag)
+    assert res.status_code == 304
+    assert len(ctx.captured_queries) == 0
+
+
+def test_params_change_the_etag(client, catalogue):
+    a = client.get(TECHNIQUES)["ETag"]
+    b = client.get(TECHNIQUES, {"page_size": 5})["ETag"]
+    assert a != b
+
+
+def test_writes_invalidate_only_their_table(client, catalogue):
+    lvl, tech = catalogue
+    levels_etag = client.get(LEVELS)["ETag"]
+    detail_etag = client.get(f"{TECHNIQUES}{tech.id}/")["ETag"]
+
+    tech.name = "Ap Chagi (frontal)"
+    tech.save()
+
+    res = client.get(f"{TECHNIQUES}{tech.id}/", HTTP_IF_NONE_MATCH=detail_etag)
+    assert res.status_code == 200
+    assert res.data["name"] == "Ap Chagi (frontal)"
+    assert client.get(LEVELS, HTTP_IF_NONE_MATCH=levels_etag).status_code == 304
+
+    Level.objects.create(name="Amarillo", order=2)
+    res = client.get(LEVELS, HTTP_IF_NONE_MATCH=levels_etag)
+    assert res.status_code == 200
+    assert res.data["count"] == 2
+
+
+def test_write_during_the_view_does_not_cache_stale_body(client, monkeypatch, catalogue):
+    real_list = LevelListCreateView.list
+
+    def racing_list(self, request, *args, **kwargs):
+        response = real_list(self, request, *args, **kwargs)
+        # Otra petición cambia los niveles después de que esta los haya leído
+        Level.objects.create(name="Amarillo", order=2)
+        bump_version("levels")
+        return response
+
+    monkeypatch.setattr(LevelListCreateView, "list", racing_list)
+    stale = client.get(LEVELS)
+    monkeypatch.setattr(LevelListCreateView, "list", real_list)
+
+    fresh = client.get(LEVELS)
+    assert fresh["ETag"] != stale["ETag"]
+    assert b"Amarillo" in fresh.content
+
+
+def test_level_delete_cascades_to_techniques(client, catalogue):
+    lvl, _ = catalogue
+    etag = client.get(TECHNIQUES)["ETag"]
+    lvl.delete()
+    res = client.get(TECHNIQUES, HTTP_IF_NONE_MATCH=etag)
+    assert res.status_code == 200
+    assert res.data["count"] == 0
+
+
+def test_disabled_cache_is_plain(client, settings, catalogue):
+    settings.DOCS_CACHE = None
+    res = client.get(LEVELS)
+    assert res.status_code == 200
+    assert "ETag" not in res
+
+
+# -----------------------------
+# Documentos: caché por rol
+# -----------------------------
+DOCUMENTS = "/api/docs/documents/"
+
+
+@pytest.fixture
+def documents():
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from docs.models import Document
+
+    return {vis: Document.objects.create(title=vis, visibility=vis,
+                                         file=SimpleUploadedFile(f"{vis}.pdf", b"%PDF-1.4"))
+            for vis in ("public", "alumno", "instructor", "admin")}
+
+
+def test_visibility_mask_follows_visibility(documents):
+    doc = documents["admin"]
+    assert doc.visibility_mask == 8
+    doc.visibility = "public"
+    doc.save(update_fields=["visibility"])
+    doc.refresh_from_db()
+    assert doc.visibility_mask == 15
+    # Columna generada: también con QuerySet.update
+    type(doc).objects.filter(pk=doc.pk).update(visibility="instructor")
+    doc.refresh_from_db()
+    assert doc.visibility_mask == 12
+
+
+def test_document_list_cached_per_role(auth_client_factory, create_user, alumno_user, instructor_user, documents):
+    other_alumno = create_user("alum2", "alum2@example.com")
+    c_al, _ = auth_client_factory(alumno_user)
+    c_al2, _ = auth_client_factory(other_alumno)
+    c_ins, _ = auth_client_factory(instructor_user)
+
+    first = c_al.get(DOCUMENTS)
+    assert {d["title"] for d in first.data["results"]} == {"public", "alumno"}
+    assert "private" in first["Cache-Control"]
+    assert "Authorization" in first["Vary"]
+
+    # Otro alumno: misma página desde la caché (solo la carga del usuario)
+    with CaptureQueriesContext(connection) as ctx:
+        res = c_al2.get(DOCUMENTS)
+    assert res.content == first.content
+    assert len(ctx.captured_queries) == 1
+    assert c_al2.get(DOCUMENTS, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+
+    # Otro rol: otra variante
+    res = c_ins.get(DOCUMENTS, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert res.status_code == 200
+    assert {d["title"] for d in res.data["results"]} == {"public", "alumno", "instructor"}
+
+    # page/page_size forman parte de la clave
+    assert c_al.get(DOCUMENTS, {"page_size": 1}).data["count"] == 2
+
+
+def test_document_change_invalidates_listing(auth_client_factory, alumno_user, documents):
+    c_al, _ = auth_client_factory(alumno_user)
+    etag = c_al.get(DOCUMENTS)["ETag"]
+
+    doc = documents["instructor"]
+    doc.visibility = "alumno"
+    doc.save()
+
+    res = c_al.get(DOCUMENTS, HTTP_IF_NONE_MATCH=etag)
+    assert res.status_code == 200
+    assert {d["title"] for d in res.data["results"]} == {"public", "alumno", "instructor"}
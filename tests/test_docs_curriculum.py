@@ -0,0 +1,84 @@
+import gzip
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from docs.curriculum import pick_encoding
+from docs.models import BeltLevel as Level, Technique
+
+pytestmark = pytest.mark.django_db
+
+URL = "/api/docs/curriculum/"
+
+
+@pytest.fixture(autouse=True)
+def docs_cache(settings):
+    settings.DOCS_CACHE = "default"
+
+
+@pytest.fixture
+def syllabus():
+    amarillo = Level.objects.create(name="Amarillo", order=2)
+    blanco = Level.objects.create(name="Blanco", order=1)
+    Level.objects.create(name="Negro", order=9, is_public=False)
+    for level, names in ((blanco, ["Ap Chagi", "Arae Makki"]), (amarillo, ["Dollyo Chagi"])):
+        for name in names:
+            Technique.objects.create(level=level, name=name)
+    return blanco, amarillo
+
+
+def test_pick_encoding():
+    assert pick_encoding("gzip, deflate", {"identity": b"", "gzip": b""}) == "gzip"
+    assert pick_encoding("gzip;q=0", {"identity": b"", "gzip": b""}) == "identity"
+    assert pick_encoding("br, gzip", {"identity": b"", "gzip": b"", "br": b""}) == "br"
+    assert pick_encoding("*", {"identity": b"", "gzip": b""}) == "gzip"
+    assert pick_encoding("", {"identity": b"", "gzip": b""}) == "identity"
+
+
+def test_curriculum_nested_with_one_prefetch(client, syllabus):
+    with CaptureQueriesContext(connection) as ctx:
+        res = client.get(URL)
+    assert res.status_code == 200
+    assert len(ctx.captured_queries) == 2  # niveles + técnicas
+
+    levels = json.loads(res.content)["levels"]
+    assert [lvl["name"] for lvl in levels] == ["Blanco", "Amarillo"]
+    assert [t["name"] for t in levels[0]["techniques"]] == ["Ap Chagi", "Arae Makki"]
+    assert "public" in res["Cache-Control"] and "Accept-Encoding" in res["Vary"]
+
+
+def test_precompressed_blob_served_without_queries(client, syllabus):
+    plain = client.get(URL)
+
+    with CaptureQueriesContext(connection) as ctx:
+        res = client.get(URL, HTTP_ACCEPT_ENCODING="gzip, deflate")
+    assert len(ctx.captured_queries) == 0
+    assert res["Content-Encoding"] == "gzip"
+    assert gzip.decompress(res.content) == plain.content
+    assert len(res.content) < len(plain.content)
+    # Cada codificación tiene su ETag: un caché no debe confundir las representaciones
+    assert res["ETag"] == plain["ETag"][:-1] + '-gzip"'
+
+    assert client.get(URL, HTTP_IF_NONE_MATCH=plain["ETag"]).status_code == 304
+    assert client.get(URL, HTTP_IF_NONE_MATCH=res["ETag"], HTTP_ACCEPT_ENCODING="gzip").status_code == 304
+    # La ETag de la versión sin comprimir no valida la gzip (ni al revés)
+    assert client.get(URL, HTTP_IF_NONE_MATCH=plain["ETag"], HTTP_ACCEPT_ENCODING="gzip").status_code == 200
+    assert client.get(URL, HTTP_IF_NONE_MATCH=res["ETag"]).status_code == 200
+
+
+def test_changes_invalidate(client, syllabus):
+    blanco, _ = syllabus
+    etag = client.get(URL)["ETag"]
+
+    Technique.objects.create(level=blanco, name="Momtong Jireugi")
+    res = client.get(URL, HTTP_IF_NONE_MATCH=etag)
+    assert res.status_code == 200
+    assert len(json.loads(res.content)["levels"][0]["techniques"]) == 3
+
+    etag = res["ETag"]
+    blanco.is_public = False
+    blanco.save()
+    res = client.get(URL, HTTP_IF_NONE_MATCH=etag)
+    assert [lvl["name"] for lvl in json.loads(res.content)["levels"]] == ["Amarillo"]
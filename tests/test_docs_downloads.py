@@ -0,0 +1,133 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from docs.downloads import parse_range
+from docs.models import BeltLevel as Level, Document
+
+pytestmark = pytest.mark.django_db
+
+PAYLOAD = b"%PDF-1.4 " + bytes(range(256)) * 8
+
+
+@pytest.fixture
+def documents():
+    return {vis: Document.objects.create(title=vis, visibility=vis,
+                                         file=SimpleUploadedFile(f"{vis}.pdf", PAYLOAD))
+            for vis in ("public", "instructor")}
+
+
+def _body(res):
+    return b"".join(res.streaming_content)
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=100-", 100) == "unsatisfiable"
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("items=0-1", 100) is None
+
+
+def test_document_download_enforces_visibility(client, auth_client_factory, alumno_user, instructor_user, documents):
+    url = f"/api/docs/documents/{documents['instructor'].id}/download/"
+    assert client.get(url).status_code in (401, 403)
+
+    c_al, _ = auth_client_factory(alumno_user)
+    assert c_al.get(url).status_code == 404
+    assert c_al.get(f"/api/docs/documents/{documents['instructor'].id}/").status_code == 404
+
+    c_ins, _ = auth_client_factory(instructor_user)
+    res = c_ins.get(url, HTTP_ACCEPT="application/pdf")
+    assert res.status_code == 200
+    assert _body(res) == PAYLOAD
+    assert res["Content-Type"] == "application/pdf"
+    assert res["Content-Length"] == str(len(PAYLOAD))
+    assert res["Accept-Ranges"] == "bytes"
+    assert "private" in res["Cache-Control"]
+
+    listed = c_ins.get("/api/docs/documents/").data["results"]
+    assert any(d["download_url"].endswith(url) for d in listed)
+    assert all("file" not in d for d in listed)  # sin ruta directa a MEDIA
+
+
+def test_range_etag_and_if_range(auth_client_factory, alumno_user, documents):
+    c_al, _ = auth_client_factory(alumno_user)
+    url = f"/api/docs/documents/{documents['public'].id}/download/"
+    etag = c_al.get(url)["ETag"]
+
+    res = c_al.get(url, HTTP_RANGE="bytes=10-19")
+    assert res.status_code == 206
+    assert _body(res) == PAYLOAD[10:20]
+    assert res["Content-Range"] == f"bytes 10-19/{len(PAYLOAD)}"
+    assert res["Content-Length"] == "10"
+
+    assert c_al.get(url, HTTP_RANGE="bytes=-5").status_code == 206
+    assert c_al.get(url, HTTP_RANGE="bytes=5-6", HTTP_IF_RANGE=etag).status_code == 206
+    # If-Range que no coincide: fichero entero
+    assert c_al.get(url, HTTP_RANGE="bytes=5-6", HTTP_IF_RANGE='"otro"').status_code == 200
+
+    res = c_al.get(url, HTTP_RANGE=f"bytes={len(PAYLOAD)}-")
+    assert res.status_code == 416
+    assert res["Content-Range"] == f"bytes */{len(PAYLOAD)}"
+
+    assert c_al.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+def test_sendfile_backends(settings, auth_client_factory, alumno_user, documents):
+    c_al, _ = auth_client_factory(alumno_user)
+    doc = documents["public"]
+    url = f"/api/docs/documents/{doc.id}/download/"
+
+    settings.DOCS_SENDFILE_BACKEND = "x-accel-redirect"
+    res = c_al.get(url)
+    assert res.status_code == 200
+    assert res["X-Accel-Redirect"] == f"/protected-media/{doc.file.name}"
+    assert res.content == b""
+
+    settings.DOCS_SENDFILE_BACKEND = "x-sendfile"
+    assert c_al.get(url)["X-Sendfile"] == doc.file.path
+
+
+def test_level_pdf_public_and_private(client, auth_client_factory, alumno_user):
+    public = Level.objects.create(name="Blanco", order=1, pdf=SimpleUploadedFile("b.pdf", PAYLOAD))
+    hidden = Level.objects.create(name="Negro", order=9, is_public=False,
+                                  pdf=SimpleUploadedFile("n.pdf", PAYLOAD))
+    empty = Level.objects.create(name="Amarillo", order=2)
+
+    res = client.get(f"/api/docs/levels/{public.id}/pdf/")
+    assert res.status_code == 200
+    assert "public" in res["Cache-Control"]
+    assert res["Content-Disposition"] == 'inline; filename="Blanco.pdf"'
+    assert client.get(f"/api/docs/levels/{hidden.id}/pdf/").status_code == 404
+    assert client.get(f"/api/docs/levels/{empty.id}/pdf/").status_code == 404
+
+    c_al, _ = auth_client_factory(alumno_user)
+    res = c_al.get(f"/api/docs/levels/{hidden.id}/pdf/")
+    assert res.status_code == 200
+    assert "private" in res["Cache-Control"]
+
+
+def test_level_listing_links_the_gated_pdf_view(client):
+    lvl = Level.objects.create(name="Blanco", order=1, pdf=SimpleUploadedFile("b.pdf", PAYLOAD))
+    Level.objects.create(name="Amarillo", order=2)
+    rows = {row["name"]: row for row in client.get("/api/docs/levels/").data["results"]}
+    # Nunca la URL directa de MEDIA: esa no comprueba si el nivel es público
+    assert "pdf" not in rows["Blanco"]
+    assert rows["Blanco"]["pdf_url"] == f"http://testserver/api/docs/levels/{lvl.id}/pdf/"
+    assert rows["Amarillo"]["pdf_url"] is None
+
+
+def test_multipart_upload_type_from_magic_bytes(auth_client_factory, instructor_user):
+    client, _ = auth_client_factory(instructor_user)
+    res = client.post("/api/docs/documents/", {"title": "Trampa", "visibility": "alumno",
+                                                "file": SimpleUploadedFile("x.html", PAYLOAD)}, format="multipart")
+    assert res.status_code == 201
+    doc = Document.objects.get(pk=res.data["id"])
+    assert doc.content_type == "application/pdf" and doc.file.name.endswith(".pdf")
+
+    res = client.post("/api/docs/documents/", {"title": "HTML", "visibility": "alumno",
+                                                "file": SimpleUploadedFile("x.pdf", b"<html><script>")},
+                      format="multipart")
+    assert res.status_code == 400
@@ -0,0 +1,102 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+
+from docs import images
+from docs.models import BeltLevel as Level, Technique
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def inline_workers(settings):
+    settings.DOCS_IMAGE_WORKERS = 0
+    settings.DOCS_IMAGE_WIDTHS = (160, 320, 640)
+
+
+def _png(width=800, height=600, color=(200, 30, 30)):
+    buf = BytesIO()
+    Image.new("RGB", (width, height), color).save(buf, "PNG")
+    return SimpleUploadedFile("tecnica.png", buf.getvalue(), content_type="image/png")
+
+
+@pytest.fixture
+def level():
+    return Level.objects.create(name="Blanco", order=1)
+
+
+def test_variants_generated_after_commit(client, level, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        tech = Technique.objects.create(level=level, name="Ap Chagi", image=_png())
+    tech.refresh_from_db()
+
+    assert tech.image_variants["src"] == tech.image.name
+    widths = tech.image_variants["widths"]
+    assert sorted(map(int, widths)) == [160, 320, 640]
+    with tech.image.storage.open(widths["160"]) as fh:
+        thumb = Image.open(fh)
+        assert thumb.format == "WEBP" and thumb.size == (160, 120)
+
+    data = client.get(f"/api/docs/techniques/{tech.id}/").data
+    assert data["thumbnail"].endswith(widths["160"])
+    assert data["srcset"].count("w,") == 2 and data["srcset"].endswith("640w")
+
+
+def test_small_images_are_not_upscaled_and_variants_are_shared(level, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        a = Technique.objects.create(level=level, name="A", image=_png(100, 50))
+        b = Technique.objects.create(level=level, name="B", image=_png(100, 50))
+    a.refresh_from_db()
+    b.refresh_from_db()
+    assert list(a.image_variants["widths"]) == ["100"]
+    # Mismo contenido → mismos derivados (nombre por hash)
+    assert a.image_variants["widths"] == b.image_variants["widths"]
+
+
+def test_existing_variants_are_not_rendered_again(level, monkeypatch, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        a = Technique.objects.create(level=level, name="A", image=_png())
+    rendered = []
+    real_render = images.render_variant
+    monkeypatch.setattr(images, "render_variant", lambda img, width: rendered.append(width) or real_render(img, width))
+
+    # Misma técnica y otra con el mismo original: se reutilizan sus derivados
+    assert images.build_variants(a.id)["widths"] == Technique.objects.get(pk=a.pk).image_variants["widths"]
+    with django_capture_on_commit_callbacks(execute=True):
+        b = Technique.objects.create(level=level, name="B", image=_png())
+    b.refresh_from_db()
+    assert b.image_variants["widths"] == Technique.objects.get(pk=a.pk).image_variants["widths"]
+    assert rendered == []
+
+    images.build_variants(a.id, force=True)
+    assert rendered == [160, 320, 640]
+
+
+def test_replacing_or_clearing_image(client, level, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        tech = Technique.objects.create(level=level, name="Ap Chagi", image=_png())
+    tech.refresh_from_db()
+    old = tech.image_variants["widths"]["160"]
+
+    # Mientras no hay derivados de la imagen nueva no se sirven los viejos
+    tech.image = _png(color=(0, 0, 200))
+    tech.save()
+    assert client.get(f"/api/docs/techniques/{tech.id}/").data["srcset"] == ""
+    images.build_variants(tech.id)
+    tech.refresh_from_db()
+    assert tech.image_variants["widths"]["160"] != old
+
+    tech.image = None
+    tech.save()
+    tech.refresh_from_db()
+    assert tech.image_variants == {}
+
+
+def test_backfill_command(level):
+    tech = Technique.objects.create(level=level, name="Ap Chagi", image=_png())
+    assert Technique.objects.get(pk=tech.pk).image_variants == {}
+    call_command("build_image_variants")
+    assert Technique.objects.get(pk=tech.pk).image_variants["widths"]
@@ -0,0 +1,66 @@
+import pytest
+from django.core.management import call_command
+
+from docs import search
+from docs.models import BeltLevel as Level, Technique
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def catalogue():
+    lvl = Level.objects.create(name="Amarillo", order=2)
+    return {
+        "ap": Technique.objects.create(level=lvl, name="Ap Chagi",
+                                       description="Patada frontal con la planta del pie."),
+        "dollyo": Technique.objects.create(level=lvl, name="Dollyo Chagi",
+                                           description="Patada circular. Se gira la cadera antes del impacto."),
+        "makki": Technique.objects.create(level=lvl, name="Arae Makki",
+                                          description="Defensa baja con el antebrazo."),
+    }
+
+
+def _search(client, q):
+    res = client.get("/api/docs/techniques/", {"q": q})
+    assert res.status_code == 200
+    return res.data["results"]
+
+
+def test_analyzer_folds_accents_and_stems():
+    assert search.analyze("Las Patadas giratorias") == search.analyze("patada GIRATORIA")
+    assert search.analyze("técnica") == search.analyze("tecnicas")
+
+
+def test_search_stems_ranks_and_highlights(client, catalogue):
+    results = _search(client, "patadas")
+    assert {r["id"] for r in results} == {catalogue["ap"].id, catalogue["dollyo"].id}
+    assert all(r["score"] > 0 for r in results)
+    assert "<mark>Patada</mark>" in results[0]["highlight"]["description"]
+
+    # El nombre pesa más que la descripción
+    results = _search(client, "chagi circular")
+    assert [r["id"] for r in results] == [catalogue["dollyo"].id]
+    assert results[0]["highlight"]["name"] == "Dollyo <mark>Chagi</mark>"
+
+
+def test_trigram_fallback_tolerates_typos(client, catalogue):
+    results = _search(client, "dolyo chagui")
+    assert results[0]["id"] == catalogue["dollyo"].id
+
+
+def test_index_follows_updates_and_deletes(client, catalogue):
+    ap = catalogue["ap"]
+    ap.description = "Golpe con el puño."
+    ap.save()
+    assert [r["id"] for r in _search(client, "patada")] == [catalogue["dollyo"].id]
+    assert [r["id"] for r in _search(client, "puño")] == [ap.id]
+
+    catalogue["dollyo"].delete()
+    assert _search(client, "patada") == []
+
+    call_command("rebuild_technique_index", stdout=open("/dev/null", "w"))
+    assert [r["id"] for r in _search(client, "puno")] == [ap.id]
+
+
+def test_highlight_escapes_html():
+    assert search.highlight("<b>patada</b>", ["patad"]) == "&lt;b&gt;<mark>patada</mark>&lt;/b&gt;"
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import time
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from docs.models import BeltLevel as Level, Document
+from docs.storage import content_storage, reference_count
+
+pytestmark = pytest.mark.django_db
+
+REGLAMENTO = b"%PDF-1.4 reglamento de competicion"
+
+
+def _pdf(name="reglamento.pdf", data=REGLAMENTO):
+    return SimpleUploadedFile(name, data, content_type="application/pdf")
+
+
+def test_same_content_stored_once():
+    digest = hashlib.sha256(REGLAMENTO).hexdigest()
+    level = Level.objects.create(name="Blanco", order=1, pdf=_pdf("nivel.pdf"))
+    doc = Document.objects.create(title="Reglamento", visibility="public", file=_pdf("otro-nombre.pdf"))
+
+    assert level.pdf.name == doc.file.name == f"cas/{digest[:2]}/{digest[2:4]}/{digest}.pdf"
+    assert content_storage().exists(doc.file.name)
+    assert reference_count(doc.file.name) == 2
+
+
+def test_file_deleted_with_last_reference(settings, django_capture_on_commit_callbacks):
+    settings.DOCS_MEDIA_MIN_AGE = 0
+    a = Document.objects.create(title="A", file=_pdf())
+    b = Document.objects.create(title="B", file=_pdf())
+    name = a.file.name
+
+    with django_capture_on_commit_callbacks(execute=True):
+        a.delete()
+    assert content_storage().exists(name)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        b.delete()
+    assert not content_storage().exists(name)
+
+
+def test_recently_reused_file_is_left_for_gc(settings, django_capture_on_commit_callbacks):
+    settings.DOCS_MEDIA_MIN_AGE = 3600
+    old = Document.objects.create(title="Viejo", file=_pdf())
+    name = old.file.name
+    media = content_storage()
+    os.utime(media.path(name), (time.time() - 7200,) * 2)
+
+    # Otra fila reutiliza el mismo contenido (aún sin confirmar) mientras se borra la última
+    media.save("otra.pdf", _pdf())
+    with django_capture_on_commit_callbacks(execute=True):
+        old.delete()
+    assert media.exists(name)
+
+    call_command("gc_media", "--min-age", "0")
+    assert not media.exists(name)
+
+
+def test_pk_download_revalidates_by_hash(settings, auth_client_factory, alumno_user):
+    settings.DOCS_CACHE_MAX_AGE = 60
+    level = Level.objects.create(name="Blanco", order=1, pdf=_pdf())
+    client = auth_client_factory(alumno_user)[0]
+    res = client.get(f"/api/docs/levels/{level.id}/pdf/")
+    assert res.status_code == 200
+    # La URL es por pk: el PDF del nivel puede cambiar, así que no es inmutable
+    assert "immutable" not in res["Cache-Control"] and "max-age=60" in res["Cache-Control"]
+    assert res["ETag"] == f'"{hashlib.sha256(REGLAMENTO).hexdigest()}"'
+    again = client.get(f"/api/docs/levels/{level.id}/pdf/", HTTP_IF_NONE_MATCH=res["ETag"])
+    assert again.status_code == 304
+
+
+def test_gc_media_removes_orphans():
+    doc = Document.objects.create(title="A", file=_pdf())
+    orphan = content_storage().save("x.pdf", _pdf(data=b"%PDF-1.4 huerfano"))
+
+    call_command("gc_media", "--min-age", "0")
+    media = content_storage()
+    assert not media.exists(orphan)
+    assert media.exists(doc.file.name)
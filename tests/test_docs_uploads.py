@@ -0,0 +1,144 @@
+import os
+
+import pytest
+from django.core.management import call_command
+
+from docs.models import Document, UploadSession
+
+pytestmark = pytest.mark.django_db
+
+UPLOADS = "/api/docs/documents/uploads/"
+PDF = b"%PDF-1.4\n" + os.urandom(300_000)
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(settings):
+    settings.DOCS_UPLOAD_CHUNK_MAX = 128 * 1024
+
+
+@pytest.fixture
+def instructor_client(auth_client_factory, instructor_user):
+    client, _ = auth_client_factory(instructor_user)
+    return client
+
+
+def _start(client, data=PDF, **extra):
+    payload = {"title": "Reglamento", "visibility": "alumno", "filename": "reglamento.pdf", "size": len(data)}
+    payload.update(extra)
+    return client.post(UPLOADS, payload, format="json")
+
+
+def _put(client, session_id, data, start, total):
+    return client.generic("PUT", f"{UPLOADS}{session_id}/", data, content_type="application/octet-stream",
+                          HTTP_CONTENT_RANGE=f"bytes {start}-{start + len(data) - 1}/{total}")
+
+
+def _upload(client, data=PDF, chunk=100_000):
+    sid = _start(client, data).data["id"]
+    for start in range(0, len(data), chunk):
+        assert _put(client, sid, data[start:start + chunk], start, len(data)).status_code == 200
+    return sid, client.post(f"{UPLOADS}{sid}/complete/")
+
+
+def test_chunked_upload_resume_and_complete(instructor_client):
+    res = _start(instructor_client)
+    assert res.status_code == 201
+    sid = res.data["id"]
+
+    assert _put(instructor_client, sid, PDF[:100_000], 0, len(PDF)).data["received"] == 100_000
+    # Reenvío de un tramo ya recibido (p. ej. tras un corte): 409 con el offset bueno
+    res = _put(instructor_client, sid, PDF[:100_000], 0, len(PDF))
+    assert res.status_code == 409
+    assert res.data["received"] == 100_000
+
+    # Faltan tramos
+    assert instructor_client.post(f"{UPLOADS}{sid}/complete/").status_code == 409
+
+    status = instructor_client.get(f"{UPLOADS}{sid}/").data
+    assert status["content_type"] == "application/pdf"
+    for start in range(status["received"], len(PDF), 100_000):
+        assert _put(instructor_client, sid, PDF[start:start + 100_000], start, len(PDF)).status_code == 200
+
+    res = instructor_client.post(f"{UPLOADS}{sid}/complete/")
+    assert res.status_code == 201
+    doc = Document.objects.get(pk=res.data["id"])
+    with doc.file.open("rb") as fh:
+        assert fh.read() == PDF
+    assert doc.sha256 and doc.visibility == "alumno"
+    assert not os.path.exists(UploadSession.objects.get(pk=sid).temp_path)
+
+
+def test_duplicate_content_reuses_file(instructor_client):
+    _, first = _upload(instructor_client)
+    _, second = _upload(instructor_client)
+    a, b = Document.objects.get(pk=first.data["id"]), Document.objects.get(pk=second.data["id"])
+    assert a.pk != b.pk
+    assert a.file.name == b.file.name
+
+
+def test_limits_and_magic_bytes(settings, instructor_client, auth_client_factory, alumno_user):
+    settings.DOCS_MAX_UPLOAD_SIZE = 1000
+    assert _start(instructor_client, size=1001).status_code == 413
+    settings.DOCS_MAX_UPLOAD_SIZE = len(PDF)
+
+    # Magic bytes: un ejecutable con nombre .pdf se rechaza en el primer tramo
+    fake = b"MZ\x90\x00" + b"\x00" * 500
+    sid = _start(instructor_client, data=fake).data["id"]
+    res = _put(instructor_client, sid, fake, 0, len(fake))
+    assert res.status_code == 415
+    assert not UploadSession.objects.filter(pk=sid).exists()
+
+    sid = _start(instructor_client).data["id"]
+    big = PDF[:settings.DOCS_UPLOAD_CHUNK_MAX + 1]
+    assert _put(instructor_client, sid, big, 0, len(PDF)).status_code == 413
+    assert _put(instructor_client, sid, PDF[:10], 0, len(PDF + b"x")).status_code == 400
+
+    # Alumnos no suben; nadie ve sesiones ajenas
+    c_al, _ = auth_client_factory(alumno_user)
+    assert _start(c_al).status_code == 403
+    assert c_al.get(f"{UPLOADS}{sid}/").status_code == 404
+
+
+def test_purge_stale_sessions(instructor_client):
+    sid = _start(instructor_client).data["id"]
+    path = UploadSession.objects.get(pk=sid).temp_path
+    assert os.path.exists(path)
+    call_command("purge_upload_sessions", "--max-age", "0")
+    assert not UploadSession.objects.filter(pk=sid).exists()
+    assert not os.path.exists(path)
+
+
+def test_concurrent_chunk_only_advances_once(instructor_client):
+    from io import BytesIO
+
+    from docs.uploads import UploadError, write_chunk
+
+    sid = _start(instructor_client).data["id"]
+
+    class RacingStream(BytesIO):
+        # Otro PUT del mismo tramo termina mientras este aún copia bytes
+        def read(self, size=-1):
+            UploadSession.objects.filter(pk=sid).update(received=100_000)
+            return super().read(size)
+
+    with pytest.raises(UploadError) as exc:
+        write_chunk(sid, 0, 99_999, len(PDF), RacingStream(PDF[:100_000]))
+    assert exc.value.status == 409 and exc.value.extra["received"] == 100_000
+    assert UploadSession.objects.get(pk=sid).received == 100_000
+
+
+def test_stored_type_comes_from_content_not_filename(instructor_client):
+    # Un PDF subido como .html no debe acabar servido como text/html
+    sid = _start(instructor_client, filename="x.html").data["id"]
+    for start in range(0, len(PDF), 100_000):
+        _put(instructor_client, sid, PDF[start:start + 100_000], start, len(PDF))
+    res = instructor_client.post(f"{UPLOADS}{sid}/complete/")
+    doc = Document.objects.get(pk=res.data["id"])
+    assert doc.content_type == "application/pdf"
+    assert doc.file.name.endswith(".pdf")
+
+    res = instructor_client.get(f"/api/docs/documents/{doc.id}/download/")
+    assert res["Content-Type"] == "application/pdf"
+    assert res["X-Content-Type-Options"] == "nosniff"
+    # Nombre legible desde el título, con la extensión del tipo real (no el hash)
+    assert res["Content-Disposition"] == 'inline; filename="Reglamento.pdf"'
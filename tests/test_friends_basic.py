@@ -2,6 +2,13 @@ import pytest
 
 pytestmark = pytest.mark.django_db
 
+
+def _usernames(response):
+    # Lista paginada ({"results": [...]}) o lista simple; puede venir vacía
+    data = response.data
+    items = data["results"] if isinstance(data, dict) else data
+    return [item.get("username") or item.get("friend", {}).get("username") for item in items]
+
 def test_friend_request_send_accept_and_appears_in_lists(auth_client_factory, create_user):
     # users
     a = create_user("alice", "alice@example.com", role="ALUMNO")
@@ -23,8 +30,8 @@ def test_friend_request_send_accept_and_appears_in_lists(auth_client_factory, cr
     list_a = ca.get("/api/friends/")
     list_b = cb.get("/api/friends/")
     assert list_a.status_code == 200 and list_b.status_code == 200
-    names_a = [item.get("username") or item.get("friend", {}).get("username") for item in (list_a.data.get("results") or list_a.data)]
-    names_b = [item.get("username") or item.get("friend", {}).get("username") for item in (list_b.data.get("results") or list_b.data)]
+    names_a = _usernames(list_a)
+    names_b = _usernames(list_b)
     assert "bob" in names_a and "alice" in names_b
 
 def test_friend_request_reject_flow(auth_client_factory, create_user):
@@ -44,8 +51,8 @@ def test_friend_request_reject_flow(auth_client_factory, create_user):
     # No debería aparecer amistad
     list_a = ca.get("/api/friends/")
     list_b = cb.get("/api/friends/")
-    names_a = [item.get("username") or item.get("friend", {}).get("username") for item in (list_a.data.get("results") or list_a.data)]
-    names_b = [item.get("username") or item.get("friend", {}).get("username") for item in (list_b.data.get("results") or list_b.data)]
+    names_a = _usernames(list_a)
+    names_b = _usernames(list_b)
     assert "diana" not in names_a and "carlos" not in names_b
 
 def test_friend_request_cancel_by_sender(auth_client_factory, create_user):
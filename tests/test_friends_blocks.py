@@ -0,0 +1,46 @@
+import pytest
+from django.core.cache import cache
+from friends.models import Block
+from friends.utils import is_blocked_either, blocked_pairs, get_block_set
+
+pytestmark = pytest.mark.django_db
+
+
+def test_is_blocked_either_single_query(create_user, django_assert_num_queries):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    Block.objects.create(blocker=b, blocked=a)
+    with django_assert_num_queries(1):
+        assert is_blocked_either(a.id, b.id)
+    with django_assert_num_queries(1):
+        assert is_blocked_either(b.id, a.id)
+
+
+def test_blocked_pairs_both_directions(create_user, django_assert_num_queries):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    c = create_user("carla", "carla@example.com")
+    d = create_user("dani", "dani@example.com")
+    Block.objects.create(blocker=a, blocked=b)
+    Block.objects.create(blocker=c, blocked=a)
+    with django_assert_num_queries(1):
+        assert blocked_pairs(a.id, [b.id, c.id, d.id]) == {b.id, c.id}
+    assert blocked_pairs(a.id, []) == set()
+
+
+def test_block_cache_is_invalidated_on_save_and_delete(settings, create_user, django_assert_num_queries):
+    settings.FRIENDS_BLOCK_CACHE = "default"
+    cache.clear()
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    assert get_block_set(a.id) == frozenset()
+    with django_assert_num_queries(0):
+        assert not is_blocked_either(a.id, b.id)
+
+    block = Block.objects.create(blocker=b, blocked=a)
+    assert is_blocked_either(a.id, b.id)
+    with django_assert_num_queries(0):
+        assert blocked_pairs(a.id, [b.id]) == {b.id}
+
+    block.delete()
+    assert not is_blocked_either(a.id, b.id)
@@ -0,0 +1,102 @@
+import pytest
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from rest_framework_simplejwt.tokens import AccessToken
+
+from rest_framework.serializers import BaseSerializer
+
+from backend.perf import Stats, registry
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def perf(settings):
+    settings.PERF_ENABLED = True
+    settings.PERF_METRICS_TOKEN = "secreto"
+    registry.reset()
+    yield settings
+    registry.reset()
+
+
+def _metrics(client):
+    return client.get("/metrics/", HTTP_X_METRICS_TOKEN="secreto")
+
+
+def test_server_timing_and_prometheus_metrics(perf, auth_client_factory, create_user, conversation_factory):
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conversation_factory([a, b])
+    client, _ = auth_client_factory(a)
+
+    res = client.get("/api/chat/conversations/")
+    assert res.status_code == 200
+    timing = res["Server-Timing"]
+    assert "db;dur=" in timing and "queries" in timing and "render;dur=" in timing
+    # El render de DRF se mide desde el middleware, sin tocar los serializers
+    assert isinstance(BaseSerializer.__dict__["data"], property)
+    assert BaseSerializer.__dict__["data"].fget.__module__ == "rest_framework.serializers"
+
+    metrics = _metrics(client)
+    assert metrics.status_code == 200
+    body = metrics.content.decode()
+    assert 'tkd_request_duration_seconds_count{kind="http",view="conversation-list",method="GET"} 1' in body
+    assert 'tkd_db_queries_total{kind="http",view="conversation-list",method="GET"}' in body
+    render = body.split('tkd_render_seconds_total{kind="http",view="conversation-list",method="GET"} ')[1]
+    assert float(render.split()[0]) > 0
+
+
+def test_slow_requests_are_sampled_with_sql(perf, auth_client_factory, create_user):
+    perf.PERF_SLOW_REQUEST_MS = 0
+    client, _ = auth_client_factory(create_user("ana", "ana@example.com"))
+    client.get("/api/users/profile/")
+
+    res = client.get("/metrics/slow/", HTTP_X_METRICS_TOKEN="secreto")
+    sample = res.json()["samples"][0]
+    assert sample["label"] == "profile"
+    assert sample["db_count"] == len(sample["sql"]) >= 1
+
+
+def test_stats_are_safe_across_threads():
+    import threading
+
+    stats = Stats()
+
+    def work():
+        for _ in range(1000):
+            stats.add_query("SELECT 1", 0.001)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert stats.db_count == 8000
+
+
+def test_metrics_need_token_and_flag(settings, client, perf):
+    assert client.get("/metrics/").status_code == 404
+    perf.PERF_ENABLED = False
+    assert _metrics(client).status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_websocket_frames_are_measured(perf, create_user, conversation_factory):
+    from backend.asgi import application
+
+    a = create_user("ana", "ana@example.com")
+    b = create_user("beto", "beto@example.com")
+    conv = conversation_factory([a, b])
+
+    async def run():
+        comm = WebsocketCommunicator(application, f"/ws/chat/{conv.id}/?token={AccessToken.for_user(a)}")
+        assert (await comm.connect())[0]
+        await comm.send_json_to({"action": "message", "content": "hola"})
+        await comm.receive_json_from(timeout=2)
+        await comm.receive_json_from(timeout=2)
+        await comm.disconnect()
+
+    async_to_sync(run)()
+    body = registry.prometheus()
+    assert 'tkd_request_duration_seconds_count{kind="ws",view="/ws/chat/<id>/",method="connect"} 1' in body
+    assert 'tkd_request_duration_seconds_count{kind="ws",view="/ws/chat/<id>/",method="receive"} 1' in body
@@ -0,0 +1,131 @@
+"""
+Presupuesto de consultas por endpoint: el número de consultas no debe crecer
+con el tamaño de la página y no puede superar el registrado en query_budgets.json.
+"""
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from chat.counters import record_new_messages
+from chat.models import Message
+from docs.models import BeltLevel as Level, Document, Technique
+from friends.models import FriendRequest, Friendship
+from query_budget import QueryRecorder, load_budgets, save_budgets, updating_budgets
+
+pytestmark = pytest.mark.django_db
+
+SIZES = (2, 12)
+
+
+# ---- Datos por endpoint: seed(ctx, owner, n) -> url ----
+
+def _conversations(ctx, owner, n):
+    for i in range(n):
+        other = ctx.user(f"{owner.username}-c{i}")
+        conv = ctx.conversation([owner, other])
+        record_new_messages([Message.objects.create(conversation=conv, sender=other, content="hola")])
+    return "/api/chat/conversations/"
+
+
+def _messages(ctx, owner, n):
+    other = ctx.user(f"{owner.username}-m")
+    conv = ctx.conversation([owner, other])
+    msgs = [Message.objects.create(conversation=conv, sender=(owner, other)[i % 2], content=f"m{i}")
+            for i in range(n)]
+    record_new_messages(msgs)
+    return f"/api/chat/conversations/{conv.id}/messages/"
+
+
+def _friends(ctx, owner, n):
+    for i in range(n):
+        other = ctx.user(f"{owner.username}-f{i}")
+        Friendship.objects.create(**dict(zip(("user1", "user2"), sorted([owner, other], key=lambda u: u.id))))
+    return "/api/friends/"
+
+
+def _friend_requests(ctx, owner, n):
+    for i in range(n):
+        FriendRequest.objects.create(from_user=ctx.user(f"{owner.username}-r{i}"), to_user=owner)
+    return "/api/friends/requests/pending/"
+
+
+def _levels(ctx, owner, n):
+    base = Level.objects.count()
+    Level.objects.bulk_create([Level(name=f"Nivel {base + i}", order=base + i) for i in range(n)])
+    return "/api/docs/levels/"
+
+
+def _techniques(ctx, owner, n):
+    level = Level.objects.create(name=f"Nivel {owner.username}", order=1)
+    Technique.objects.bulk_create([Technique(level=level, name=f"Técnica {i}") for i in range(n)])
+    return "/api/docs/techniques/"
+
+
+def _documents(ctx, owner, n):
+    for i in range(n):
+        Document.objects.create(title=f"Doc {i}", visibility="alumno",
+                                file=SimpleUploadedFile(f"doc{i}.pdf", b"%PDF-1.4"))
+    return "/api/docs/documents/"
+
+
+def _profile(ctx, owner, n):
+    return "/api/users/profile/"
+
+
+ENDPOINTS = {
+    "chat.conversations.list": _conversations,
+    "chat.messages.list": _messages,
+    "friends.list": _friends,
+    "friends.requests.pending": _friend_requests,
+    "docs.levels.list": _levels,
+    "docs.techniques.list": _techniques,
+    "docs.documents.list": _documents,
+    "users.profile": _profile,
+}
+
+_report = {}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def budgets_report():
+    yield
+    if updating_budgets() and _report:
+        save_budgets({**load_budgets(), **_report})
+
+
+@pytest.fixture
+def ctx(create_user, conversation_factory):
+    class Ctx:
+        def user(self, name):
+            return create_user(name, f"{name}@example.com")
+
+        def conversation(self, users):
+            return conversation_factory(users)
+    return Ctx()
+
+
+@pytest.mark.parametrize("name", sorted(ENDPOINTS))
+def test_query_count_is_independent_of_page_size(name, ctx, auth_client_factory):
+    results = []
+    for n in SIZES:
+        owner = ctx.user(f"u{n}")
+        url = ENDPOINTS[name](ctx, owner, n)
+        client, _ = auth_client_factory(owner)
+        with QueryRecorder() as rec:
+            res = client.get(url)
+        assert res.status_code == 200, res.content
+        results.append(rec)
+
+    small, large = results
+    assert small.count == large.count, (
+        f"{name}: {small.count} consultas con {SIZES[0]} filas y {large.count} con {SIZES[1]}\n"
+        + large.describe()
+    )
+
+    if updating_budgets():
+        _report[name] = {"queries": large.count, "sql_ms": large.sql_ms, "rows": SIZES[1]}
+        return
+    budget = load_budgets().get(name)
+    assert budget is not None, f"{name} sin presupuesto: ejecuta con UPDATE_QUERY_BUDGETS=1"
+    assert large.count <= budget["queries"], (
+        f"{name}: {large.count} consultas, presupuesto {budget['queries']}\n" + large.describe()
+    )